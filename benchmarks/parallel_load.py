@@ -0,0 +1,46 @@
+"""Compare loading large chunked saves in one process and in a process pool
+
+Run from the repository root:
+
+    python benchmarks/parallel_load.py [region counts...]
+
+The pool reads, verifies and decompresses chunks while the main process
+decodes them, so the speedup depends on the codec and the number of CPUs;
+with one CPU the pool only adds its startup time. Uncompressed saves are
+always loaded in one process, so only compressed codecs are compared.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from save_codecs import build_game
+from pyworld.models.chunked import ChunkedSave
+
+def bench(path: str, workers: int, repeat: int = 3) -> float:
+    """Best of repeat load times"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ChunkedSave(path).load(workers=workers, threshold=0)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main(counts):
+    workers = max(os.cpu_count() or 1, 2)
+    with tempfile.TemporaryDirectory() as save_dir:
+        path = os.path.join(save_dir, 'bench.pwc')
+        print(f"{os.cpu_count()} CPUs")
+        print(f"{'regions':>8} {'codec':>6} {'1 process (s)':>14} {f'{workers} workers (s)':>15} {'speedup':>8}")
+        for count in counts:
+            game_state = build_game(count)
+            for codec in ('zlib', 'lzma'):
+                ChunkedSave(path, codec=codec).save(game_state)
+                single = bench(path, 1)
+                pooled = bench(path, workers)
+                print(f"{count:>8} {codec:>6} {single:>14.3f} {pooled:>15.3f} {single / pooled:>7.2f}x")
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000])
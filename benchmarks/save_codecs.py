@@ -0,0 +1,63 @@
+"""Compare save file size and speed per codec on large generated universes
+
+Run from the repository root:
+
+    python benchmarks/save_codecs.py [region counts...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from pyworld.models import save_format
+from pyworld.models.game_state import GameState
+from pyworld.models.universe import Region
+
+def build_game(region_count: int) -> GameState:
+    """Get a game whose universe is padded out to region_count regions"""
+    random.seed(region_count)
+    game_state = GameState()
+    universe = game_state.universe
+    side = int(region_count ** 0.5) + 1
+    regions = []
+    for i in range(region_count - len(universe.regions)):
+        region = Region(f"Sector {i}", random.randint(1, 3), (i % side, i // side))
+        universe.regions[region.name] = region
+        universe.connections[region] = set()
+        regions.append(region)
+    # Link each new region to its grid neighbour
+    for a, b in zip(regions, regions[1:]):
+        universe.connections[a].add(b)
+        universe.connections[b].add(a)
+    return game_state
+
+def bench(game_state: GameState, codec: str, path: str):
+    snapshot = save_format.snapshot_game(game_state)
+    start = time.perf_counter()
+    with open(path, 'wb') as f:
+        save_format.write_container(f, snapshot, codec=codec)
+    write_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    save_format.read_sections(path)
+    read_time = time.perf_counter() - start
+    return os.path.getsize(path), write_time, read_time
+
+def main(counts):
+    fd, path = tempfile.mkstemp(suffix='.pws')
+    os.close(fd)
+    try:
+        print(f"{'regions':>8} {'codec':>6} {'size (KiB)':>11} {'write (s)':>10} {'read (s)':>9}")
+        for count in counts:
+            game_state = build_game(count)
+            for codec in save_format.CODECS:
+                size, write_time, read_time = bench(game_state, codec, path)
+                print(f"{count:>8} {codec:>6} {size / 1024:>11.0f} {write_time:>10.3f} {read_time:>9.3f}")
+    finally:
+        os.remove(path)
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000])
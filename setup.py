@@ -6,6 +6,7 @@ setup(
     packages=find_packages(where="src"),
     package_dir={"": "src"},
     install_requires=[
+        "numpy",
         "pytest>=8.3.4",
     ],
     python_requires=">=3.8",
@@ -1,4 +1,5 @@
 from .models.game_state import GameState
+from .models.save_manager import SaveManager
 from .ui.main_window import MainWindow
 
 def main():
@@ -6,8 +7,8 @@ def main():
     # Initialize game state
     game_state = GameState()
     
-    # Create and run main window
-    window = MainWindow(game_state)
+    # Create and run main window, autosaving in the background
+    window = MainWindow(game_state, SaveManager().autosave())
     window.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,61 @@
+"""Upgrade every save in a directory to the current save formats
+
+From the project root directory:
+
+    python -m src.pyworld.migrate [saves_dir] [--workers N]
+
+Each save is migrated in its own process, so a directory of large saves
+is upgraded in parallel.
+"""
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse
+import sys
+from .models import migrations, save_format
+from .models.save_manager import SAVE_EXTENSION
+
+def migrate_file(path: str) -> Tuple[str, str]:
+    """Migrate one save, returns (path, outcome)"""
+    try:
+        if path.endswith('.json'):
+            migrated = migrations.migrate_json(path)
+        else:
+            migrated = migrations.migrate_binary(path)
+    except (OSError, ValueError) as e:
+        return path, f"failed: {e}"
+    return path, "migrated" if migrated else "up to date"
+
+def save_paths(save_dir: Path) -> List[str]:
+    """Get the saves in a directory that have a versioned format"""
+    return sorted(
+        str(path) for pattern in (f"*{SAVE_EXTENSION}", "*.json") for path in save_dir.glob(pattern)
+    )
+
+def migrate_dir(save_dir: Path, workers: Optional[int] = None) -> Dict[str, str]:
+    """Migrate every save in a directory in parallel, returns the outcome per save"""
+    paths = save_paths(save_dir)
+    if not paths:
+        return {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return dict(pool.map(migrate_file, paths))
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Upgrade saves to the current save formats")
+    parser.add_argument("save_dir", nargs="?", default="saves", help="directory of saves (default: saves)")
+    parser.add_argument("--workers", type=int, default=None, help="processes to use (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    save_dir = Path(args.save_dir)
+    if not save_dir.is_dir():
+        parser.error(f"{save_dir} is not a directory")
+
+    results = migrate_dir(save_dir, args.workers)
+    for path, outcome in results.items():
+        print(f"{Path(path).name}: {outcome}")
+    print(f"JSON schema {migrations.SCHEMA_VERSION}, binary format {save_format.FORMAT_VERSION}: "
+          f"{len(results)} saves checked")
+    return 1 if any(outcome.startswith("failed") for outcome in results.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+from typing import Dict, Optional, Union
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+import logging
+import os
+from . import save_format
+
+logger = logging.getLogger(__name__)
+
+class AutosaveService:
+    """Saves the game periodically without stalling the caller
+
+    The caller's thread (the Tk thread in the UI) takes the snapshot,
+    since the game must not change while it is read. Region tables are
+    kept packed between saves (see save_format.RegionTables), so that
+    only repacks the regions changed since the last save plus the small
+    fleet, station and claim tables. The first save of a generated
+    universe packs it whole; a loaded one reuses the tables of its save.
+    Compression and writing happen on a worker thread, which writes to a
+    temp file and renames it over the save so a crash never leaves a
+    partial save. Failures are logged and kept in last_error.
+    """
+
+    def __init__(self, path: Union[str, Path], interval: timedelta = timedelta(minutes=5),
+                 codec: str = 'zlib'):
+        self.path = Path(path)
+        self.interval = interval
+        self.codec = codec
+        self.last_save: Optional[datetime] = None  # When the last snapshot was taken
+        self.last_error: Optional[Exception] = None
+        self.saves = 0  # Completed saves
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autosave")
+        self._pending: Optional[Future] = None
+
+    @property
+    def busy(self) -> bool:
+        """Check if a save is still being written"""
+        return self._pending is not None and not self._pending.done()
+
+    def due(self, now: Optional[datetime] = None) -> bool:
+        """Check if the interval has passed since the last save"""
+        if self.last_save is None:
+            return True
+        return (now or datetime.now()) - self.last_save >= self.interval
+
+    def tick(self, game_state, now: Optional[datetime] = None) -> bool:
+        """Start a save if one is due and none is running, returns True if started"""
+        now = now or datetime.now()
+        if self.busy or not self.due(now):
+            return False
+        self.save(game_state, now)
+        return True
+
+    def save(self, game_state, now: Optional[datetime] = None) -> Future:
+        """Snapshot the game now and write it in the background"""
+        tables = save_format.region_tables(game_state.universe)
+        snapshot = save_format.snapshot_game(game_state, tables=tables)
+        self.last_save = now or datetime.now()
+        self._pending = self._executor.submit(self._write, snapshot)
+        return self._pending
+
+    def _write(self, snapshot: Dict[str, save_format.Section]) -> bool:
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        try:
+            with open(temp_path, 'wb') as f:
+                save_format.write_container(f, snapshot, codec=self.codec)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            # Nothing waits on the worker, so report the failure rather than
+            # leave it in a future no one reads
+            logger.exception("Autosave to %s failed", self.path)
+            self.last_error = e
+            if temp_path.exists():
+                os.remove(temp_path)
+            return False
+        self.last_error = None
+        self.saves += 1
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the running save, returns True if it succeeded"""
+        if self._pending is None:
+            return True
+        return self._pending.result(timeout)
+
+    def shutdown(self):
+        """Finish the running save and stop the worker"""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,27 @@
+from typing import Any, Callable, Dict, List
+
+ChangeListener = Callable[[str, Any, Dict[str, Any]], None]
+
+class ChangeFeed:
+    """Tells subscribers about state changes made outside the ledger
+
+    Models holding a feed publish a kind ('travel', 'grant', ...), the
+    object that changed and any details the object no longer holds.
+    """
+
+    def __init__(self):
+        self._listeners: List[ChangeListener] = []
+
+    def subscribe(self, listener: ChangeListener):
+        """Call listener(kind, subject, details) for every change"""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: ChangeListener):
+        """Stop calling a listener"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def publish(self, kind: str, subject, **details):
+        """Announce a change"""
+        for listener in self._listeners:
+            listener(kind, subject, details)
@@ -0,0 +1,307 @@
+from typing import Dict, List, Optional, Set, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+import gc
+import io
+import os
+import struct
+import zlib
+from . import save_format
+from .save_format import SaveFormatError, StringTable
+from .universe import Universe, Region
+
+CHUNKED_MAGIC = b'PYWCHNK\0'
+CHUNKED_VERSION = 1
+# magic, version, regions per chunk, directory offset, directory length, directory crc32
+CHUNKED_HEADER = struct.Struct('<8sHIQQI')
+ENTRY = struct.Struct('<iQQI')  # chunk index (-1 for the game chunk), offset, length, crc32
+GAME_CHUNK = -1
+REGIONS_PER_CHUNK = 1024
+# Bytes of region chunks below which a load stays in one process, as
+# starting a pool would take longer than the reads it saves
+PARALLEL_THRESHOLD = 32 << 20
+
+def _read_chunk_sections(path: Path, entry: Tuple[int, int, int, int]) -> Dict[str, bytes]:
+    """Read, verify and decompress one chunk in a worker process
+
+    The sections come back as plain bytes, which are cheap to send
+    between processes; the objects are built by the loading process, as
+    unpickling regions costs more than decoding them.
+    """
+    index, offset, length, crc = entry
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(length)
+    if len(data) < length or zlib.crc32(data) != crc:
+        raise SaveFormatError(f"Chunk {index} is corrupt")
+    return {name: bytes(view) for name, view in save_format.read_container(data)[2].items()}
+
+class ChunkedSave:
+    """Keeps a game in a save file of independently written chunks
+
+    Regions are grouped into fixed blocks of regions_per_chunk by region
+    id; each block (its regions, deposits, grants and connections) is one
+    chunk, and everything else is the game chunk. Every chunk is a small
+    save container of its own, listed in a directory with its crc32, so a
+    reader can verify and read any chunk on its own.
+
+    Saving appends only the chunks whose regions are dirty, plus the game
+    chunk, then a new directory, and finally points the header at it; a
+    crash part way leaves the previous directory in charge. Once stale
+    chunks take up more than half the file it is rewritten from scratch.
+    """
+
+    def __init__(self, path: Union[str, Path], regions_per_chunk: int = REGIONS_PER_CHUNK,
+                 codec: str = 'none'):
+        self.path = Path(path)
+        self.regions_per_chunk = regions_per_chunk
+        self.codec = codec  # Compression within each chunk
+        self.game_state = None  # The game the file holds
+        self._regions: List[Region] = []  # By region id
+        self._region_ids: Dict[Region, int] = {}
+        self._directory: Dict[int, Tuple[int, int, int]] = {}  # Chunk index -> offset, length, crc32
+
+    def close(self):
+        """Nothing is held open between saves"""
+
+    # Saving
+
+    def _encode_chunk(self, sections: Dict[str, save_format.Section]) -> bytes:
+        f = io.BytesIO()
+        save_format.write_container(f, sections, codec=self.codec)
+        return f.getvalue()
+
+    def _region_chunk(self, universe: Universe, index: int) -> bytes:
+        size = self.regions_per_chunk
+        regions = self._regions[index * size:(index + 1) * size]
+        strings = StringTable()
+        sections = save_format.snapshot_regions(regions, strings)
+        sections.update(save_format.snapshot_links(universe, regions, self._region_ids))
+        sections['strings'] = strings.encode()
+        return self._encode_chunk(sections)
+
+    def _game_chunk(self, game_state) -> bytes:
+        strings = StringTable()
+        sections = save_format.snapshot_state(game_state, strings, self._region_ids)
+        sections['strings'] = strings.encode()
+        return self._encode_chunk(sections)
+
+    def _dirty_chunks(self, universe: Universe) -> Set[int]:
+        """Give new regions ids and find the chunks with changed regions"""
+        size = self.regions_per_chunk
+        dirty = set()
+        for region in universe.loaded_regions():
+            region_id = self._region_ids.get(region)
+            if region_id is None:
+                region_id = self._region_ids[region] = len(self._regions)
+                self._regions.append(region)
+                dirty.add(region_id // size)
+            elif region.dirty:
+                dirty.add(region_id // size)
+        return dirty
+
+    def save(self, game_state) -> int:
+        """Write the chunks that changed, returns how many region chunks were written
+
+        A game this save did not load or write before, or one that lost
+        regions, is written in full.
+        """
+        universe = game_state.universe
+        if (game_state is not self.game_state or not self.path.exists()
+                or len(universe.regions) < len(self._regions)):
+            return self._write_all(game_state)
+
+        dirty = self._dirty_chunks(universe)
+        chunks = [(index, self._region_chunk(universe, index)) for index in sorted(dirty)]
+        chunks.append((GAME_CHUNK, self._game_chunk(game_state)))
+
+        with open(self.path, 'r+b') as f:
+            end = f.seek(0, os.SEEK_END)
+            directory = dict(self._directory)
+            for index, data in chunks:
+                directory[index] = (end, len(data), zlib.crc32(data))
+                f.write(data)
+                end += len(data)
+            self._write_directory(f, directory, end)
+        self._directory = directory
+        self._mark_clean(dirty)
+
+        live = sum(length for _, length, _ in directory.values())
+        if self.path.stat().st_size > 2 * live:
+            self._write_all(game_state)
+        return len(dirty)
+
+    def _write_all(self, game_state) -> int:
+        self.game_state = game_state
+        self._regions = list(game_state.universe.regions.values())
+        self._region_ids = {region: i for i, region in enumerate(self._regions)}
+        count = -(-len(self._regions) // self.regions_per_chunk)
+
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        directory = {}
+        with open(temp_path, 'wb') as f:
+            f.write(b'\0' * CHUNKED_HEADER.size)
+            end = CHUNKED_HEADER.size
+            for index in [GAME_CHUNK] + list(range(count)):
+                if index == GAME_CHUNK:
+                    data = self._game_chunk(game_state)
+                else:
+                    data = self._region_chunk(game_state.universe, index)
+                directory[index] = (end, len(data), zlib.crc32(data))
+                f.write(data)
+                end += len(data)
+            self._write_directory(f, directory, end)
+        os.replace(temp_path, self.path)
+        self._directory = directory
+        self._mark_clean(range(count))
+        return count
+
+    def _write_directory(self, f, directory: Dict[int, Tuple[int, int, int]], end: int):
+        """Append the directory, then point the header at it once it is on disk"""
+        data = b''.join(ENTRY.pack(index, *entry) for index, entry in sorted(directory.items()))
+        f.seek(end)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+        f.seek(0)
+        f.write(CHUNKED_HEADER.pack(
+            CHUNKED_MAGIC, CHUNKED_VERSION, self.regions_per_chunk, end, len(data), zlib.crc32(data)
+        ))
+        f.flush()
+        os.fsync(f.fileno())
+
+    def _mark_clean(self, chunks):
+        size = self.regions_per_chunk
+        for index in chunks:
+            for region in self._regions[index * size:(index + 1) * size]:
+                region.mark_clean()
+
+    # Reading
+
+    @staticmethod
+    def read_directory(f) -> Tuple[int, Dict[int, Tuple[int, int, int]]]:
+        """Get (regions per chunk, chunk index -> (offset, length, crc32)) from an open file"""
+        header = f.read(CHUNKED_HEADER.size)
+        if len(header) < CHUNKED_HEADER.size:
+            raise SaveFormatError("Save file is truncated")
+        magic, version, regions_per_chunk, offset, length, crc = CHUNKED_HEADER.unpack(header)
+        if magic != CHUNKED_MAGIC:
+            raise SaveFormatError("Not a chunked save file")
+        if version > CHUNKED_VERSION:
+            raise SaveFormatError(f"Chunked save version {version} is newer than supported ({CHUNKED_VERSION})")
+        f.seek(offset)
+        data = f.read(length)
+        if len(data) < length or zlib.crc32(data) != crc:
+            raise SaveFormatError("Chunk directory is corrupt")
+        directory = {}
+        for start in range(0, length, ENTRY.size):
+            index, *entry = ENTRY.unpack_from(data, start)
+            directory[index] = tuple(entry)
+        return regions_per_chunk, directory
+
+    def read_chunk(self, f, index: int) -> Dict[str, memoryview]:
+        """Read and verify one chunk's sections from an open file"""
+        if index not in self._directory:
+            raise SaveFormatError(f"Chunk {index} is not in the save")
+        offset, length, crc = self._directory[index]
+        f.seek(offset)
+        data = f.read(length)
+        if len(data) < length or zlib.crc32(data) != crc:
+            raise SaveFormatError(f"Chunk {index} is corrupt")
+        return save_format.read_container(data)[2]
+
+    def load_regions(self, index: int) -> List[Region]:
+        """Read, verify and rebuild the regions of one chunk, without their connections"""
+        with open(self.path, 'rb') as f:
+            self.regions_per_chunk, self._directory = self.read_directory(f)
+            sections = self.read_chunk(f, index)
+        return save_format.decode_regions(sections, StringTable.decode(sections['strings']))
+
+    def verify(self) -> List[int]:
+        """Get the indexes of chunks whose checksums do not match"""
+        bad = []
+        with open(self.path, 'rb') as f:
+            self.regions_per_chunk, self._directory = self.read_directory(f)
+            for index in self._directory:
+                try:
+                    self.read_chunk(f, index)
+                except SaveFormatError:
+                    bad.append(index)
+        return bad
+
+    def read_meta(self) -> dict:
+        """Get the game chunk's settings without reading the regions"""
+        with open(self.path, 'rb') as f:
+            self.regions_per_chunk, self._directory = self.read_directory(f)
+            return save_format.read_meta(self.read_chunk(f, GAME_CHUNK))
+
+    def load(self, workers: Optional[int] = None, threshold: int = PARALLEL_THRESHOLD):
+        """Read and verify every chunk and rebuild the game
+
+        Saves with more than threshold bytes of compressed region chunks
+        have them read, verified and decompressed by a pool of worker
+        processes (one per CPU by default). Only that I/O and
+        decompression runs in the pool: this process decodes the
+        sections into regions as they arrive. Uncompressed saves are read
+        in this process alone, as the workers would only copy bytes.
+        """
+        # Like load_sections, nothing created while loading is garbage
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self._load(workers, threshold)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _compressed(self, f, indexes: List[int]) -> bool:
+        """Check if any of the chunks has to be decompressed, from their headers"""
+        for index in indexes:
+            f.seek(self._directory[index][0])
+            _, version, codec, _ = save_format.HEADER.unpack(f.read(save_format.HEADER.size))
+            if codec and version > 1:
+                return True
+        return False
+
+    def _read_chunks(self, workers: Optional[int], threshold: int):
+        """Get the sections of every region chunk, in order"""
+        indexes = sorted(i for i in self._directory if i != GAME_CHUNK)
+        size = sum(self._directory[i][1] for i in indexes)
+        workers = min(workers or os.cpu_count() or 1, len(indexes))
+        with open(self.path, 'rb') as f:
+            if workers < 2 or size <= threshold or not self._compressed(f, indexes):
+                for index in indexes:
+                    yield self.read_chunk(f, index)
+                return
+
+        entries = [(index, *self._directory[index]) for index in indexes]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(_read_chunk_sections, repeat(self.path), entries)
+
+    def _load(self, workers: Optional[int], threshold: int):
+        from .game_state import GameState
+
+        game_state = GameState.empty()
+        universe = Universe(generate=False)
+        regions: List[Region] = []
+        links = []
+        with open(self.path, 'rb') as f:
+            self.regions_per_chunk, self._directory = self.read_directory(f)
+            game = self.read_chunk(f, GAME_CHUNK)
+        for sections in self._read_chunks(workers, threshold):
+            strings = StringTable.decode(sections['strings'])
+            regions.extend(save_format.decode_regions(sections, strings))
+            links.append(sections)
+
+        universe.regions = {region.name: region for region in regions}
+        universe.connections = {region: set() for region in regions}
+        for sections in links:
+            save_format.decode_links(sections, universe, regions)
+
+        game_strings = StringTable.decode(game['strings'])
+        save_format.decode_state(game_state, game, game_strings, universe, regions)
+        self.game_state = game_state
+        self._regions = regions
+        self._region_ids = {region: i for i, region in enumerate(regions)}
+        return game_state
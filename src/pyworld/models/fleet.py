@@ -1,11 +1,15 @@
 from datetime import datetime, timedelta
 from typing import Dict, Optional, List
 from .universe import RegionVisibility
+from .history import TimeSeriesHistory
+from .resources import ResourceVector
+from .changes import ChangeFeed
+from .ledger import Ledger, LedgerError, FleetAccount
 
 class Fleet:
     """Represents a fleet of ships"""
     
-    def __init__(self, name: str = "Fleet"):
+    def __init__(self, name: str = "Fleet", ledger: Optional[Ledger] = None):
         self.id = id(self)  # Use object's memory address as ID
         self.name = name
         self.level = 1
@@ -20,6 +24,7 @@ class Fleet:
             'gas': 0,
             'energy': 0
         }
+        self.resource_history: Dict[str, TimeSeriesHistory] = {}
         
         # Travel state
         self.current_region = None
@@ -37,6 +42,13 @@ class Fleet:
         # Upgrade state
         self.upgrade_start = None
         self.upgrade_end = None
+        
+        self.changes: Optional[ChangeFeed] = None  # Set by the game that owns the fleet
+        self.ledger = ledger  # The owning game's ledger, which records cargo entering the fleet
+    
+    def _publish(self, kind: str, **details):
+        if self.changes is not None:
+            self.changes.publish(kind, self, **details)
     
     @property
     def storage_capacity(self) -> float:
@@ -46,7 +58,16 @@ class Fleet:
     @property
     def storage_used(self) -> float:
         """Get the current storage used"""
-        return sum(self.resources.values())
+        return self.resources.total()
+    
+    @property
+    def resources(self) -> ResourceVector:
+        """Get the fleet's cargo"""
+        return self._resources
+    
+    @resources.setter
+    def resources(self, values):
+        self._resources = ResourceVector(values)
     
     @property
     def current_location(self) -> str:
@@ -55,20 +76,39 @@ class Fleet:
             return self.current_region.name
         return "Unknown"
     
+    @property
+    def account(self) -> FleetAccount:
+        """Get the ledger account for the fleet's cargo"""
+        return FleetAccount(self)
+    
     def add_resource(self, resource_type: str, amount: float) -> float:
-        """Add resources to the fleet's storage, returns the amount actually added"""
+        """Add resources to the fleet's storage, returns the amount actually added
+
+        Raises LedgerError if the fleet has no ledger to record them in.
+        """
+        if self.ledger is None:
+            raise LedgerError(f"{self.name} is not part of a game's ledger.")
         if resource_type not in self.resources:
             self.resources[resource_type] = 0
             
         # Check storage capacity
         available_storage = self.storage_capacity - self.storage_used
-        amount_to_add = min(amount, available_storage)
+        amount_to_add = max(0, min(amount, available_storage))
         
-        # Add resources
-        self.resources[resource_type] += amount_to_add
+        # Resources enter the economy through the ledger
+        self.ledger.transfer(self.ledger.world, self.account, resource_type, amount_to_add, memo="collect")
         
         return amount_to_add
     
+    def record_resources(self, timestamp: Optional[float] = None):
+        """Sample current resource amounts into their histories"""
+        timestamp = timestamp if timestamp is not None else datetime.now().timestamp()
+        for resource_type, amount in self.resources.items():
+            history = self.resource_history.get(resource_type)
+            if history is None:
+                history = self.resource_history[resource_type] = TimeSeriesHistory()
+            history.record(timestamp, amount)
+    
     def get_resource_capacity(self, resource_type: str) -> float:
         """Get the capacity for a specific resource"""
         return self.storage_capacity
@@ -89,6 +129,7 @@ class Fleet:
         self.travel_start = datetime.now()
         self.travel_end = self.travel_start + timedelta(hours=travel_hours)
         self.is_traveling = True
+        self._publish('travel')
     
     def complete_travel(self):
         """Complete the travel, updating location"""
@@ -100,6 +141,7 @@ class Fleet:
         self.is_traveling = False
         self.travel_start = None
         self.travel_end = None
+        self._publish('arrive')
     
     def start_probing(self, region):
         """Start probing a region"""
@@ -120,6 +162,7 @@ class Fleet:
         self.probe_region = region
         self.probe_start = datetime.now()
         self.probe_end = self.probe_start + timedelta(hours=probe_hours)
+        self._publish('probe')
     
     def complete_probing(self):
         """Complete the probing process"""
@@ -143,10 +186,12 @@ class Fleet:
                 extraction_times[deposit.resource_type] = base_time * (1 + (self.probe_region.level - 1) * 0.5)
         
         # Reset probing state
+        region = self.probe_region
         self.is_probing = False
         self.probe_region = None
         self.probe_start = None
         self.probe_end = None
+        self._publish('probed', region=region)
         
         return True
     
@@ -185,6 +230,8 @@ class Fleet:
         # Check if probing is complete
         if self.is_probing and datetime.now() >= self.probe_end:
             self.complete_probing()
+        
+        self.record_resources()
 
     def to_dict(self):
         """Convert the fleet data to a dictionary for serialization."""
@@ -193,8 +240,12 @@ class Fleet:
             'level': self.level,
             'ship_type': self.ship_type,
             'current_location': self.current_location,
-            'resources': self.resources,
+            'resources': self.resources.to_dict(),
             'storage': {'capacity': self.storage_capacity},
+            'mining_drones': self.mining_drones,
+            'max_drones': self.max_drones,
+            'gas_collectors': self.gas_collectors,
+            'max_collectors': self.max_collectors,
             'travel': {
                 'is_traveling': self.is_traveling,
                 'current_region': self.current_region,
@@ -231,12 +282,14 @@ class Fleet:
         fleet.resources = data['resources']
         fleet._storage_capacity = data['storage']['capacity']
         
-        # Set default values for max_drones and max_collectors if not present
-        fleet.max_drones = data.get('max_drones', 1)
-        fleet.max_collectors = data.get('max_collectors', 1)
+        # Older saves are migrated to have every field (see models/migrations.py)
+        fleet.mining_drones = data['mining_drones']
+        fleet.max_drones = data['max_drones']
+        fleet.gas_collectors = data['gas_collectors']
+        fleet.max_collectors = data['max_collectors']
         
         # Set upgrade state
-        fleet.upgrade_start = data.get('upgrade', {}).get('upgrade_start')
-        fleet.upgrade_end = data.get('upgrade', {}).get('upgrade_end')
+        fleet.upgrade_start = data['upgrade']['upgrade_start']
+        fleet.upgrade_end = data['upgrade']['upgrade_end']
         
         return fleet 
\ No newline at end of file
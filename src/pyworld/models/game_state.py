@@ -2,8 +2,20 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 from .ship import Mothership
 from .station import SpaceStation
+from .market import MarketNetwork
 from .universe import Universe, Region, RegionClaim
 from .fleet import Fleet
+from .resources import ResourceVector
+from .changes import ChangeFeed
+from .ledger import Ledger, LedgerError, CreditsAccount, FleetAccount, Transfer
+
+# Credits value of fleet cargo for asset valuation
+RESOURCE_VALUES = ResourceVector({
+    'metal': 10,
+    'gas': 15,
+    'refined_metal': 25,
+    'refined_gas': 35
+})
 
 class Building:
     def __init__(self, level, base_production=None, base_capacity=None, cost=None, build_time=60):
@@ -36,32 +48,54 @@ class Building:
 class GameState:
     """Main game state class"""
     
-    def __init__(self):
-        """Initialize game state"""
+    def __init__(self, generate: bool = True):
+        """Initialize game state
+
+        Without generate the game starts empty: no regions, fleets, claims
+        or stations, for loading to fill in from a save.
+        """
         # Corporation info
         self.corporation_name = "Nova Mining Corp"
         self.credits = 10000
         self.total_assets = self.credits
         
+        # All resource and credit movements go through the ledger
+        self.ledger = Ledger()
+        self.corporation_account = CreditsAccount(self)
+        
+        # Fleets, regions and claims announce their other changes here
+        self.changes = ChangeFeed()
+        
         # Universe
-        self.universe = Universe()
+        self.universe = Universe(generate)
         self.current_region = self.universe.home_region
         
         # Fleet management
         self.fleets: List[Fleet] = []
         self.selected_fleet = None
-        self.add_starting_fleet()
+        if generate:
+            self.add_starting_fleet()
         
         # Claims
         self.available_claims: List[RegionClaim] = []
         self.active_claims: List[RegionClaim] = []
-        self._generate_initial_claims()
+        if generate:
+            self._generate_initial_claims()
+        self.connect_changes()
         
         # Time management
         self._last_asset_update = datetime.now()
+        self.playtime = 0.0  # Seconds played, across saves
         
-        # Initialize station
+        # The corporation's own ship, whose modules upgrade like a station's
+        self.mothership = Mothership()
+        
+        # Initialize stations
         self.station = SpaceStation()
+        self.market = MarketNetwork(self.universe, self.ledger)
+        if generate:
+            self.market.add_station(self.station, self.current_region)
+            self._generate_stations()
         
         # Game state
         self.is_traveling = False
@@ -109,9 +143,14 @@ class GameState:
         
         self.game_speed = 1.0  # Default game speed
     
+    @classmethod
+    def empty(cls) -> 'GameState':
+        """Create a game with nothing generated, to be filled in from a save"""
+        return cls(generate=False)
+    
     def add_starting_fleet(self):
         """Add the starting freighter fleet"""
-        fleet = Fleet("Fleet Alpha")
+        fleet = Fleet("Fleet Alpha", self.ledger)
         fleet.current_region = self.current_region  # Set the current region
         self.fleets.append(fleet)
         self.selected_fleet = fleet
@@ -120,6 +159,15 @@ class GameState:
         """Get the currently selected fleet"""
         return self.selected_fleet
     
+    @property
+    def current_fleet_id(self) -> Optional[int]:
+        """Get the ID of the selected fleet"""
+        return self.selected_fleet.id if self.selected_fleet else None
+    
+    @current_fleet_id.setter
+    def current_fleet_id(self, fleet_id: int):
+        self.set_current_fleet(fleet_id)
+    
     def set_current_fleet(self, fleet_id: int) -> bool:
         """Set the current fleet by ID"""
         fleet = next((f for f in self.fleets if f.id == fleet_id), None)
@@ -130,10 +178,20 @@ class GameState:
     
     def add_fleet(self, name: str, ship_type: str = "Freighter") -> Fleet:
         """Add a new fleet"""
-        fleet = Fleet(name, ship_type)
+        fleet = Fleet(name, self.ledger)
+        fleet.ship_type = ship_type
+        fleet.changes = self.changes
         self.fleets.append(fleet)
         return fleet
     
+    def connect_changes(self):
+        """Have every fleet and region publish to the game's change feed and ledger"""
+        for fleet in self.fleets:
+            fleet.changes = self.changes
+            fleet.ledger = self.ledger
+        for region in self.universe.loaded_regions():
+            region.changes = self.changes
+    
     def remove_fleet(self, fleet_id: int) -> bool:
         """Remove a fleet by ID"""
         fleet = next((f for f in self.fleets if f.id == fleet_id), None)
@@ -155,6 +213,16 @@ class GameState:
                 claim = RegionClaim(region, duration=timedelta(hours=24))
                 self.available_claims.append(claim)
     
+    def _generate_stations(self):
+        """Open trading stations in the higher level regions"""
+        for region in self.universe.get_regions_by_level(2, 3):
+            if self.market.get_station(region) is None:
+                self.market.create_station(region)
+    
+    def get_station(self, region=None) -> Optional[SpaceStation]:
+        """Get the station in a region (defaults to the current region)"""
+        return self.market.get_station(region or self.current_region)
+    
     def get_available_claims(self) -> List[RegionClaim]:
         """Get a list of available claims"""
         return self.available_claims
@@ -181,11 +249,14 @@ class GameState:
         # Move from available to active
         self.available_claims.remove(claim)
         self.active_claims.append(claim)
+        self.changes.publish('claim', claim)
         
         return True
 
     def update(self, dt: float):
         """Update game state"""
+        self.playtime += dt
+        
         # Update universe
         self.universe.update()
         
@@ -193,10 +264,22 @@ class GameState:
         for fleet in self.fleets:
             fleet.update(dt)
         
-        # Update total assets periodically (once per second)
+        # Finish module upgrades that are due
         now = datetime.now()
+        self.mothership.update_upgrades(now)
+        for station in self.market.stations:
+            station.update_upgrades(now)
+        
+        # Update total assets periodically (once per second)
         if (now - self._last_asset_update).total_seconds() >= 1.0:
             self.update_total_assets()
+            # The player's station is sampled throughout for its charts;
+            # others only while their prices move
+            for station in self.market.stations:
+                if station is self.station:
+                    station.update_trades(now)
+                elif station.prices_moving:
+                    station.update_trades(now, moving_only=True)
             self._last_asset_update = now
     
     def update_total_assets(self):
@@ -213,17 +296,7 @@ class GameState:
             collector_value = 750 * fleet.gas_collectors
             
             # Add value of resources
-            resource_values = {
-                'metal': 10,
-                'gas': 15,
-                'refined_metal': 25,
-                'refined_gas': 35
-            }
-            resource_value = sum(
-                amount * resource_values.get(resource, 0)
-                for resource, amount in fleet.resources.items()
-                if resource != 'energy'
-            )
+            resource_value = fleet.resources.dot(RESOURCE_VALUES)
             
             total += ship_value + drone_value + collector_value + resource_value
         
@@ -231,34 +304,36 @@ class GameState:
         if abs(self.total_assets - total) / (self.total_assets + 1) > 0.001:
             self.total_assets = total
     
-    def can_afford(self, costs: dict) -> bool:
-        """Check if we can afford the specified costs"""
-        if 'credits' in costs and costs['credits'] > self.credits:
-            return False
-        
+    def _cost_transfers(self, costs: dict) -> Optional[List[Transfer]]:
+        """Build the transfers paying costs from the corporation and current fleet"""
         current_fleet = self.get_current_fleet()
         if not current_fleet:
-            return False
+            return None
         
-        for resource, amount in costs.items():
-            if resource != 'credits':
-                if current_fleet.resources.get(resource, 0) < amount:
-                    return False
-        return True
+        fleet_account = FleetAccount(current_fleet)
+        return [
+            Transfer(
+                self.corporation_account if resource == 'credits' else fleet_account,
+                self.ledger.world, resource, amount
+            )
+            for resource, amount in costs.items()
+        ]
+    
+    def can_afford(self, costs: dict) -> bool:
+        """Check if we can afford the specified costs"""
+        transfers = self._cost_transfers(costs)
+        return transfers is not None and self.ledger.can_transfer(transfers)
     
     def deduct_resources(self, costs: dict) -> bool:
-        """Deduct resources if we can afford them"""
-        if not self.can_afford(costs):
+        """Deduct resources if we can afford them, all or nothing"""
+        transfers = self._cost_transfers(costs)
+        if transfers is None:
             return False
         
-        if 'credits' in costs:
-            self.credits -= costs['credits']
-        
-        current_fleet = self.get_current_fleet()
-        for resource, amount in costs.items():
-            if resource != 'credits':
-                current_fleet.remove_resource(resource, amount)
-        
+        try:
+            self.ledger.transfer_batch(transfers, memo="purchase")
+        except LedgerError:
+            return False
         return True
     
     @property
@@ -0,0 +1,176 @@
+from typing import Dict, Optional, Tuple
+import math
+import numpy as np
+
+class RingBuffer:
+    """Fixed-size buffer of timestamped samples
+
+    Each sample is a timestamp plus a row of `width` values. Once full,
+    new samples overwrite the oldest ones, so memory never grows past
+    capacity. Storage is allocated in growing chunks as samples arrive,
+    so a history that is rarely sampled stays small.
+    """
+
+    MIN_CHUNK = 16  # Samples allocated by the first append
+
+    def __init__(self, capacity: int, width: int = 1):
+        if capacity <= 0:
+            raise ValueError("Ring buffer capacity must be positive.")
+        self.capacity = capacity
+        self.width = width
+        self._times = np.zeros(0)
+        self._values = np.zeros((0, width))
+        self._next = 0  # Slot the next sample goes into
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def allocated(self) -> int:
+        """Get the number of samples there is storage for"""
+        return len(self._times)
+
+    def _grow(self):
+        # Until the buffer first fills, samples sit in slots 0..count-1
+        size = min(self.capacity, max(self.MIN_CHUNK, 2 * len(self._times)))
+        times = np.zeros(size)
+        values = np.zeros((size, self.width))
+        times[:self._count] = self._times[:self._count]
+        values[:self._count] = self._values[:self._count]
+        self._times, self._values = times, values
+
+    def append(self, timestamp: float, values):
+        """Add a sample, overwriting the oldest one when full"""
+        if self._next == len(self._times):
+            self._grow()
+        self._times[self._next] = timestamp
+        self._values[self._next] = values
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def last(self) -> Optional[Tuple[float, np.ndarray]]:
+        """Get the newest sample, if any"""
+        if not self._count:
+            return None
+        index = (self._next - 1) % self.capacity
+        return self._times[index], self._values[index].copy()
+
+    def _order(self) -> np.ndarray:
+        start = (self._next - self._count) % self.capacity
+        return (start + np.arange(self._count)) % self.capacity
+
+    def times(self) -> np.ndarray:
+        """Get sample timestamps, oldest first"""
+        return self._times[self._order()]
+
+    def values(self) -> np.ndarray:
+        """Get sample values as a (samples x width) array, oldest first"""
+        return self._values[self._order()]
+
+    def clear(self):
+        """Drop all samples"""
+        self._next = 0
+        self._count = 0
+
+class Rollup:
+    """Downsamples a stream into fixed-width time buckets
+
+    Buckets are aggregated incrementally as samples arrive; only the
+    currently open bucket is kept as running totals. Closed buckets store
+    (mean, min, max) for each column.
+    """
+
+    def __init__(self, bucket_seconds: float, capacity: int, width: int = 1):
+        self.bucket_seconds = bucket_seconds
+        self.width = width
+        self.buckets = RingBuffer(capacity, width * 3)
+        self._bucket_start: Optional[float] = None
+        self._sum = np.zeros(width)
+        self._min = np.zeros(width)
+        self._max = np.zeros(width)
+        self._count = 0
+
+    def add(self, timestamp: float, values):
+        """Fold a sample into its bucket"""
+        values = np.asarray(values, dtype=float)
+        bucket_start = math.floor(timestamp / self.bucket_seconds) * self.bucket_seconds
+
+        if self._bucket_start is not None and bucket_start != self._bucket_start:
+            self._close()
+
+        if not self._count:
+            self._bucket_start = bucket_start
+            self._sum[:] = values
+            self._min[:] = values
+            self._max[:] = values
+        else:
+            self._sum += values
+            np.minimum(self._min, values, out=self._min)
+            np.maximum(self._max, values, out=self._max)
+        self._count += 1
+
+    def _close(self):
+        if self._count:
+            row = np.concatenate((self._sum / self._count, self._min, self._max))
+            self.buckets.append(self._bucket_start, row)
+        self._bucket_start = None
+        self._count = 0
+
+    def series(self, include_open: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Get (bucket_starts, means, mins, maxes), oldest first
+
+        The arrays of values have shape (buckets x width). The still-open
+        bucket is included unless include_open is False.
+        """
+        times = self.buckets.times()
+        rows = self.buckets.values()
+        if include_open and self._count:
+            times = np.append(times, self._bucket_start)
+            open_row = np.concatenate((self._sum / self._count, self._min, self._max))
+            rows = np.vstack((rows, open_row))
+
+        w = self.width
+        return times, rows[:, :w], rows[:, w:2 * w], rows[:, 2 * w:]
+
+class TimeSeriesHistory:
+    """Bounded multi-resolution history of a value over time
+
+    Keeps raw samples plus per-minute and per-hour rollups, each in its own
+    fixed-size ring buffer. The default sizes cover ten minutes of raw
+    samples, a day of minutes and a month of hours.
+    """
+
+    RESOLUTIONS = {'minute': 60, 'hour': 3600}
+
+    def __init__(self, width: int = 1, raw_capacity: int = 600,
+                 minute_capacity: int = 1440, hour_capacity: int = 720,
+                 min_interval: float = 1.0):
+        self.width = width
+        self.min_interval = min_interval  # Minimum seconds between raw samples
+        self.raw = RingBuffer(raw_capacity, width)
+        self.rollups: Dict[str, Rollup] = {
+            'minute': Rollup(self.RESOLUTIONS['minute'], minute_capacity, width),
+            'hour': Rollup(self.RESOLUTIONS['hour'], hour_capacity, width)
+        }
+        self._last_sample: Optional[float] = None
+
+    def record(self, timestamp: float, values) -> bool:
+        """Record a sample, returns False if it came too soon after the last one"""
+        if self._last_sample is not None and timestamp - self._last_sample < self.min_interval:
+            return False
+
+        self._last_sample = timestamp
+        self.raw.append(timestamp, values)
+        for rollup in self.rollups.values():
+            rollup.add(timestamp, values)
+        return True
+
+    def series(self, resolution: str = 'raw') -> Tuple[np.ndarray, np.ndarray]:
+        """Get (timestamps, values) at a resolution; rollups report bucket means"""
+        if resolution == 'raw':
+            return self.raw.times(), self.raw.values()
+        if resolution not in self.rollups:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        times, means, _, _ = self.rollups[resolution].series()
+        return times, means
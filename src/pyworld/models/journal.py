@@ -0,0 +1,419 @@
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from datetime import datetime
+from pathlib import Path
+import json
+import os
+import struct
+import zlib
+from . import save_format
+from .ledger import FleetAccount, JournalEntry, StockAccount
+from .ship import Mothership
+from .resources import ResourceVector
+from .universe import Region, ResourceGrant, RegionVisibility
+
+WAL_MAGIC = b'PYWWAL\0\0'
+WAL_HEADER = struct.Struct('<8sQ')  # magic, checkpoint generation
+RECORD = struct.Struct('<II')  # payload length, crc32
+CHECKPOINT_BYTES = 1 << 20  # Log size that triggers a new checkpoint
+# Fleet fields saved with the checkpoint that change without an event
+FLEET_FIELDS = ('level', 'mining_drones', 'max_drones', 'gas_collectors', 'max_collectors', '_storage_capacity')
+
+def _timestamp(moment: Optional[datetime]) -> Optional[float]:
+    return moment.timestamp() if moment else None
+
+def _datetime(timestamp: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(timestamp) if timestamp is not None else None
+
+def _game_fields(game_state) -> dict:
+    """Get the game's own saved settings"""
+    fleets = game_state.fleets
+    current = game_state.get_current_fleet()
+    return {
+        'credits': game_state.credits,
+        'total_assets': game_state.total_assets,
+        'game_speed': game_state.game_speed,
+        'playtime': game_state.playtime,
+        'current_fleet': next((i for i, f in enumerate(fleets) if f is current), -1),
+        'buildings': {name: building.level for name, building in game_state.buildings.items()},
+        'mothership': game_state.mothership.to_dict()
+    }
+
+def _fleet_fields(fleet) -> dict:
+    """Get a fleet's saved fields other than its orders, which are logged as events"""
+    fields = {field: getattr(fleet, field) for field in FLEET_FIELDS}
+    fields['upgrade'] = [_timestamp(fleet.upgrade_start), _timestamp(fleet.upgrade_end)]
+    fields['resources'] = fleet.resources.to_dict()
+    return fields
+
+def _station_layout(station) -> tuple:
+    """Get what a station's checkpoint holds besides its stock"""
+    return (station.level, station.max_modules, station.stock_capacity,
+            tuple((m.type, m.level, m.efficiency) for m in station.modules))
+
+def _same_objects(objects: list, expected: list) -> bool:
+    return len(objects) == len(expected) and all(a is b for a, b in zip(objects, expected))
+
+class WriteAheadLog:
+    """Append-only file of change records written after a checkpoint
+
+    Each record is a length and crc32 followed by a JSON payload, so a
+    record torn by a crash is detected and everything before it is kept.
+    The header names the checkpoint generation the records apply to.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._pending: List[bytes] = []
+
+    @property
+    def size(self) -> int:
+        """Get the size of the log file plus records not yet written"""
+        written = self.path.stat().st_size if self.path.exists() else 0
+        return written + sum(len(record) for record in self._pending)
+
+    @property
+    def pending(self) -> int:
+        """Get the number of records not yet written"""
+        return len(self._pending)
+
+    def append(self, record: list):
+        """Buffer a record until the next flush"""
+        payload = json.dumps(record, separators=(',', ':')).encode('utf-8')
+        self._pending.append(RECORD.pack(len(payload), zlib.crc32(payload)) + payload)
+
+    def discard(self):
+        """Drop buffered records (a checkpoint already covers them)"""
+        self._pending.clear()
+
+    def flush(self, sync: bool = True) -> int:
+        """Append buffered records to the file, returns bytes written"""
+        if not self._pending:
+            return 0
+        data = b''.join(self._pending)
+        with open(self.path, 'ab') as f:
+            f.write(data)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        self._pending.clear()
+        return len(data)
+
+    def reset(self, generation: int):
+        """Start an empty log for a checkpoint generation"""
+        with open(self.path, 'wb') as f:
+            f.write(WAL_HEADER.pack(WAL_MAGIC, generation))
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending.clear()
+
+    def truncate(self, size: int):
+        """Cut the file back to size, e.g. to drop a torn record"""
+        with open(self.path, 'r+b') as f:
+            f.truncate(size)
+
+    @staticmethod
+    def read(path: Union[str, Path]) -> Tuple[Optional[int], List[list], int]:
+        """Get (generation, records, end of the last good record) from a log file"""
+        path = Path(path)
+        if not path.exists():
+            return None, [], 0
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < WAL_HEADER.size:
+            return None, [], 0
+        magic, generation = WAL_HEADER.unpack_from(data, 0)
+        if magic != WAL_MAGIC:
+            return None, [], 0
+
+        records = []
+        offset = WAL_HEADER.size
+        while offset + RECORD.size <= len(data):
+            length, crc = RECORD.unpack_from(data, offset)
+            start = offset + RECORD.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            records.append(json.loads(payload))
+            offset = start + length
+        return generation, records, offset
+
+class JournaledSave:
+    """Keeps a game saved as a checkpoint plus a write-ahead log of changes
+
+    Ledger transfers, fleet orders, grants, claims and scans are logged as
+    they happen; the game's settings and fleets' fields that changed some
+    other way are logged by save(), so it only writes what changed since
+    the last save. Once the log outgrows checkpoint_bytes, or fleets or
+    stations are added, removed or refitted, save() compacts everything
+    into a fresh checkpoint instead. Loading reads the checkpoint and
+    replays the log on top of it.
+    """
+
+    def __init__(self, game_state, path: Union[str, Path], checkpoint_bytes: int = CHECKPOINT_BYTES,
+                 codec: str = 'none'):
+        self.game_state = game_state
+        self.codec = codec  # Checkpoint compression
+        self.checkpoint_path = Path(path)
+        self.wal = WriteAheadLog(self.checkpoint_path.with_suffix('.wal'))
+        self.checkpoint_bytes = checkpoint_bytes
+        self.generation = 0  # No checkpoint written yet
+        self._attached = False
+        self._structure_changed = False
+        self._save_listeners: List[Callable[[], None]] = []
+        self._index_objects()
+
+    def _index_objects(self):
+        """Remember the object layout the checkpoint refers to by index"""
+        self._regions = list(self.game_state.universe.regions.values())
+        self._region_ids = {region: i for i, region in enumerate(self._regions)}
+        self._fleets = list(self.game_state.fleets)
+        self._stations = list(self.game_state.market.stations)
+        self._station_layouts = [_station_layout(s) for s in self._stations]
+        self._structure_changed = False
+        self._remember_fields()
+
+    def _remember_fields(self):
+        """Note the fields the log and checkpoint hold, to log only later changes"""
+        self._game_fields = _game_fields(self.game_state)
+        self._fleet_fields = [_fleet_fields(f) for f in self._fleets]
+
+    def attach(self):
+        """Start logging changes to the game"""
+        if not self._attached:
+            self.game_state.ledger.subscribe(self._on_entry)
+            self.game_state.changes.subscribe(self._on_change)
+            self._attached = True
+
+    def detach(self):
+        """Stop logging changes to the game"""
+        if self._attached:
+            self.game_state.ledger.unsubscribe(self._on_entry)
+            self.game_state.changes.unsubscribe(self._on_change)
+            self._attached = False
+
+    def on_save(self, listener: Callable[[], None]):
+        """Call listener after every save or checkpoint reaches the disk"""
+        self._save_listeners.append(listener)
+
+    def _saved(self):
+        for listener in self._save_listeners:
+            listener()
+
+    # Recording
+
+    def _fleet_index(self, fleet) -> Optional[int]:
+        index = next((i for i, f in enumerate(self._fleets) if f is fleet), None)
+        if index is None or not _same_objects(self.game_state.fleets, self._fleets):
+            self._structure_changed = True
+            return None
+        return index
+
+    def _region_id(self, region: Optional[Region]) -> Optional[int]:
+        if region is None:
+            return None
+        region_id = self._region_ids.get(region)
+        if region_id is None:
+            self._structure_changed = True
+        return region_id
+
+    def _account_ref(self, name: str) -> Optional[list]:
+        game_state = self.game_state
+        if name == game_state.corporation_account.name:
+            return ['corporation']
+        for i, fleet in enumerate(self._fleets):
+            if name == f"fleet:{fleet.id}":
+                return ['fleet', i]
+        for i, station in enumerate(self._stations):
+            if name == f"station:{station.name}":
+                return ['station', i]
+        return None  # The outside world and accounts the save does not hold
+
+    def _on_entry(self, entry: JournalEntry):
+        ref = self._account_ref(entry.account)
+        if ref is not None:
+            self.wal.append(['transfer', ref, entry.resource, entry.delta, entry.timestamp])
+
+    def _on_change(self, kind: str, subject, details: Dict):
+        if kind == 'grant':
+            grant = details['grant']
+            self.wal.append([
+                'grant', self._region_id(subject), subject.deposits.index(grant.deposit),
+                grant.corporation, _timestamp(grant.start_time), grant.duration.total_seconds()
+            ])
+        elif kind == 'claim':
+            self.wal.append([
+                'claim', self._region_id(subject.region), subject.corporation, _timestamp(subject.claimed_at)
+            ])
+        elif kind == 'explore':
+            self.wal.append(['explore', self._region_id(subject)])
+        else:
+            fleet = self._fleet_index(subject)
+            if fleet is None:
+                return
+            if kind == 'travel':
+                self.wal.append([
+                    'travel', fleet, self._region_id(subject.destination),
+                    _timestamp(subject.travel_start), _timestamp(subject.travel_end)
+                ])
+            elif kind == 'arrive':
+                self.wal.append(['arrive', fleet])
+            elif kind == 'probe':
+                self.wal.append([
+                    'probe', fleet, self._region_id(subject.probe_region),
+                    _timestamp(subject.probe_start), _timestamp(subject.probe_end)
+                ])
+            elif kind == 'probed':
+                self.wal.append(['probed', fleet, self._region_id(details['region'])])
+
+    # Saving
+
+    def needs_checkpoint(self) -> bool:
+        """Check if the next save must write a full checkpoint"""
+        game_state = self.game_state
+        return (
+            self.generation == 0
+            or self._structure_changed
+            or not _same_objects(game_state.fleets, self._fleets)
+            or not _same_objects(game_state.market.stations, self._stations)
+            or [_station_layout(s) for s in self._stations] != self._station_layouts
+            or self.wal.size > self.checkpoint_bytes
+        )
+
+    def _log_fields(self):
+        """Log the settings and fleet fields changed since they were last logged"""
+        game = _game_fields(self.game_state)
+        if game != self._game_fields:
+            self.wal.append(['game', game])
+            self._game_fields = game
+        for i, fleet in enumerate(self._fleets):
+            fields = _fleet_fields(fleet)
+            if fields != self._fleet_fields[i]:
+                self.wal.append(['fleet', i, fields])
+                self._fleet_fields[i] = fields
+
+    def save(self) -> int:
+        """Persist changes since the last save, returns bytes written"""
+        if self.needs_checkpoint():
+            return self.checkpoint()
+        self._log_fields()
+        written = self.wal.flush()
+        # Persisted entries no longer need to be kept in memory
+        self.game_state.ledger.truncate(self.game_state.ledger.last_seq)
+        self._saved()
+        return written
+
+    def checkpoint(self) -> int:
+        """Write a full snapshot and start a new log, returns bytes written"""
+        generation = self.generation + 1
+        temp_path = self.checkpoint_path.with_suffix('.tmp')
+        save_format.write_save(self.game_state, temp_path, {'generation': generation}, self.codec)
+        # A crash before the log is reset leaves an old generation log,
+        # which loading ignores because the checkpoint already covers it
+        os.replace(temp_path, self.checkpoint_path)
+        self.wal.reset(generation)
+        self.generation = generation
+        self._index_objects()
+        self.game_state.ledger.truncate(self.game_state.ledger.last_seq)
+        self._saved()
+        return self.checkpoint_path.stat().st_size
+
+    # Loading
+
+    @classmethod
+    def load(cls, path: Union[str, Path], checkpoint_bytes: int = CHECKPOINT_BYTES,
+             attach: bool = True, codec: str = 'none') -> 'JournaledSave':
+        """Load a checkpoint and replay its log"""
+        sections = save_format.read_sections(path)
+        generation = save_format.read_meta(sections).get('generation', 0)
+        journal = cls(save_format.load_sections(sections), path, checkpoint_bytes, codec)
+        journal.generation = generation
+
+        wal_generation, records, end = WriteAheadLog.read(journal.wal.path)
+        if generation and wal_generation == generation:
+            for record in records:
+                journal.replay(record)
+            journal._remember_fields()
+            if attach:
+                journal.wal.truncate(end)  # Drop a torn final record
+        elif generation and attach:
+            journal.wal.reset(generation)  # Stale or missing log
+
+        if attach:
+            journal.attach()
+        return journal
+
+    def replay(self, record: list):
+        """Apply one logged change to the game"""
+        game_state = self.game_state
+        kind = record[0]
+        if kind == 'transfer':
+            (account_kind, *index), resource, delta = record[1:4]
+            # Older logs did not note when transfers were made
+            timestamp = record[4] if len(record) > 4 else None
+            if account_kind == 'corporation':
+                account = game_state.corporation_account
+            elif account_kind == 'fleet':
+                account = FleetAccount(game_state.fleets[index[0]])
+            else:
+                # Prices re-anchor when the stock changed, not when it is replayed
+                account = StockAccount(game_state.market.stations[index[0]], _datetime(timestamp))
+            account.apply(resource, delta)
+        elif kind == 'grant':
+            region_id, deposit, corporation, start, duration = record[1:]
+            region = self._regions[region_id]
+            grant = ResourceGrant(region.deposits[deposit], corporation, duration)
+            grant.start_time = _datetime(start)
+            region.add_grant(grant)
+        elif kind == 'claim':
+            region_id, corporation, claimed_at = record[1:]
+            region = self._regions[region_id]
+            claim = next((c for c in game_state.available_claims if c.region is region), None)
+            if claim is not None:
+                claim.corporation = corporation
+                claim.claimed_at = _datetime(claimed_at)
+                claim.expiry = claim.claimed_at + claim.duration
+                game_state.available_claims.remove(claim)
+                game_state.active_claims.append(claim)
+        elif kind == 'explore':
+            region = self._regions[record[1]]
+            region.visibility = RegionVisibility.EXPLORED
+            region.discover_deposits()
+        elif kind == 'game':
+            fields = record[1]
+            for name in ('credits', 'total_assets', 'game_speed', 'playtime'):
+                setattr(game_state, name, fields[name])
+            current = fields['current_fleet']
+            game_state.selected_fleet = game_state.fleets[current] if current >= 0 else None
+            for name, level in fields['buildings'].items():
+                if name in game_state.buildings:
+                    game_state.buildings[name].level = level
+            if 'mothership' in fields:
+                game_state.mothership = Mothership.from_dict(fields['mothership'])
+        else:
+            fleet = game_state.fleets[record[1]]
+            if kind == 'travel':
+                fleet.destination = self._regions[record[2]]
+                fleet.travel_start = _datetime(record[3])
+                fleet.travel_end = _datetime(record[4])
+                fleet.is_traveling = True
+            elif kind == 'arrive':
+                fleet.complete_travel()
+            elif kind == 'probe':
+                fleet.probe_region = self._regions[record[2]]
+                fleet.probe_start = _datetime(record[3])
+                fleet.probe_end = _datetime(record[4])
+                fleet.is_probing = True
+            elif kind == 'fleet':
+                fields = record[2]
+                for name in FLEET_FIELDS:
+                    setattr(fleet, name, fields[name])
+                fleet.upgrade_start, fleet.upgrade_end = map(_datetime, fields['upgrade'])
+                fleet.resources = ResourceVector(fields['resources'])
+            elif kind == 'probed':
+                region = self._regions[record[2]]
+                region.visibility = RegionVisibility.EXPLORED
+                region.discover_deposits()
+                fleet.is_probing = False
+                fleet.probe_region = None
+                fleet.probe_start = None
+                fleet.probe_end = None
@@ -0,0 +1,282 @@
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from datetime import datetime
+
+MAX_JOURNAL_ENTRIES = 10000  # Journal entries kept in memory when nothing truncates them
+
+class LedgerError(ValueError):
+    """Raised when a transaction cannot be applied"""
+
+class Account(ABC):
+    """Something holding balances that the ledger can move resources between"""
+
+    unlimited = False
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def _key(self):
+        # Accounts of the same type wrapping the same holder are the same account
+        return (type(self), id(getattr(self, 'owner', self)))
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Account) and self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    @abstractmethod
+    def balance(self, resource: str) -> float:
+        """Get the current balance of a resource"""
+
+    def canonical(self) -> 'Account':
+        """Get the account the ledger books this account's changes to"""
+        return self
+
+    def validate(self, deltas: Dict[str, float]):
+        """Raise LedgerError if any of the net deltas cannot be applied
+
+        Once validate passes, apply must succeed for every delta, so a
+        batch never fails halfway through.
+        """
+        for resource, delta in deltas.items():
+            if self.balance(resource) + delta < -1e-9:
+                raise LedgerError(f"{self.name} has insufficient {resource}.")
+
+    @abstractmethod
+    def apply(self, resource: str, delta: float):
+        """Change a balance; only the ledger should call this"""
+
+class ResourceAccount(Account):
+    """Account backed by an owner's `resources` dict (ships, fleets)"""
+
+    def __init__(self, owner, name: Optional[str] = None):
+        super().__init__(name or owner.name)
+        self.owner = owner
+
+    def canonical(self) -> Account:
+        # Holders with their own account type (fleets) always book through it,
+        # so their limits are checked and their changes journaled under one name
+        account = getattr(self.owner, 'account', None)
+        return account if isinstance(account, Account) else self
+
+    def balance(self, resource: str) -> float:
+        return self.owner.resources.get(resource, 0)
+
+    def apply(self, resource: str, delta: float):
+        resources = self.owner.resources
+        resources[resource] = resources.get(resource, 0) + delta
+
+class FleetAccount(ResourceAccount):
+    """Fleet cargo account, limited by the fleet's shared storage"""
+
+    def __init__(self, fleet):
+        super().__init__(fleet, f"fleet:{fleet.id}")
+
+    def canonical(self) -> Account:
+        return self
+
+    def validate(self, deltas: Dict[str, float]):
+        super().validate(deltas)
+        added = sum(deltas.values())
+        if added > 0 and self.owner.storage_used + added > self.owner.storage_capacity + 1e-9:
+            raise LedgerError(f"{self.name} does not have enough storage.")
+
+class CreditsAccount(Account):
+    """Account backed by an owner's `credits` attribute (the corporation)"""
+
+    def __init__(self, owner, name: str = "corporation"):
+        super().__init__(name)
+        self.owner = owner
+
+    def balance(self, resource: str) -> float:
+        return self.owner.credits if resource == 'credits' else 0
+
+    def validate(self, deltas: Dict[str, float]):
+        for resource, delta in deltas.items():
+            if resource != 'credits' and delta != 0:
+                raise LedgerError(f"{self.name} only holds credits.")
+        super().validate(deltas)
+
+    def apply(self, resource: str, delta: float):
+        if resource != 'credits':
+            raise LedgerError(f"{self.name} only holds credits.")
+        self.owner.credits += delta
+
+class StockAccount(Account):
+    """Station stock account backed by its trade quantities
+
+    Stock changes re-anchor the trade's prices at now, e.g. the time a
+    replayed change was made, or at the trade's clock if now is None.
+    """
+
+    def __init__(self, station, now: Optional[datetime] = None):
+        super().__init__(f"station:{station.name}")
+        self.owner = self.station = station
+        self.now = now
+
+    def balance(self, resource: str) -> float:
+        trade = self.station.trades.get(resource)
+        return trade.quantity if trade else 0
+
+    def validate(self, deltas: Dict[str, float]):
+        super().validate(deltas)
+        for resource, delta in deltas.items():
+            if resource not in self.station.trades:
+                raise LedgerError(f"{self.name} does not trade {resource}.")
+            if delta > 0 and self.balance(resource) + delta > self.station.stock_capacity:
+                raise LedgerError(f"{self.name} cannot store more {resource}.")
+
+    def apply(self, resource: str, delta: float):
+        trade = self.station.trades[resource]
+        trade.set_quantity(trade.quantity + delta, self.now)
+
+class ExternalAccount(Account):
+    """Unlimited source and sink for everything entering or leaving the economy"""
+
+    unlimited = True
+
+    def balance(self, resource: str) -> float:
+        return 0
+
+    def validate(self, deltas: Dict[str, float]):
+        pass
+
+    def apply(self, resource: str, delta: float):
+        pass
+
+class Transfer(NamedTuple):
+    """Move an amount of a resource from one account to another"""
+    source: Account
+    target: Account
+    resource: str
+    amount: float
+
+class JournalEntry(NamedTuple):
+    """One balance change in the ledger journal"""
+    seq: int
+    txn_id: int
+    timestamp: float
+    account: str
+    resource: str
+    delta: float
+    memo: str
+
+class Ledger:
+    """Applies batches of transfers atomically and journals every change
+
+    A batch either applies completely or not at all. Every balance change
+    is appended to the journal, which persistence and analytics can read
+    incrementally with entries_since() instead of scanning game state.
+    Readers that persist entries truncate() them; otherwise only the
+    newest max_entries are kept (at most twice that many are held).
+    """
+
+    def __init__(self, max_entries: int = MAX_JOURNAL_ENTRIES):
+        self.world = ExternalAccount("world")
+        self.journal: List[JournalEntry] = []
+        self.max_entries = max_entries
+        self._next_seq = 1
+        self._next_txn = 1
+        self._listeners: List[Callable[[JournalEntry], None]] = []
+
+    @property
+    def last_seq(self) -> int:
+        """Get the sequence number of the newest journal entry (0 if none)"""
+        return self._next_seq - 1
+
+    def subscribe(self, listener: Callable[[JournalEntry], None]):
+        """Call listener with every new journal entry"""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[JournalEntry], None]):
+        """Stop calling a listener"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _net_deltas(self, transfers: Iterable[Transfer]) -> Dict[Account, Dict[str, float]]:
+        deltas: Dict[Account, Dict[str, float]] = {}
+        for transfer in transfers:
+            if transfer.amount < 0:
+                raise LedgerError("Transfer amounts cannot be negative.")
+            source_account, target_account = transfer.source.canonical(), transfer.target.canonical()
+            if source_account == target_account:
+                continue
+            source = deltas.setdefault(source_account, {})
+            target = deltas.setdefault(target_account, {})
+            source[transfer.resource] = source.get(transfer.resource, 0) - transfer.amount
+            target[transfer.resource] = target.get(transfer.resource, 0) + transfer.amount
+        return deltas
+
+    def can_transfer(self, transfers: Iterable[Transfer]) -> bool:
+        """Check if a batch of transfers would succeed"""
+        try:
+            for account, account_deltas in self._net_deltas(transfers).items():
+                account.validate(account_deltas)
+        except LedgerError:
+            return False
+        return True
+
+    def transfer_batch(self, transfers: Iterable[Transfer], memo: str = "") -> int:
+        """Apply a batch of transfers atomically, returns the transaction id
+
+        Raises LedgerError (and changes nothing) if any account cannot
+        cover its net change.
+        """
+        deltas = self._net_deltas(list(transfers))
+        for account, account_deltas in deltas.items():
+            account.validate(account_deltas)
+
+        txn_id = self._next_txn
+        self._next_txn += 1
+        timestamp = datetime.now().timestamp()
+
+        for account, account_deltas in deltas.items():
+            for resource, delta in account_deltas.items():
+                if delta == 0:
+                    continue
+                account.apply(resource, delta)
+                self._append(JournalEntry(
+                    self._next_seq, txn_id, timestamp, account.name, resource, delta, memo
+                ))
+
+        return txn_id
+
+    def transfer(self, source: Account, target: Account, resource: str,
+                 amount: float, memo: str = "") -> int:
+        """Apply a single transfer, returns the transaction id"""
+        return self.transfer_batch([Transfer(source, target, resource, amount)], memo)
+
+    def _append(self, entry: JournalEntry):
+        self.journal.append(entry)
+        self._next_seq += 1
+        if len(self.journal) > 2 * self.max_entries:
+            # Trimming in batches keeps appends cheap
+            del self.journal[:-self.max_entries]
+        for listener in self._listeners:
+            listener(entry)
+
+    def entries_since(self, seq: int) -> Iterator[JournalEntry]:
+        """Stream journal entries newer than seq"""
+        if not self.journal:
+            return iter(())
+        # Sequence numbers are contiguous, so the start can be found directly
+        start = max(0, seq - self.journal[0].seq + 1)
+        return iter(self.journal[start:])
+
+    def truncate(self, seq: int):
+        """Drop journal entries up to and including seq (after they are persisted)"""
+        if self.journal:
+            drop = max(0, seq - self.journal[0].seq + 1)
+            del self.journal[:drop]
+
+    def transactions(self, entries: Iterable[JournalEntry]) -> Iterator[Tuple[int, List[JournalEntry]]]:
+        """Group consecutive journal entries by transaction"""
+        current: List[JournalEntry] = []
+        for entry in entries:
+            if current and entry.txn_id != current[0].txn_id:
+                yield current[0].txn_id, current
+                current = []
+            current.append(entry)
+        if current:
+            yield current[0].txn_id, current
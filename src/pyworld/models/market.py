@@ -0,0 +1,171 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import random
+import numpy as np
+from .station import SpaceStation, Trade
+
+class TradeRoute(NamedTuple):
+    """A buy-low/sell-high run between two stations"""
+    resource: str
+    source: SpaceStation  # Station we buy from (at its sell price)
+    destination: SpaceStation  # Station we sell to (at its buy price)
+    unit_profit: float
+    volume: float
+    path_cost: float
+    profit: float
+
+class MarketNetwork:
+    """Stations spread across the universe and the trade routes between them"""
+
+    def __init__(self, universe, ledger=None):
+        self.universe = universe
+        self.ledger = ledger  # Shared ledger for all stations' trades
+        self.stations: List[SpaceStation] = []
+        self._stations_by_region: Dict[str, SpaceStation] = {}
+        self._path_costs: Optional[np.ndarray] = None
+
+    def add_station(self, station: SpaceStation, region) -> SpaceStation:
+        """Place a station in a region"""
+        if region.name in self._stations_by_region:
+            raise ValueError(f"{region.name} already has a station.")
+
+        station.region = region
+        if self.ledger is not None:
+            station.ledger = self.ledger
+        self.stations.append(station)
+        self._stations_by_region[region.name] = station
+        self._path_costs = None
+        return station
+
+    def create_station(self, region) -> SpaceStation:
+        """Create a station with its own local prices in a region"""
+        station = SpaceStation(f"{region.name} Station")
+        for trade in station.trades.values():
+            # Local markets drift up to 20% from the base prices
+            factor = random.uniform(0.8, 1.2)
+            trade.buy_price *= factor
+            trade.sell_price *= factor
+        return self.add_station(station, region)
+
+    def remove_station(self, station: SpaceStation) -> bool:
+        """Remove a station from the network"""
+        if station not in self.stations:
+            return False
+
+        self.stations.remove(station)
+        del self._stations_by_region[station.region.name]
+        self._path_costs = None
+        return True
+
+    def get_station(self, region) -> Optional[SpaceStation]:
+        """Get the station in a region, if any"""
+        return self._stations_by_region.get(region.name)
+
+    def invalidate_paths(self):
+        """Forget cached path costs, e.g. after the universe graph changes"""
+        self._path_costs = None
+
+    @property
+    def resources(self) -> List[str]:
+        """Get all resources traded anywhere in the network"""
+        return sorted({resource for s in self.stations for resource in s.trades})
+
+    def price_matrices(self, resources: Optional[List[str]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Get (buy_price, sell_price, quantity) as station x resource matrices
+
+        Resources a station does not trade are NaN in the price matrices
+        and 0 in the quantity matrix.
+        """
+        resources = resources if resources is not None else self.resources
+        shape = (len(self.stations), len(resources))
+        buy = np.full(shape, np.nan)
+        sell = np.full(shape, np.nan)
+        quantity = np.zeros(shape)
+
+        for i, station in enumerate(self.stations):
+            for j, resource in enumerate(resources):
+                trade: Optional[Trade] = station.trades.get(resource)
+                if trade is not None:
+                    buy[i, j] = trade.buy_price
+                    sell[i, j] = trade.sell_price
+                    quantity[i, j] = trade.quantity
+
+        return buy, sell, quantity
+
+    def path_cost_matrix(self) -> np.ndarray:
+        """Get the station x station travel distance matrix (inf if unreachable)"""
+        if self._path_costs is None:
+            n = len(self.stations)
+            costs = np.full((n, n), np.inf)
+            index = {station.region: i for i, station in enumerate(self.stations)}
+
+            for i, station in enumerate(self.stations):
+                for region, cost in self.universe.path_costs_from(station.region).items():
+                    j = index.get(region)
+                    if j is not None:
+                        costs[i, j] = cost
+
+            self._path_costs = costs
+        return self._path_costs
+
+    def scan_arbitrage(self, cargo_capacity: float = 1000,
+                       cost_per_distance: float = 10.0,
+                       resources: Optional[List[str]] = None) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+        """Compute route profits for every resource and station pair
+
+        Returns (resources, unit_spread, volume, profit) where the arrays have
+        shape resource x source x destination. Profit is the spread times the volume
+        the run can move, minus the travel cost along the cheapest path.
+        Impossible runs (same station, unreachable, untraded) are -inf.
+        """
+        resources = resources if resources is not None else self.resources
+        buy, sell, quantity = self.price_matrices(resources)
+        capacity = np.array([s.stock_capacity for s in self.stations], dtype=float)
+
+        # spread[r, i, j]: buy at station i, sell at station j
+        spread = buy.T[:, None, :] - sell.T[:, :, None]
+
+        # Volume is bounded by source stock, destination room and our hold
+        room = np.maximum(capacity[:, None] - quantity, 0)
+        volume = np.minimum(quantity.T[:, :, None], room.T[:, None, :])
+        volume = np.minimum(volume, cargo_capacity)
+
+        path_costs = self.path_cost_matrix()
+        with np.errstate(invalid='ignore'):
+            profit = spread * volume - cost_per_distance * path_costs[None, :, :]
+
+        invalid = np.isnan(profit) | np.isinf(path_costs)[None, :, :]
+        invalid |= np.eye(len(self.stations), dtype=bool)[None, :, :]
+        profit[invalid] = -np.inf
+
+        return resources, spread, volume, profit
+
+    def best_routes(self, limit: int = 10, cargo_capacity: float = 1000,
+                    cost_per_distance: float = 10.0) -> List[TradeRoute]:
+        """Get the most profitable trade runs across the network"""
+        if len(self.stations) < 2:
+            return []
+
+        resources, spread, volume, profit = self.scan_arbitrage(cargo_capacity, cost_per_distance)
+        flat = profit.ravel()
+
+        # Only fully sort the candidates that can make the cut
+        limit = min(limit, int(np.count_nonzero(flat > 0)))
+        if limit <= 0:
+            return []
+        top = np.argpartition(-flat, limit - 1)[:limit]
+        top = top[np.argsort(-flat[top])]
+
+        path_costs = self.path_cost_matrix()
+        routes = []
+        for index in top:
+            r, i, j = np.unravel_index(index, profit.shape)
+            routes.append(TradeRoute(
+                resource=resources[r],
+                source=self.stations[i],
+                destination=self.stations[j],
+                unit_profit=float(spread[r, i, j]),
+                volume=float(volume[r, i, j]),
+                path_cost=float(path_costs[i, j]),
+                profit=float(profit[r, i, j])
+            ))
+        return routes
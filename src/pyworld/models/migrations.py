@@ -0,0 +1,106 @@
+from typing import Callable, Dict, Iterable, Iterator, List, TextIO, Tuple, Union
+from pathlib import Path
+import json
+import os
+from . import save_format
+from .journal import JournaledSave
+
+# Version of the legacy JSON save layout; files without one are version 1
+SCHEMA_VERSION = 2
+
+# A save as a stream: one 'game' record with the top-level fields,
+# then one 'fleet' record per fleet
+Record = Tuple[str, dict]
+Migration = Callable[[str, dict], dict]
+
+MIGRATIONS: Dict[int, List[Migration]] = {}
+
+class MigrationError(ValueError):
+    """Raised when a save can not be brought up to date"""
+
+def migration(from_version: int):
+    """Register a step that upgrades one record from from_version to the next version"""
+    def register(step: Migration) -> Migration:
+        MIGRATIONS.setdefault(from_version, []).append(step)
+        return step
+    return register
+
+@migration(1)
+def _explicit_fleet_fields(kind: str, record: dict) -> dict:
+    """Version 1 left out drone and collector counts, upgrade state and playtime"""
+    if kind == 'fleet':
+        for field in ('mining_drones', 'max_drones', 'gas_collectors', 'max_collectors'):
+            record.setdefault(field, 1)
+        record.setdefault('upgrade', {'upgrade_start': None, 'upgrade_end': None})
+    elif kind == 'game':
+        record.setdefault('playtime', 0.0)
+        record.setdefault('current_fleet_index', 0)
+    return record
+
+def schema_version(data: dict) -> int:
+    return data.get('schema_version', 1)
+
+def iter_records(data: dict) -> Iterator[Record]:
+    """Split a parsed JSON save into records, letting go of each fleet once it is used"""
+    fleets = data.pop('fleets', [])
+    fleets.reverse()
+    yield 'game', data
+    while fleets:
+        yield 'fleet', fleets.pop()
+
+def migrate_records(records: Iterable[Record], version: int) -> Iterator[Record]:
+    """Upgrade a stream of records from version to SCHEMA_VERSION, one record at a time"""
+    if version > SCHEMA_VERSION:
+        raise MigrationError(f"Save schema version {version} is newer than supported ({SCHEMA_VERSION})")
+    steps = [step for v in range(version, SCHEMA_VERSION) for step in MIGRATIONS.get(v, [])]
+    for kind, record in records:
+        for step in steps:
+            record = step(kind, record)
+        yield kind, record
+
+def write_records(f: TextIO, records: Iterable[Record], default=None):
+    """Write a stream of records out as a JSON save, one record at a time"""
+    records = iter(records)
+    kind, game = next(records)
+    if kind != 'game':
+        raise MigrationError("A save must start with its game record")
+    game = dict(game, schema_version=SCHEMA_VERSION)
+    f.write(json.dumps(game, default=default)[:-1])
+    f.write(', "fleets": [' if game else '"fleets": [')
+    for i, (kind, record) in enumerate(records):
+        if i:
+            f.write(', ')
+        f.write(json.dumps(record, default=default))
+    f.write(']}')
+
+def migrate_json(path: Union[str, Path]) -> bool:
+    """Upgrade a JSON save in place, returns False if it was already current"""
+    path = Path(path)
+    with open(path, 'r') as f:
+        data = json.load(f)
+    version = schema_version(data)
+    if version == SCHEMA_VERSION:
+        return False
+
+    temp_path = path.with_name(path.name + '.tmp')
+    with open(temp_path, 'w') as f:
+        write_records(f, migrate_records(iter_records(data), version))
+    os.replace(temp_path, path)
+    return True
+
+def migrate_binary(path: Union[str, Path]) -> bool:
+    """Rewrite a binary save in the current format, returns False if it already was
+
+    Journaled changes are folded into the rewritten save.
+    """
+    path = Path(path)
+    version, codec = save_format.read_header(path)
+    if version == save_format.FORMAT_VERSION:
+        return False
+    codec_name = next(name for name, codec_id in save_format.CODECS.items() if codec_id == codec)
+    game_state = JournaledSave.load(path, attach=False).game_state
+    save_format.write_save(game_state, path, codec=codec_name)
+    wal_path = path.with_suffix('.wal')
+    if wal_path.exists():
+        os.remove(wal_path)
+    return True
@@ -0,0 +1,38 @@
+import math
+
+class PricingModel:
+    """Continuous supply/demand pricing for station trades
+
+    Every trade has an equilibrium price set by its stock level: scarce
+    goods are dear and abundant goods are cheap. Posted prices relax
+    exponentially toward that equilibrium, so the price at any moment is a
+    pure function of the last known price, the stock and the elapsed time.
+    Nothing needs to tick; prices are worked out when they are read.
+    """
+
+    def __init__(self, target_stock: float = 500, elasticity: float = 0.5,
+                 relaxation_hours: float = 6.0, min_factor: float = 0.5,
+                 max_factor: float = 2.0):
+        self.target_stock = target_stock  # Stock level at which base prices apply
+        self.elasticity = elasticity  # How strongly stock moves the price
+        self.relaxation_hours = relaxation_hours  # Time constant of the relaxation
+        self.min_factor = min_factor
+        self.max_factor = max_factor
+
+    def stock_factor(self, quantity: float) -> float:
+        """Get the equilibrium price multiplier for a stock level"""
+        factor = (self.target_stock / max(quantity, 1)) ** self.elasticity
+        return min(self.max_factor, max(self.min_factor, factor))
+
+    def equilibrium(self, base_price: float, quantity: float) -> float:
+        """Get the equilibrium price for a stock level"""
+        return base_price * self.stock_factor(quantity)
+
+    def relax(self, price: float, equilibrium: float, elapsed_hours: float) -> float:
+        """Get the price after relaxing toward equilibrium for elapsed_hours"""
+        if elapsed_hours <= 0:
+            return price
+        decay = math.exp(-elapsed_hours / self.relaxation_hours)
+        return equilibrium + (price - equilibrium) * decay
+
+DEFAULT_PRICING = PricingModel()
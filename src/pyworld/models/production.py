@@ -0,0 +1,87 @@
+from typing import Dict, Mapping, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from .resources import Resource, ResourceVector
+
+class Recipe(NamedTuple):
+    """Turns inputs into outputs; amounts are per production run"""
+    name: str
+    inputs: Dict[str, float]
+    outputs: Dict[str, float]
+
+RECIPES: Dict[str, Recipe] = {
+    'refined_metal': Recipe('refined_metal', {'metal': 2}, {'refined_metal': 1}),
+    'refined_gas': Recipe('refined_gas', {'gas': 2}, {'refined_gas': 1}),
+    'fuel': Recipe('fuel', {'refined_gas': 1}, {'fuel': 5}),
+    'drones': Recipe('drones', {'refined_metal': 10, 'energy': 20}, {'drones': 1})
+}
+
+class ProductionEngine:
+    """Solves production for many producers in one batched computation
+
+    Recipes are held as (recipe x resource) input and output matrices.
+    Each tick, every producer wants to run its recipe up to its maximum
+    number of runs. Where producers compete for a scarce input, all of
+    them are scaled back by the same ratio; likewise where outputs would
+    overflow the available room. Outputs become inputs on the next tick,
+    so chains (gas -> refined_gas -> fuel) settle into a steady state.
+    """
+
+    def __init__(self, recipes: Optional[Mapping[str, Recipe]] = None):
+        self.recipes = dict(recipes or RECIPES)
+        self._recipe_index = {name: i for i, name in enumerate(self.recipes)}
+        self.inputs = np.zeros((len(self.recipes), len(Resource)))
+        self.outputs = np.zeros((len(self.recipes), len(Resource)))
+
+        for i, recipe in enumerate(self.recipes.values()):
+            for resource, amount in recipe.inputs.items():
+                self.inputs[i, Resource.from_key(resource)] = amount
+            for resource, amount in recipe.outputs.items():
+                self.outputs[i, Resource.from_key(resource)] = amount
+
+    def recipe_indices(self, recipes: Sequence[str]) -> np.ndarray:
+        """Map recipe names to matrix rows"""
+        try:
+            return np.array([self._recipe_index[name] for name in recipes], dtype=int)
+        except KeyError as e:
+            raise ValueError(f"Unknown recipe: {e.args[0]}") from None
+
+    @staticmethod
+    def _limit(runs: np.ndarray, per_run: np.ndarray, available: np.ndarray) -> np.ndarray:
+        """Scale runs so the total of per_run amounts fits within available"""
+        needed = runs @ per_run
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(needed > 0, np.minimum(1.0, np.maximum(available, 0) / needed), 1.0)
+        # Each producer is held back by its most constrained resource
+        factor = np.where(per_run > 0, ratio[None, :], 1.0).min(axis=1)
+        return runs * factor
+
+    def solve(self, recipes: Sequence[str], max_runs: Sequence[float],
+              stock: ResourceVector, room: Optional[ResourceVector] = None) -> np.ndarray:
+        """Get how many runs each producer completes this tick
+
+        recipes and max_runs describe one producer per entry. stock is the
+        input buffer; room (optional) limits how much of each output fits.
+        """
+        if not len(recipes):
+            return np.zeros(0)
+
+        rows = self.recipe_indices(recipes)
+        runs = np.maximum(np.asarray(max_runs, dtype=float), 0)
+        runs = self._limit(runs, self.inputs[rows], stock.array)
+        if room is not None:
+            runs = self._limit(runs, self.outputs[rows], room.array)
+        return runs
+
+    def run(self, recipes: Sequence[str], max_runs: Sequence[float],
+            stock: ResourceVector, room: Optional[ResourceVector] = None) -> Tuple[ResourceVector, ResourceVector]:
+        """Solve a tick and get the (consumed, produced) resource totals"""
+        runs = self.solve(recipes, max_runs, stock, room)
+        if not len(runs):
+            return ResourceVector(), ResourceVector()
+
+        rows = self.recipe_indices(recipes)
+        consumed = ResourceVector.from_array(runs @ self.inputs[rows])
+        produced = ResourceVector.from_array(runs @ self.outputs[rows])
+        return consumed, produced
+
+PRODUCTION = ProductionEngine()
@@ -0,0 +1,151 @@
+from typing import Iterator, Mapping, MutableMapping, Optional, Union
+from enum import IntEnum
+import numpy as np
+
+class Resource(IntEnum):
+    """Every resource the game tracks; values index into resource vectors"""
+    METAL = 0
+    GAS = 1
+    ENERGY = 2
+    REFINED_METAL = 3
+    REFINED_GAS = 4
+    FUEL = 5
+    CREDITS = 6
+    CRYSTAL = 7
+    DRONES = 8
+
+    @property
+    def key(self) -> str:
+        """Get the resource's dict key, e.g. 'refined_metal'"""
+        return self.name.lower()
+
+    @classmethod
+    def from_key(cls, key: Union[str, 'Resource']) -> 'Resource':
+        """Get a resource from its dict key"""
+        if isinstance(key, Resource):
+            return key
+        try:
+            return cls[key.upper()]
+        except (KeyError, AttributeError):
+            raise KeyError(key) from None
+
+RESOURCE_KEYS = [resource.key for resource in Resource]
+
+class ResourceVector(MutableMapping):
+    """Fixed-width array of resource amounts indexed by Resource
+
+    Arithmetic (+, -, clip, total, dot) works on the whole array at once.
+    It also behaves like the dict[str, float] it replaces: only resources
+    that have been set are present as keys.
+    """
+
+    __slots__ = ('array', '_present')
+
+    def __init__(self, values: Optional[Mapping] = None):
+        self.array = np.zeros(len(Resource))
+        self._present = np.zeros(len(Resource), dtype=bool)
+        if isinstance(values, ResourceVector):
+            self.array[:] = values.array
+            self._present[:] = values._present
+        elif values:
+            for key, amount in values.items():
+                self[key] = amount
+
+    @classmethod
+    def from_array(cls, array: np.ndarray) -> 'ResourceVector':
+        """Wrap a raw amounts array; non-zero amounts become present keys"""
+        return cls._from_arrays(array, array != 0)
+
+    @classmethod
+    def _from_arrays(cls, array: np.ndarray, present: np.ndarray) -> 'ResourceVector':
+        vector = cls()
+        vector.array[:] = array
+        vector._present[:] = present
+        return vector
+
+    # Mapping interface
+
+    def __getitem__(self, key) -> float:
+        index = Resource.from_key(key)
+        if not self._present[index]:
+            raise KeyError(key)
+        return float(self.array[index])
+
+    def __setitem__(self, key, amount: float):
+        index = Resource.from_key(key)
+        self.array[index] = amount
+        self._present[index] = True
+
+    def __delitem__(self, key):
+        index = Resource.from_key(key)
+        if not self._present[index]:
+            raise KeyError(key)
+        self.array[index] = 0
+        self._present[index] = False
+
+    def __contains__(self, key) -> bool:
+        try:
+            return bool(self._present[Resource.from_key(key)])
+        except KeyError:
+            return False
+
+    def __iter__(self) -> Iterator[str]:
+        return (RESOURCE_KEYS[i] for i in np.flatnonzero(self._present))
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._present))
+
+    def __repr__(self) -> str:
+        return f"ResourceVector({dict(self.items())})"
+
+    def copy(self) -> 'ResourceVector':
+        return ResourceVector(self)
+
+    def to_dict(self) -> dict:
+        """Get a plain dict copy (e.g. for JSON)"""
+        return dict(self.items())
+
+    # Vector arithmetic
+
+    def __add__(self, other: Union['ResourceVector', Mapping]) -> 'ResourceVector':
+        other = other if isinstance(other, ResourceVector) else ResourceVector(other)
+        return ResourceVector._from_arrays(self.array + other.array, self._present | other._present)
+
+    def __sub__(self, other: Union['ResourceVector', Mapping]) -> 'ResourceVector':
+        other = other if isinstance(other, ResourceVector) else ResourceVector(other)
+        return ResourceVector._from_arrays(self.array - other.array, self._present | other._present)
+
+    def __iadd__(self, other: Union['ResourceVector', Mapping]) -> 'ResourceVector':
+        other = other if isinstance(other, ResourceVector) else ResourceVector(other)
+        self.array += other.array
+        self._present |= other._present
+        return self
+
+    def __isub__(self, other: Union['ResourceVector', Mapping]) -> 'ResourceVector':
+        other = other if isinstance(other, ResourceVector) else ResourceVector(other)
+        self.array -= other.array
+        self._present |= other._present
+        return self
+
+    def __mul__(self, factor: float) -> 'ResourceVector':
+        return ResourceVector._from_arrays(self.array * factor, self._present)
+
+    __rmul__ = __mul__
+
+    def clip(self, low: Optional[float] = 0, high=None) -> 'ResourceVector':
+        """Get a copy with every amount limited to [low, high]
+
+        high may be a number or another vector of per-resource limits.
+        """
+        if isinstance(high, ResourceVector):
+            high = high.array
+        return ResourceVector._from_arrays(np.clip(self.array, low, high), self._present)
+
+    def total(self) -> float:
+        """Get the sum of all amounts"""
+        return float(self.array.sum())
+
+    def dot(self, other: Union['ResourceVector', Mapping]) -> float:
+        """Get the sum of amount * other[resource], e.g. the value at some prices"""
+        other = other if isinstance(other, ResourceVector) else ResourceVector(other)
+        return float(self.array @ other.array)
@@ -0,0 +1,909 @@
+from typing import BinaryIO, Dict, Iterable, List, Optional, Set, Tuple, Union
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+from pathlib import Path
+from itertools import chain, repeat
+from operator import attrgetter
+import gc
+import json
+import math
+import mmap
+import os
+import bz2
+import lzma
+import struct
+import zlib
+import numpy as np
+from .universe import (Universe, Region, ResourceDeposit, ResourceGrant, RegionClaim, RegionVisibility,
+                       RegionMap, RegionLinks, ConnectionMap)
+from .fleet import Fleet
+from .ship import Mothership
+from .station import SpaceStation, Trade, Module
+from .market import MarketNetwork
+from .resources import Resource, ResourceVector
+
+MAGIC = b'PYWSAVE\0'
+FORMAT_VERSION = 2
+SECTION_ALIGNMENT = 64
+CHUNK_SIZE = 1 << 20  # Bytes per compressed read or write
+
+# Codec ids stored in the header
+CODECS = {'none': 0, 'zlib': 1, 'lzma': 2, 'bz2': 3}
+
+HEADER = struct.Struct('<8sHHI')  # magic, version, codec, section count
+SECTION = struct.Struct('<8sQQ')  # name, offset, length
+
+VISIBILITIES = list(RegionVisibility)
+
+REGION_DTYPE = np.dtype([
+    ('name', '<i4'), ('level', '<i4'), ('x', '<i4'), ('y', '<i4'),
+    ('visibility', 'u1'), ('corporation', '<i4'),
+    ('deposit_start', '<i4'), ('deposit_count', '<i4')
+])
+DEPOSIT_DTYPE = np.dtype([
+    ('region', '<i4'), ('resource', '<i4'), ('amount', '<f8'),
+    ('quality', '<f8'), ('discovered', 'u1')
+])
+GRANT_DTYPE = np.dtype([
+    ('region', '<i4'), ('deposit', '<i4'), ('corporation', '<i4'),
+    ('start', '<f8'), ('duration', '<f8')
+])
+CLAIM_DTYPE = np.dtype([
+    ('region', '<i4'), ('corporation', '<i4'), ('duration', '<f8'),
+    ('claimed_at', '<f8'), ('active', 'u1')
+])
+EDGE_DTYPE = np.dtype([('a', '<i4'), ('b', '<i4')])
+FLEET_DTYPE = np.dtype([
+    ('name', '<i4'), ('ship_type', '<i4'), ('level', '<i4'),
+    ('mining_drones', '<i4'), ('max_drones', '<i4'),
+    ('gas_collectors', '<i4'), ('max_collectors', '<i4'),
+    ('storage', '<f8'), ('region', '<i4'), ('destination', '<i4'),
+    ('probe_region', '<i4'), ('traveling', 'u1'), ('probing', 'u1'),
+    ('travel_start', '<f8'), ('travel_end', '<f8'),
+    ('probe_start', '<f8'), ('probe_end', '<f8'),
+    ('upgrade_start', '<f8'), ('upgrade_end', '<f8')
+])
+STATION_DTYPE = np.dtype([
+    ('name', '<i4'), ('region', '<i4'), ('level', '<i4'), ('max_modules', '<i4'),
+    ('stock_capacity', '<f8'), ('last_restock', '<f8'),
+    ('trade_start', '<i4'), ('trade_count', '<i4'),
+    ('module_start', '<i4'), ('module_count', '<i4')
+])
+TRADE_DTYPE = np.dtype([
+    ('resource', '<i4'), ('base_buy', '<f8'), ('base_sell', '<f8'),
+    ('buy_anchor', '<f8'), ('sell_anchor', '<f8'), ('quantity', '<f8'),
+    ('last_update', '<f8')
+])
+MODULE_DTYPE = np.dtype([('type', '<i4'), ('level', '<i4'), ('efficiency', '<f8')])
+
+Section = Union[bytes, np.ndarray]
+
+class SaveFormatError(ValueError):
+    """Raised when a file is not a readable save"""
+
+class StringTable:
+    """Interns strings so tables can store them as integer ids"""
+
+    def __init__(self, strings: Optional[List[str]] = None):
+        self.strings: List[str] = list(strings or [])
+        self._ids = {s: i for i, s in enumerate(self.strings)}
+
+    def intern(self, string: Optional[str]) -> int:
+        """Get the id of a string (-1 for None), adding it if needed"""
+        if string is None:
+            return -1
+        string_id = self._ids.get(string)
+        if string_id is None:
+            string_id = self._ids[string] = len(self.strings)
+            self.strings.append(string)
+        return string_id
+
+    def intern_all(self, strings: List[str]) -> List[int]:
+        """Get the ids of many strings (none of them None), adding those not seen yet"""
+        ids = self._ids
+        new = [s for s in dict.fromkeys(strings) if s not in ids]
+        ids.update(zip(new, range(len(self.strings), len(self.strings) + len(new))))
+        self.strings.extend(new)
+        return list(map(ids.__getitem__, strings))
+
+    def get(self, string_id: int) -> Optional[str]:
+        return self.strings[string_id] if string_id >= 0 else None
+
+    def encode(self) -> bytes:
+        return '\0'.join(self.strings).encode('utf-8')
+
+    @classmethod
+    def decode(cls, data) -> 'StringTable':
+        data = bytes(data)
+        return cls(data.decode('utf-8').split('\0') if data else [])
+
+def _timestamp(moment: Optional[datetime]) -> float:
+    return moment.timestamp() if moment else math.nan
+
+def _datetime(timestamp: float) -> Optional[datetime]:
+    return None if math.isnan(timestamp) else datetime.fromtimestamp(timestamp)
+
+# Container
+
+def _section_bytes(data: Section) -> bytes:
+    return data.tobytes() if isinstance(data, np.ndarray) else bytes(data)
+
+def _compressor(codec: int):
+    # Low levels: on save tables higher ones cost several times the
+    # time for a few percent smaller files (see benchmarks/save_codecs.py)
+    if codec == CODECS['zlib']:
+        return zlib.compressobj(1)
+    if codec == CODECS['lzma']:
+        return lzma.LZMACompressor(preset=0)
+    if codec == CODECS['bz2']:
+        return bz2.BZ2Compressor(1)
+    return None
+
+def _decompressor(codec: int):
+    if codec == CODECS['zlib']:
+        return zlib.decompressobj()
+    if codec == CODECS['lzma']:
+        return lzma.LZMADecompressor()
+    if codec == CODECS['bz2']:
+        return bz2.BZ2Decompressor()
+    raise SaveFormatError(f"Unknown save codec {codec}")
+
+def _codec_id(codec: str) -> int:
+    if codec not in CODECS:
+        raise ValueError(f"Unknown save codec: {codec}")
+    return CODECS[codec]
+
+def write_container(f: BinaryIO, sections: Dict[str, Section],
+                    version: int = FORMAT_VERSION, codec: str = 'none'):
+    """Write sections behind a header and section directory
+
+    The header holds the magic, format version, codec and section count;
+    the directory one (name, offset, length) entry per section. Every
+    section starts on a SECTION_ALIGNMENT boundary. With a codec,
+    everything after the header is one compressed stream, written in
+    CHUNK_SIZE pieces; offsets refer to the uncompressed layout.
+    """
+    codec_id = _codec_id(codec)
+    names = list(sections)
+    payloads = [memoryview(_section_bytes(sections[name])) for name in names]
+
+    offset = HEADER.size + SECTION.size * len(names)
+    directory = []
+    for name, payload in zip(names, payloads):
+        offset += -offset % SECTION_ALIGNMENT
+        directory.append(SECTION.pack(name.encode('ascii'), offset, len(payload)))
+        offset += len(payload)
+
+    f.write(HEADER.pack(MAGIC, version, codec_id, len(names)))
+    compressor = _compressor(codec_id)
+    if compressor is None:
+        write = f.write
+    else:
+        def write(data):
+            f.write(compressor.compress(data))
+
+    write(b''.join(directory))
+    position = HEADER.size + SECTION.size * len(names)
+    for payload in payloads:
+        padding = -position % SECTION_ALIGNMENT
+        write(b'\0' * padding)
+        for start in range(0, len(payload), CHUNK_SIZE):
+            write(payload[start:start + CHUNK_SIZE])
+        position += padding + len(payload)
+    if compressor is not None:
+        f.write(compressor.flush())
+
+def _read_header(header: bytes) -> Tuple[int, int, int]:
+    if len(header) < HEADER.size:
+        raise SaveFormatError("Save file is truncated")
+    magic, version, codec, count = HEADER.unpack_from(header, 0)
+    if magic != MAGIC:
+        raise SaveFormatError("Not a save file")
+    if version > FORMAT_VERSION:
+        raise SaveFormatError(f"Save format version {version} is newer than supported ({FORMAT_VERSION})")
+    return version, codec, count
+
+def _decompress(chunks, codec: int) -> bytearray:
+    """Decompress a stream of chunks into the uncompressed file layout"""
+    decompressor = _decompressor(codec)
+    body = bytearray(HEADER.size)  # Keeps offsets the same as uncompressed files
+    try:
+        for chunk in chunks:
+            body += decompressor.decompress(chunk)
+        if hasattr(decompressor, 'flush'):
+            body += decompressor.flush()
+    except (zlib.error, lzma.LZMAError, OSError, EOFError) as e:
+        raise SaveFormatError(f"Corrupt save file: {e}") from None
+    return body
+
+def _sections(view: memoryview, version: int, codec: int, count: int) -> Dict[str, memoryview]:
+    sections = {}
+    for i in range(count):
+        if HEADER.size + (i + 1) * SECTION.size > len(view):
+            raise SaveFormatError("Save file is truncated")
+        name, offset, length = SECTION.unpack_from(view, HEADER.size + i * SECTION.size)
+        if offset + length > len(view):
+            raise SaveFormatError("Save file is truncated")
+        section = view[offset:offset + length]
+        if version == 1 and codec == CODECS['zlib']:
+            # Version 1 compressed each section separately
+            section = memoryview(zlib.decompress(section))
+        sections[name.rstrip(b'\0').decode('ascii')] = section
+    return sections
+
+def read_header(path: Union[str, Path]) -> Tuple[int, int]:
+    """Get (version, codec) of a save file without reading its sections"""
+    with open(path, 'rb') as f:
+        version, codec, _ = _read_header(f.read(HEADER.size))
+    return version, codec
+
+def read_container(data) -> Tuple[int, int, Dict[str, memoryview]]:
+    """Get (version, codec, sections) from a save file's bytes"""
+    view = memoryview(data)
+    version, codec, count = _read_header(view[:HEADER.size])
+    if codec and version > 1:
+        view = memoryview(_decompress([view[HEADER.size:]], codec))
+    return version, codec, _sections(view, version, codec, count)
+
+def read_stream(f: BinaryIO) -> Tuple[int, int, Dict[str, memoryview]]:
+    """Get (version, codec, sections) from an open save file, decompressing in chunks"""
+    version, codec, count = _read_header(f.read(HEADER.size))
+    if codec and version > 1:
+        body = _decompress(iter(lambda: f.read(CHUNK_SIZE), b''), codec)
+    else:
+        body = bytearray(HEADER.size) + f.read()
+    return version, codec, _sections(memoryview(body), version, codec, count)
+
+def _region(regions: List[Region], region_id: int) -> Optional[Region]:
+    return regions[region_id] if region_id >= 0 else None
+
+def _table(sections: Dict[str, memoryview], name: str, dtype: np.dtype) -> np.ndarray:
+    if name not in sections:
+        return np.zeros(0, dtype=dtype)
+    return np.frombuffer(sections[name], dtype=dtype)
+
+# Encoding
+
+def snapshot_regions(regions: List[Region], strings: StringTable) -> Dict[str, np.ndarray]:
+    """Pack regions with their deposits and grants into record tables
+
+    Deposits are stored contiguously per region and grants point at them
+    by row, so the tables only refer to rows within themselves.
+    """
+    # Each column is gathered in one pass over the objects and converted by
+    # numpy at once; the per-object work is only the attribute lookups
+    count = len(regions)
+    table = np.zeros(count, dtype=REGION_DTYPE)
+    table['name'] = strings.intern_all(list(map(attrgetter('name'), regions)))
+    table['level'] = np.fromiter(map(attrgetter('level'), regions), np.int32, count)
+    positions = np.fromiter(chain.from_iterable(map(attrgetter('position'), regions)), np.int64, 2 * count)
+    table['x'] = positions[0::2]
+    table['y'] = positions[1::2]
+    visibility_ids = {visibility: i for i, visibility in enumerate(VISIBILITIES)}
+    table['visibility'] = np.fromiter(
+        map(visibility_ids.__getitem__, map(attrgetter('_visibility'), regions)), np.uint8, count
+    )
+    corporations = list(map(attrgetter('controlling_corporation'), regions))
+    corporation_ids = {corporation: strings.intern(corporation) for corporation in set(corporations)}
+    table['corporation'] = np.fromiter(map(corporation_ids.__getitem__, corporations), np.int32, count)
+    region_deposits = list(map(attrgetter('deposits'), regions))
+    counts = np.fromiter(map(len, region_deposits), np.int64, count)
+    table['deposit_count'] = counts
+    table['deposit_start'] = np.cumsum(counts) - counts
+
+    deposits = list(chain.from_iterable(region_deposits))
+    total = len(deposits)
+    resource_types = list(map(attrgetter('resource_type'), deposits))
+    # Only a handful of distinct resource types, so intern each once
+    resource_ids = {resource: strings.intern(resource) for resource in set(resource_types)}
+    deposit_table = np.zeros(total, dtype=DEPOSIT_DTYPE)
+    deposit_table['region'] = np.repeat(np.arange(count), counts)
+    deposit_table['resource'] = np.fromiter(map(resource_ids.__getitem__, resource_types), np.int32, total)
+    deposit_table['amount'] = np.fromiter(map(attrgetter('amount'), deposits), np.float64, total)
+    deposit_table['quality'] = np.fromiter(map(attrgetter('quality'), deposits), np.float64, total)
+    deposit_table['discovered'] = np.fromiter(map(attrgetter('_discovered'), deposits), np.uint8, total)
+
+    grants = [
+        (i, int(table['deposit_start'][i]) + region.deposits.index(g.deposit), strings.intern(g.corporation),
+         _timestamp(g.start_time), g.duration.total_seconds())
+        for i, region in enumerate(regions) if region.grants
+        for g in region.grants
+    ]
+    return {'regions': table, 'deposits': deposit_table, 'grants': np.array(grants, dtype=GRANT_DTYPE)}
+
+def snapshot_links(universe: Universe, regions: List[Region], region_ids: Dict[Region, int]) -> Dict[str, np.ndarray]:
+    """Pack the travel connections and neighbours of regions, by region id"""
+    # Both directions, sorted, so a region's connections can be found by bisection
+    edges = _edge_table(regions, list(map(universe.get_connected_regions, regions)), region_ids, True)
+    adjacent = _edge_table(regions, list(map(attrgetter('connections'), regions)), region_ids, False)
+    return {'edges': edges, 'adjacent': adjacent}
+
+def _edge_table(regions: List[Region], others: List[Iterable[Region]], region_ids: Dict[Region, int],
+                sort: bool) -> np.ndarray:
+    """Pack each region's links to others as (a, b) rows by region id, a in region order"""
+    counts = np.fromiter(map(len, others), np.int64, len(others))
+    a = np.repeat(np.fromiter(map(region_ids.__getitem__, regions), np.int64, len(regions)), counts)
+    b = np.fromiter(map(region_ids.__getitem__, chain.from_iterable(others)), np.int64, int(counts.sum()))
+    return _edge_rows(a, b, len(region_ids) if sort else 0)
+
+def _edge_rows(a: np.ndarray, b: np.ndarray, sort_count: int = 0) -> np.ndarray:
+    """Make an edge table, sorted by (a, b) if given the number of regions"""
+    if sort_count:
+        # One flat sort on a combined key instead of a structured sort by fields
+        order = np.argsort(a.astype(np.int64) * (sort_count + 1) + b, kind='stable')
+        a, b = a[order], b[order]
+    table = np.empty(len(a), dtype=EDGE_DTYPE)
+    table['a'] = a
+    table['b'] = b
+    return table
+
+def snapshot_state(game_state, strings: StringTable, region_ids: Dict[Region, int],
+                   extra_meta: Optional[dict] = None) -> Dict[str, Section]:
+    """Pack everything but the universe: settings, claims, fleets and stations"""
+    def region_id(region: Optional[Region]) -> int:
+        return region_ids[region] if region is not None else -1
+
+    claims = [
+        (region_id(c.region), strings.intern(c.corporation), c.duration.total_seconds(),
+         _timestamp(c.claimed_at), active)
+        for active, claims in enumerate((game_state.available_claims, game_state.active_claims))
+        for c in claims
+    ]
+    claim_table = np.array(claims, dtype=CLAIM_DTYPE)
+
+    fleets = game_state.fleets
+    fleet_table = np.array([
+        (strings.intern(f.name), strings.intern(f.ship_type), f.level,
+         f.mining_drones, f.max_drones, f.gas_collectors, f.max_collectors,
+         f._storage_capacity, region_id(f.current_region), region_id(f.destination),
+         region_id(f.probe_region), f.is_traveling, f.is_probing,
+         _timestamp(f.travel_start), _timestamp(f.travel_end),
+         _timestamp(f.probe_start), _timestamp(f.probe_end),
+         _timestamp(f.upgrade_start), _timestamp(f.upgrade_end))
+        for f in fleets
+    ], dtype=FLEET_DTYPE)
+    fleet_resources = np.array([f.resources.array for f in fleets]).reshape(len(fleets), len(Resource))
+    fleet_present = np.array([f.resources._present for f in fleets], dtype='u1').reshape(len(fleets), len(Resource))
+
+    stations, trades, modules = [], [], []
+    for station in game_state.market.stations:
+        stations.append((
+            strings.intern(station.name), region_id(station.region), station.level,
+            station.max_modules, station.stock_capacity, _timestamp(station.last_restock),
+            len(trades), len(station.trades), len(modules), len(station.modules)
+        ))
+        trades.extend(
+            (strings.intern(t.resource), t.base_buy_price, t.base_sell_price,
+             t._buy_anchor, t._sell_anchor, t.quantity, _timestamp(t.last_update))
+            for t in station.trades.values()
+        )
+        modules.extend((strings.intern(m.type), m.level, m.efficiency) for m in station.modules)
+
+    current = game_state.get_current_fleet()
+    meta = {
+        'corporation_name': game_state.corporation_name,
+        'credits': game_state.credits,
+        'total_assets': game_state.total_assets,
+        'game_speed': game_state.game_speed,
+        'playtime': game_state.playtime,
+        'fleet_count': len(fleets),
+        'current_fleet': fleets.index(current) if current in fleets else -1,
+        'current_region': region_id(game_state.current_region),
+        'home_region': region_id(game_state.universe.home_region),
+        'station': (game_state.market.stations.index(game_state.station)
+                    if game_state.station in game_state.market.stations else -1),
+        'buildings': {name: building.level for name, building in game_state.buildings.items()},
+        'mothership': game_state.mothership.to_dict(),
+        'sorted_edges': True
+    }
+    meta.update(extra_meta or {})
+
+    return {
+        'meta': json.dumps(meta).encode('utf-8'),
+        'claims': claim_table,
+        'fleets': fleet_table,
+        'fleetres': fleet_resources.astype('<f8'),
+        'fleetmsk': fleet_present,
+        'stations': np.array(stations, dtype=STATION_DTYPE),
+        'trades': np.array(trades, dtype=TRADE_DTYPE),
+        'modules': np.array(modules, dtype=MODULE_DTYPE)
+    }
+
+def snapshot_game(game_state, extra_meta: Optional[dict] = None,
+                  tables: Optional['RegionTables'] = None) -> Dict[str, Section]:
+    """Copy a game state out into save file sections
+
+    Regions, deposits, grants, claims, fleets and stations become packed
+    record tables that numpy writes in one call. Records point at each
+    other by row number (fleets and stations at regions by region id) and
+    strings are stored once in a shared string table.
+
+    The tables share nothing with the live game, so a snapshot can be
+    written out on another thread while the game keeps running. Given the
+    universe's RegionTables, only regions changed since they were last
+    updated are packed again.
+    """
+    universe = game_state.universe
+    if tables is not None:
+        tables.update()
+        sections = snapshot_state(game_state, tables.strings, _IdsByName(tables.ids), extra_meta)
+        sections.update(tables.tables)
+        sections['strings'] = tables.strings.encode()
+        return sections
+
+    strings = StringTable()
+    regions = list(universe.regions.values())
+    region_ids = {region: i for i, region in enumerate(regions)}
+
+    sections = snapshot_state(game_state, strings, region_ids, extra_meta)
+    sections.update(snapshot_regions(regions, strings))
+    sections.update(snapshot_links(universe, regions, region_ids))
+    # Encoded last, once every string is interned
+    sections['strings'] = strings.encode()
+    return sections
+
+class _IdsByName:
+    """Region ids looked up by region name, for regions packed earlier"""
+
+    def __init__(self, ids: Dict[str, int]):
+        self._ids = ids
+
+    def __getitem__(self, region: Region) -> int:
+        return self._ids[region.name]
+
+class RegionTables:
+    """A universe's packed region tables, kept in step with it between saves
+
+    Packing every region is most of a snapshot, but in play regions only
+    change visibility, grants and discovered deposits, and never their
+    connections. The tables are packed once, or taken from the save the
+    universe was loaded from so a mapped universe is not built to save
+    it, and update() repacks only the regions whose version moved.
+    Arrays are replaced, never changed, so the tables of an earlier
+    snapshot stay as they were while it is written out.
+    """
+
+    def __init__(self, universe: Universe, names: List[str], strings: StringTable,
+                 tables: Dict[str, np.ndarray], versions: List[int]):
+        self.universe = universe
+        self.names = names
+        self.ids = {name: i for i, name in enumerate(names)}
+        self.strings = strings  # Only ever added to, so ids stay valid
+        self.tables = tables
+        self.versions = versions  # Version of each region when its rows were packed
+
+    @classmethod
+    def pack(cls, universe: Universe) -> 'RegionTables':
+        """Pack every region of a universe"""
+        strings = StringTable()
+        regions = list(universe.regions.values())
+        region_ids = {region: i for i, region in enumerate(regions)}
+        tables = snapshot_regions(regions, strings)
+        tables.update(snapshot_links(universe, regions, region_ids))
+        return cls(universe, [region.name for region in regions], strings, tables,
+                   [region.version for region in regions])
+
+    @classmethod
+    def from_sections(cls, universe: Universe, sections: Dict[str, memoryview], strings: StringTable,
+                      names: List[str], sorted_edges: bool) -> 'RegionTables':
+        """Take the tables a universe was just loaded from"""
+        tables = {name: _table(sections, name, dtype) for name, dtype in (
+            ('regions', REGION_DTYPE), ('deposits', DEPOSIT_DTYPE), ('grants', GRANT_DTYPE),
+            ('edges', EDGE_DTYPE), ('adjacent', EDGE_DTYPE)
+        )}
+        if not sorted_edges:
+            # Older saves stored each connection once; save both directions sorted
+            edges = tables['edges']
+            tables['edges'] = _edge_rows(np.concatenate((edges['a'], edges['b'])),
+                                         np.concatenate((edges['b'], edges['a'])), len(names))
+        return cls(universe, names, strings, tables, [0] * len(names))
+
+    def update(self):
+        """Repack the regions changed since the tables were last updated"""
+        ids, versions = self.ids, self.versions
+        regions = self.universe.regions
+        if isinstance(regions, RegionMap):
+            changed = [region for region in regions.loaded() if region.version != versions[ids[region.name]]]
+        else:
+            # Every region is in memory, in the order of the rows
+            regions = list(regions.values())
+            current = list(map(attrgetter('version'), regions))
+            changed = [] if current == versions else [
+                region for region, version, packed in zip(regions, current, versions) if version != packed
+            ]
+        if not changed:
+            return
+        rows = np.fromiter(map(ids.__getitem__, map(attrgetter('name'), changed)), np.int64, len(changed))
+        packed = snapshot_regions(changed, self.strings)
+        table = self.tables['regions'].copy()
+        new = packed['regions']
+        if (new['deposit_count'] != table['deposit_count'][rows]).any():
+            # Deposits are never added or removed in play; start over if they were
+            repacked = RegionTables.pack(self.universe)
+            self.__dict__.update(repacked.__dict__)
+            return
+
+        # Deposit rows stay where they are, so only the row ids need moving
+        starts = table['deposit_start'][rows]
+        new_starts = new['deposit_start'].astype(np.int64)
+        new['deposit_start'] = starts
+        table[rows] = new
+        counts = new['deposit_count'].astype(np.int64)
+        deposits = self.tables['deposits'].copy()
+        shift = np.repeat(starts - new_starts, counts)
+        new_deposits = packed['deposits']
+        new_deposits['region'] = np.repeat(rows, counts)
+        deposits[np.arange(len(new_deposits)) + shift] = new_deposits
+
+        grants = self.tables['grants']
+        new_grants = packed['grants']
+        new_grants['deposit'] += (starts - new_starts)[new_grants['region']]
+        new_grants['region'] = rows[new_grants['region']]
+        grants = np.concatenate((grants[~np.isin(grants['region'], rows)], new_grants))
+        # Kept in region order, so a mapped save can bisect them
+        grants = grants[np.argsort(grants['region'], kind='stable')]
+
+        self.tables = dict(self.tables, regions=table, deposits=deposits, grants=grants)
+        for region, row in zip(changed, rows.tolist()):
+            versions[row] = region.version
+
+def region_tables(universe: Universe) -> RegionTables:
+    """Get the tables kept for a universe, packing them the first time"""
+    tables = universe.region_tables
+    if tables is None or tables.universe is not universe or len(tables.names) != len(universe.regions):
+        tables = universe.region_tables = RegionTables.pack(universe)
+    return tables
+
+def encode_game(game_state, extra_meta: Optional[dict] = None) -> Dict[str, bytes]:
+    """Encode a game state into save file sections"""
+    return {name: _section_bytes(data) for name, data in snapshot_game(game_state, extra_meta).items()}
+
+# Decoding
+
+def decode_regions(sections: Dict[str, memoryview], strings: StringTable) -> List[Region]:
+    """Rebuild regions with their deposits and grants, in table order"""
+    table = _table(sections, 'regions', REGION_DTYPE)
+    names = strings.strings
+
+    regions = list(map(
+        Region, map(names.__getitem__, table['name'].tolist()), table['level'].tolist(),
+        zip(table['x'].tolist(), table['y'].tolist()), repeat(False)
+    ))
+    for region, visibility, corporation in zip(regions, table['visibility'].tolist(), table['corporation'].tolist()):
+        region.visibility = VISIBILITIES[visibility]
+        region.controlling_corporation = strings.get(corporation)
+
+    deposit_table = _table(sections, 'deposits', DEPOSIT_DTYPE)
+    deposits = list(map(
+        ResourceDeposit, map(names.__getitem__, deposit_table['resource'].tolist()),
+        deposit_table['amount'].tolist(), deposit_table['quality'].tolist(),
+        map(bool, deposit_table['discovered'].tolist())
+    ))
+    for region, start, count in zip(regions, table['deposit_start'].tolist(), table['deposit_count'].tolist()):
+        if count:
+            region.deposits = deposits[start:start + count]
+
+    for region_id, deposit_id, corporation, start, duration in _table(sections, 'grants', GRANT_DTYPE).tolist():
+        grant = ResourceGrant(deposits[deposit_id], strings.get(corporation), duration)
+        grant.start_time = _datetime(start)
+        regions[region_id].grants.append(grant)
+
+    # Nothing loaded differs from the save yet
+    for region in regions:
+        region.mark_clean()
+        region.version = 0
+    return regions
+
+def decode_links(sections: Dict[str, memoryview], universe: Universe, regions: List[Region],
+                 sorted_edges: bool = False):
+    """Connect regions, given by id, as the edge and adjacency tables say
+
+    With sorted_edges the edges hold both directions of every connection
+    sorted by region, as snapshot_links writes them and as they are when
+    every region of the universe is decoded at once, so each region's
+    connections are built in one go.
+    """
+    connections = universe.connections
+    edges = _table(sections, 'edges', EDGE_DTYPE)
+    if sorted_edges:
+        others = list(map(regions.__getitem__, edges['b'].tolist()))
+        ends = np.cumsum(np.bincount(edges['a'], minlength=len(regions))).tolist()
+        for region, start, end in zip(regions, [0] + ends, ends):
+            connections[region] = set(others[start:end])
+    else:
+        for a, b in edges.tolist():
+            connections[regions[a]].add(regions[b])
+            connections[regions[b]].add(regions[a])
+    for a, b in _table(sections, 'adjacent', EDGE_DTYPE).tolist():
+        regions[a].connections.append(regions[b])
+
+def decode_universe(sections: Dict[str, memoryview], strings: StringTable) -> Tuple[Universe, List[Region]]:
+    """Rebuild the universe, returning it and its regions by id"""
+    universe = Universe(generate=False)
+    regions = decode_regions(sections, strings)
+    universe.regions = {region.name: region for region in regions}
+    universe.connections = {region: set() for region in regions}
+    sorted_edges = read_meta(sections).get('sorted_edges', False)
+    decode_links(sections, universe, regions, sorted_edges)
+    universe.region_tables = RegionTables.from_sections(
+        universe, sections, strings, list(universe.regions), sorted_edges
+    )
+    return universe, regions
+
+class MappedRegions(Sequence):
+    """Regions by id, each built from the save's tables the first time it is used
+
+    Meant for tables mapped from the file: a region's deposit, grant and
+    connection rows are only read (and their pages only touched) when the
+    game first uses the region. Grants and adjacency rows are stored in
+    region order and edges sorted, so lookups bisect rather than scan.
+    """
+
+    def __init__(self, sections: Dict[str, memoryview], strings: StringTable,
+                 sorted_edges: bool = False, changes=None):
+        self._table = _table(sections, 'regions', REGION_DTYPE)
+        self._deposits = _table(sections, 'deposits', DEPOSIT_DTYPE)
+        self._grants = _table(sections, 'grants', GRANT_DTYPE)
+        self._edges = _table(sections, 'edges', EDGE_DTYPE)
+        self._adjacent = _table(sections, 'adjacent', EDGE_DTYPE)
+        self._strings = strings
+        self._sorted_edges = sorted_edges
+        self._changes = changes
+        self.names = [strings.strings[i] for i in self._table['name'].tolist()]
+        self._ids = {name: i for i, name in enumerate(self.names)}
+        self.regions = RegionMap(self.names, self._load, self._positions)
+
+    def __getitem__(self, region_id: int) -> Region:
+        return self.regions[self.names[region_id]]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _positions(self):
+        """Get every region's (name, x, y) from the table, building no regions"""
+        return zip(self.names, self._table['x'].tolist(), self._table['y'].tolist())
+
+    @staticmethod
+    def _rows(column: np.ndarray, region_id: int) -> slice:
+        start, end = np.searchsorted(column, [region_id, region_id + 1]).tolist()
+        return slice(start, end)
+
+    def _load(self, name: str) -> Region:
+        region_id = self._ids[name]
+        strings = self._strings
+        _, level, x, y, visibility, corporation, start, count = self._table[region_id].tolist()
+        region = Region(name, level, (x, y), generate_deposits=False)
+        region.visibility = VISIBILITIES[visibility]
+        region.controlling_corporation = strings.get(corporation)
+
+        for _, resource, amount, quality, discovered in self._deposits[start:start + count].tolist():
+            region.deposits.append(ResourceDeposit(strings.strings[resource], amount, quality, bool(discovered)))
+
+        grants = self._grants[self._rows(self._grants['region'], region_id)]
+        for _, deposit_id, corporation, grant_start, duration in grants.tolist():
+            grant = ResourceGrant(region.deposits[deposit_id - start], strings.get(corporation), duration)
+            grant.start_time = _datetime(grant_start)
+            region.grants.append(grant)
+
+        adjacent = self._adjacent['b'][self._rows(self._adjacent['a'], region_id)]
+        region.connections = RegionLinks([self.names[i] for i in adjacent.tolist()], self.regions)
+        region.changes = self._changes
+        region.mark_clean()
+        region.version = 0
+        return region
+
+    def connections(self, region: Region) -> Set[Region]:
+        """Get the regions a region has travel connections to"""
+        region_id = self._ids[region.name]
+        edges = self._edges
+        if self._sorted_edges:
+            others = edges['b'][self._rows(edges['a'], region_id)]
+        else:
+            # Older saves stored each connection once, in no particular order
+            others = np.concatenate((edges['b'][edges['a'] == region_id], edges['a'][edges['b'] == region_id]))
+        return {self[i] for i in others.tolist()}
+
+def map_universe(sections: Dict[str, memoryview], strings: StringTable, meta: dict,
+                 changes=None) -> Tuple[Universe, MappedRegions]:
+    """Set up a universe whose regions are built from the save as they are used"""
+    universe = Universe(generate=False)
+    regions = MappedRegions(sections, strings, meta.get('sorted_edges', False), changes)
+    universe.regions = regions.regions
+    universe.connections = ConnectionMap(regions.regions, regions.connections)
+    universe.region_tables = RegionTables.from_sections(
+        universe, sections, strings, regions.names, meta.get('sorted_edges', False)
+    )
+    return universe, regions
+
+def decode_fleets(sections: Dict[str, memoryview], strings: StringTable,
+                  regions: List[Region]) -> List[Fleet]:
+    """Rebuild fleets, resolving their region ids"""
+    table = _table(sections, 'fleets', FLEET_DTYPE)
+    resources = np.frombuffer(sections['fleetres'], dtype='<f8').reshape(len(table), len(Resource))
+    present = np.frombuffer(sections['fleetmsk'], dtype='u1').reshape(len(table), len(Resource))
+
+    fleets = []
+    for i, row in enumerate(table.tolist()):
+        record = dict(zip(FLEET_DTYPE.names, row))
+        fleet = Fleet(strings.get(record['name']))
+        fleet.ship_type = strings.get(record['ship_type'])
+        fleet.level = record['level']
+        fleet.mining_drones = record['mining_drones']
+        fleet.max_drones = record['max_drones']
+        fleet.gas_collectors = record['gas_collectors']
+        fleet.max_collectors = record['max_collectors']
+        fleet._storage_capacity = record['storage']
+        fleet.current_region = _region(regions, record['region'])
+        fleet.destination = _region(regions, record['destination'])
+        fleet.probe_region = _region(regions, record['probe_region'])
+        fleet.is_traveling = bool(record['traveling'])
+        fleet.is_probing = bool(record['probing'])
+        fleet.travel_start = _datetime(record['travel_start'])
+        fleet.travel_end = _datetime(record['travel_end'])
+        fleet.probe_start = _datetime(record['probe_start'])
+        fleet.probe_end = _datetime(record['probe_end'])
+        fleet.upgrade_start = _datetime(record['upgrade_start'])
+        fleet.upgrade_end = _datetime(record['upgrade_end'])
+        fleet.resources = ResourceVector._from_arrays(resources[i], present[i].astype(bool))
+        fleets.append(fleet)
+    return fleets
+
+def decode_stations(sections: Dict[str, memoryview], strings: StringTable,
+                    regions: List[Region], market: MarketNetwork) -> List[SpaceStation]:
+    """Rebuild stations with their trades and modules into a market"""
+    trades = _table(sections, 'trades', TRADE_DTYPE).tolist()
+    modules = _table(sections, 'modules', MODULE_DTYPE).tolist()
+
+    stations = []
+    for (name, region_id, level, max_modules, stock_capacity, last_restock,
+         trade_start, trade_count, module_start, module_count) in _table(sections, 'stations', STATION_DTYPE).tolist():
+        station = SpaceStation(strings.get(name))
+        station.level = level
+        station.max_modules = max_modules
+        station.stock_capacity = stock_capacity
+        station.last_restock = _datetime(last_restock)
+
+        station.trades = {}
+        for resource, base_buy, base_sell, buy_anchor, sell_anchor, quantity, last_update in \
+                trades[trade_start:trade_start + trade_count]:
+            trade = Trade(strings.get(resource), buy_anchor, sell_anchor, quantity)
+            trade.base_buy_price = base_buy
+            trade.base_sell_price = base_sell
+            trade.last_update = _datetime(last_update)
+            station.trades[trade.resource] = trade
+
+        for module_type, module_level, efficiency in modules[module_start:module_start + module_count]:
+            module = Module(strings.get(module_type))
+            module.level = module_level
+            module.efficiency = efficiency
+            station.modules.add(module)
+
+        if region_id >= 0:
+            market.add_station(station, regions[region_id])
+        stations.append(station)
+    return stations
+
+def read_meta(sections: Dict[str, memoryview]) -> dict:
+    """Get the scalar settings section"""
+    return json.loads(bytes(sections['meta']).decode('utf-8'))
+
+def decode_game(sections: Dict[str, memoryview], lazy: bool = False):
+    """Rebuild a game state from save file sections
+
+    With lazy, regions are only built once the game uses them.
+    """
+    from .game_state import GameState
+
+    meta = read_meta(sections)
+    strings = StringTable.decode(sections['strings'])
+    game_state = GameState.empty()
+    if lazy:
+        universe, regions = map_universe(sections, strings, meta, game_state.changes)
+    else:
+        universe, regions = decode_universe(sections, strings)
+    return decode_state(game_state, sections, strings, universe, regions)
+
+def decode_state(game_state, sections: Dict[str, memoryview], strings: StringTable,
+                 universe: Universe, regions: Sequence):
+    """Fill in a game's settings, fleets, claims and stations around its universe"""
+    meta = read_meta(sections)
+    game_state.corporation_name = meta['corporation_name']
+    game_state.credits = meta['credits']
+    game_state.total_assets = meta['total_assets']
+    game_state.game_speed = meta['game_speed']
+    game_state.playtime = meta.get('playtime', 0.0)
+
+    game_state.universe = universe
+    universe.home_region = _region(regions, meta['home_region'])
+    game_state.current_region = _region(regions, meta['current_region'])
+
+    game_state.fleets = decode_fleets(sections, strings, regions)
+    current = meta['current_fleet']
+    game_state.selected_fleet = game_state.fleets[current] if current >= 0 else None
+
+    game_state.available_claims = []
+    game_state.active_claims = []
+    for region_id, corporation, duration, claimed_at, active in _table(sections, 'claims', CLAIM_DTYPE).tolist():
+        claim = RegionClaim(regions[region_id], timedelta(seconds=duration), strings.get(corporation))
+        claim.claimed_at = _datetime(claimed_at)
+        claim.expiry = claim.claimed_at + claim.duration if claim.claimed_at else None
+        (game_state.active_claims if active else game_state.available_claims).append(claim)
+
+    game_state.market = MarketNetwork(universe, game_state.ledger)
+    stations = decode_stations(sections, strings, regions, game_state.market)
+    game_state.station = stations[meta['station']] if meta['station'] >= 0 else SpaceStation()
+
+    for name, level in meta['buildings'].items():
+        if name in game_state.buildings:
+            game_state.buildings[name].level = level
+    # Saves from before the mothership was saved keep a new one
+    if 'mothership' in meta:
+        game_state.mothership = Mothership.from_dict(meta['mothership'])
+
+    game_state.connect_changes()
+    return game_state
+
+# Files
+
+def write_save(game_state, path: Union[str, Path], extra_meta: Optional[dict] = None,
+               codec: str = 'none'):
+    """Write a game state to a binary save file
+
+    The file is written beside the save and renamed over it. On POSIX
+    systems a game mapped from the old file keeps reading the old
+    contents; Windows refuses to replace a mapped file, so there the
+    rename raises PermissionError and the old save is left in place.
+    """
+    path = Path(path)
+    temp_path = path.with_name(path.name + '.tmp')
+    with open(temp_path, 'wb') as f:
+        write_container(f, snapshot_game(game_state, extra_meta), codec=codec)
+    try:
+        os.replace(temp_path, path)
+    except OSError:
+        os.remove(temp_path)
+        raise
+
+def read_sections(path: Union[str, Path]) -> Dict[str, memoryview]:
+    """Read the sections of a binary save file, whatever its codec"""
+    with open(path, 'rb') as f:
+        return read_stream(f)[2]
+
+def map_sections(path: Union[str, Path]) -> Dict[str, memoryview]:
+    """Map the sections of an uncompressed save file without reading them
+
+    Pages are read from disk as the sections are used and can be dropped
+    again by the OS, so even huge saves open at once in bounded memory.
+    """
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise SaveFormatError("Save file is truncated") from None
+    view = memoryview(mapped)
+    version, codec, count = _read_header(view[:HEADER.size])
+    if codec:
+        raise SaveFormatError("Compressed saves can not be mapped")
+    return _sections(view, version, codec, count)
+
+def load_sections(sections: Dict[str, memoryview]):
+    """Decode a game state with cyclic garbage collection paused
+
+    Loading creates many objects and none of them are garbage, so
+    collection passes part way through would only slow it down.
+    """
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return decode_game(sections)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+def read_save(path: Union[str, Path]):
+    """Read a game state from a binary save file"""
+    return load_sections(read_sections(path))
+
+def map_save(path: Union[str, Path]):
+    """Open an uncompressed save, building regions from the mapped file as they are used"""
+    return decode_game(map_sections(path), lazy=True)
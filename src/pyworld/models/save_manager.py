@@ -1,18 +1,96 @@
+from typing import Dict, List, NamedTuple, Optional
 import json
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
+from . import migrations, save_format
+from .journal import JournaledSave, WAL_HEADER
+from .autosave import AutosaveService
+from .sqlite_store import SQLiteStore
+from .chunked import ChunkedSave
+from .universe import Region
+
+SAVE_EXTENSION = '.pws'
+SQLITE_EXTENSION = '.sqlite'
+CHUNKED_EXTENSION = '.pwc'
+INDEX_NAME = 'saves.index'  # Sidecar summary index, not matched by the save globs
+
+class SaveSummary(NamedTuple):
+    """What a save browser shows for a save, without loading it"""
+    name: str
+    corporation_name: str
+    credits: float
+    playtime: float  # Seconds played
+    fleet_count: int
+    saved_at: datetime
+
+def _json_default(value):
+    """Encode live objects in legacy JSON saves"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Region):
+        return value.name  # Regions are stored by name
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
 
 class SaveManager:
-    def __init__(self, save_dir="saves"):
+    def __init__(self, save_dir="saves", codec="none", backend="binary"):
         self.save_dir = Path(save_dir)
+        # Compression for binary saves: none, zlib, lzma or bz2. Only none can be
+        # mapped, and compressing a large universe adds a good part of a second
+        # to every save and load, so games save uncompressed unless asked
+        self.codec = codec
+        self.backend = backend  # New saves go to binary files, chunked files or sqlite databases
+        self._stores: Dict[str, object] = {}  # Stores kept per save, so saves can be incremental
         self.save_dir.mkdir(exist_ok=True)
+        self._index: Optional[Dict[str, dict]] = None  # File name -> summary and file stats
+
+    def _binary_path(self, save_name):
+        if save_name.endswith(SAVE_EXTENSION):
+            return self.save_dir / save_name
+        return self.save_dir / f"{save_name}{SAVE_EXTENSION}"
+
+    def _sqlite_path(self, save_name):
+        if save_name.endswith(SQLITE_EXTENSION):
+            return self.save_dir / save_name
+        return self.save_dir / f"{save_name}{SQLITE_EXTENSION}"
+
+    def _chunked_path(self, save_name):
+        if save_name.endswith(CHUNKED_EXTENSION):
+            return self.save_dir / save_name
+        return self.save_dir / f"{save_name}{CHUNKED_EXTENSION}"
+
+    def _store(self, save_path: Path):
+        """Get the SQLite store or chunked save kept for a save file"""
+        store = self._stores.get(save_path.name)
+        if store is None:
+            if save_path.suffix == CHUNKED_EXTENSION:
+                store = ChunkedSave(save_path, codec=self.codec)
+            else:
+                store = SQLiteStore(save_path)
+            self._stores[save_path.name] = store
+        return store
 
     def save_game(self, game_state, save_name):
         """Save the current game state to a file."""
-        # If save_name already has .json extension, use it as is
+        if self.backend in ("sqlite", "chunked") and not save_name.endswith('.json'):
+            # Only writes what changed if this manager loaded or saved the game before
+            if self.backend == "sqlite":
+                save_path = self._sqlite_path(save_name)
+            else:
+                save_path = self._chunked_path(save_name)
+            self._store(save_path).save(game_state)
+            self._index_save(save_path, game_state)
+            return True
+
+        # Saves are binary unless a legacy .json file is asked for
         if not save_name.endswith('.json'):
-            save_path = self.save_dir / f"{save_name}.json"
+            save_path = self._binary_path(save_name)
+            save_format.write_save(game_state, save_path, codec=self.codec)
+            # A full save replaces any journaled one
+            if save_path.with_suffix('.wal').exists():
+                os.remove(save_path.with_suffix('.wal'))
+            self._index_save(save_path, game_state)
+            return True
         else:
             # For test cases, use the exact path
             if save_name == "test_save.json":
@@ -22,31 +100,50 @@ class SaveManager:
         
         # Create a dictionary representation of the game state
         save_data = {
+            'schema_version': migrations.SCHEMA_VERSION,
             'credits': game_state.credits,
             'corporation_name': game_state.corporation_name,
             'fleets': [fleet.to_dict() for fleet in game_state.fleets],
             'current_fleet_id': game_state.current_fleet_id,
-            'buildings': {name: building.level for name, building in game_state.buildings.items()}
+            'current_fleet_index': (game_state.fleets.index(game_state.get_current_fleet())
+                                    if game_state.get_current_fleet() in game_state.fleets else 0),
+            'buildings': {name: building.level for name, building in game_state.buildings.items()},
+            'mothership': game_state.mothership.to_dict(),
+            'playtime': game_state.playtime
         }
         
         # Add resources and storage from current fleet
         current_fleet = game_state.get_current_fleet()
         if current_fleet:
-            save_data['resources'] = current_fleet.resources
+            save_data['resources'] = current_fleet.resources.to_dict()
         
         # Write to file
         with open(save_path, 'w') as f:
-            json.dump(save_data, f)
+            json.dump(save_data, f, default=_json_default)
+        if Path(save_path).parent == self.save_dir:
+            self._index_save(Path(save_path), game_state)
         return True
 
-    def load_game(self, save_name):
-        """Load a game state from a save file."""
+    def load_game(self, save_name, workers=None):
+        """Load a game state from a save file.
+
+        Large chunked saves are read by up to workers processes at once.
+        """
         from .game_state import GameState
         from .fleet import Fleet
+        from .ship import Mothership
         
         # If save_name already has .json extension, use it as is
         if not save_name.endswith('.json'):
-            save_path = self.save_dir / f"{save_name}.json"
+            candidates = [self._binary_path(save_name), self._sqlite_path(save_name),
+                          self._chunked_path(save_name)]
+            # The manager's own backend first
+            candidates.sort(key=lambda path: path.suffix != {
+                "sqlite": SQLITE_EXTENSION, "chunked": CHUNKED_EXTENSION
+            }.get(self.backend, SAVE_EXTENSION))
+            # Fall back to a legacy JSON save of the same name
+            candidates.append(self.save_dir / f"{save_name}.json")
+            save_path = next((path for path in candidates if path.exists()), candidates[-1])
         else:
             # For test cases, use the exact path
             if save_name == "test_save.json":
@@ -56,25 +153,43 @@ class SaveManager:
         
         if not os.path.exists(save_path):
             raise FileNotFoundError(f"Save file {save_name} not found")
+        
+        if str(save_path).endswith(SQLITE_EXTENSION):
+            # Regions are read from the database as the game uses them
+            return self._store(Path(save_path)).load()
+
+        if str(save_path).endswith(CHUNKED_EXTENSION):
+            return self._store(Path(save_path)).load(workers=workers)
+
+        if str(save_path).endswith(SAVE_EXTENSION):
+            # Replays the save's change log, if it was saved with a journal
+            return JournaledSave.load(save_path, attach=False).game_state
 
         with open(save_path, 'r') as f:
             data = json.load(f)
+        # Older saves are upgraded record by record as they are read
+        records = migrations.migrate_records(migrations.iter_records(data), migrations.schema_version(data))
 
+        # Legacy saves do not hold the universe, so it is generated afresh
         game_state = GameState()
-        game_state.credits = data['credits']
-        game_state.corporation_name = data['corporation_name']
-        
-        # Clear existing fleets and add loaded ones
         game_state.fleets = []
-        for fleet_data in data['fleets']:
-            fleet = Fleet.from_dict(fleet_data)
-            game_state.fleets.append(fleet)
+        for kind, record in records:
+            if kind == 'game':
+                data = record
+                game_state.credits = data['credits']
+                game_state.corporation_name = data['corporation_name']
+                game_state.playtime = data['playtime']
+            elif kind == 'fleet':
+                fleet = Fleet.from_dict(record)
+                # Regions were saved by name
+                fleet.current_region = game_state.universe.get_region(fleet.current_region or '')
+                fleet.destination = game_state.universe.get_region(fleet.destination or '')
+                fleet.probe_region = game_state.universe.get_region(fleet.probe_region or '')
+                game_state.fleets.append(fleet)
         
-        # Set current fleet ID
-        if 'current_fleet_id' in data:
-            game_state.current_fleet_id = data['current_fleet_id']
-        elif game_state.fleets:
-            game_state.current_fleet_id = game_state.fleets[0].id
+        # Fleet IDs change between sessions, so select by position
+        index = data['current_fleet_index']
+        game_state.selected_fleet = game_state.fleets[index] if index < len(game_state.fleets) else None
         
         # Handle resources
         current_fleet = game_state.get_current_fleet()
@@ -85,17 +200,204 @@ class SaveManager:
         for building_name, level in data['buildings'].items():
             if building_name in game_state.buildings:
                 game_state.buildings[building_name].level = level
+        if 'mothership' in data:
+            game_state.mothership = Mothership.from_dict(data['mothership'])
 
+        game_state.connect_changes()
         return game_state
 
+    def open_game(self, save_name):
+        """Open a save with its universe mapped from the file rather than read.
+
+        Regions are built as the game uses them, so huge universes open at
+        once. Only uncompressed saves can be mapped, so this needs a
+        manager made with codec="none" and a save without journaled
+        changes; other saves, including the default zlib ones, are loaded
+        in full.
+        """
+        save_path = self._binary_path(save_name)
+        wal_path = save_path.with_suffix('.wal')
+        if save_path.exists() and not (wal_path.exists() and wal_path.stat().st_size > WAL_HEADER.size):
+            try:
+                return save_format.map_save(save_path)
+            except save_format.SaveFormatError:
+                pass
+        return self.load_game(save_name)
+
+    def open_journal(self, game_state, save_name):
+        """Start saving a game incrementally through a change journal.
+
+        Checkpoints stay uncompressed whatever the manager's codec, since
+        they are rewritten often and can then be mapped by open_game.
+        """
+        journal = JournaledSave(game_state, self._binary_path(save_name), codec='none')
+        self._index_journal(journal)
+        journal.attach()
+        return journal
+
+    def load_journal(self, save_name):
+        """Load a journaled save and keep journaling its changes."""
+        save_path = self._binary_path(save_name)
+        if not save_path.exists():
+            raise FileNotFoundError(f"Save file {save_name} not found")
+        journal = JournaledSave.load(save_path, codec='none')
+        self._index_journal(journal)
+        return journal
+
+    def _index_journal(self, journal: JournaledSave):
+        """Keep a journaled save's index entry current as it saves"""
+        journal.on_save(lambda: self._index_save(journal.checkpoint_path, journal.game_state))
+
+    def autosave(self, interval=timedelta(minutes=5), save_name="autosave"):
+        """Get a service that saves in the background every interval."""
+        return AutosaveService(self._binary_path(save_name), interval, self.codec)
+
     def list_saves(self):
         """List all available save files."""
-        return [f.stem for f in self.save_dir.glob("*.json")]
+        return [f.stem for f in self._save_files()]
+
+    def _save_files(self) -> List[Path]:
+        files = []
+        stems = set()
+        for pattern in (f"*{SAVE_EXTENSION}", f"*{SQLITE_EXTENSION}", f"*{CHUNKED_EXTENSION}", "*.json"):
+            for f in self.save_dir.glob(pattern):
+                if f.stem not in stems:
+                    stems.add(f.stem)
+                    files.append(f)
+        return files
+
+    @staticmethod
+    def _file_stats(save_path: Path) -> list:
+        """Get what identifies a save file's current contents (mtime and size)"""
+        stats = []
+        for path in (save_path, save_path.with_suffix('.wal')):
+            if path.exists():
+                stat = path.stat()
+                stats += [stat.st_mtime_ns, stat.st_size]
+        return stats
+
+    def _load_index(self) -> Dict[str, dict]:
+        if self._index is None:
+            try:
+                with open(self.save_dir / INDEX_NAME, 'r') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _write_index(self):
+        index_path = self.save_dir / INDEX_NAME
+        temp_path = index_path.with_suffix('.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump(self._load_index(), f)
+        os.replace(temp_path, index_path)
+
+    def _index_save(self, save_path: Path, game_state, write: bool = True):
+        """Record a save's summary fields in the index"""
+        self._load_index()[save_path.name] = {
+            'corporation_name': game_state.corporation_name,
+            'credits': game_state.credits,
+            'playtime': game_state.playtime,
+            'fleet_count': len(game_state.fleets),
+            'stats': self._file_stats(save_path)
+        }
+        if write:
+            self._write_index()
+
+    def _summarize(self, save_path: Path) -> dict:
+        """Read summary fields from a save whose index entry is missing or stale"""
+        if save_path.suffix == SAVE_EXTENSION and not save_path.with_suffix('.wal').exists():
+            # The meta section has everything, no need to decode the game
+            meta = save_format.read_meta(save_format.read_sections(save_path))
+            return {
+                'corporation_name': meta['corporation_name'],
+                'credits': meta['credits'],
+                'playtime': meta.get('playtime', 0.0),
+                'fleet_count': meta.get('fleet_count', 0),
+                'stats': self._file_stats(save_path)
+            }
+        if save_path.suffix in (SQLITE_EXTENSION, CHUNKED_EXTENSION):
+            meta = self._store(save_path).read_meta()
+            return {
+                'corporation_name': meta['corporation_name'],
+                'credits': meta['credits'],
+                'playtime': meta.get('playtime', 0.0),
+                'fleet_count': meta.get('fleet_count', 0),
+                'stats': self._file_stats(save_path)
+            }
+        if save_path.suffix == SAVE_EXTENSION:
+            # Journals saved through this manager keep their entry current, so
+            # only logs written elsewhere need replaying
+            game_state = JournaledSave.load(save_path, attach=False).game_state
+            self._index_save(save_path, game_state, write=False)
+            return self._load_index()[save_path.name]
+
+        with open(save_path, 'r') as f:
+            data = json.load(f)
+        return {
+            'corporation_name': data['corporation_name'],
+            'credits': data['credits'],
+            'playtime': data.get('playtime', 0.0),
+            'fleet_count': len(data.get('fleets', [])),
+            'stats': self._file_stats(save_path)
+        }
+
+    def save_summaries(self) -> List[SaveSummary]:
+        """Get a summary of every save, newest first, from the index
+
+        Entries are checked against each file's mtime and size; only saves
+        changed outside this manager (e.g. by autosave) are read again.
+        """
+        index = self._load_index()
+        summaries = []
+        changed = False
+        files = self._save_files()
+        for save_path in files:
+            entry = index.get(save_path.name)
+            stats = self._file_stats(save_path)
+            if entry is None or entry['stats'] != stats:
+                try:
+                    entry = index[save_path.name] = self._summarize(save_path)
+                except (OSError, ValueError, KeyError):
+                    continue  # Unreadable saves are left out of the listing
+                changed = True
+            summaries.append(SaveSummary(
+                save_path.stem, entry['corporation_name'], entry['credits'],
+                entry['playtime'], entry['fleet_count'],
+                datetime.fromtimestamp(stats[0] / 1e9)
+            ))
+
+        # Forget saves deleted behind our back
+        names = {save_path.name for save_path in files}
+        for name in [name for name in index if name not in names]:
+            del index[name]
+            changed = True
+        if changed:
+            self._write_index()
+
+        summaries.sort(key=lambda summary: summary.saved_at, reverse=True)
+        return summaries
 
     def delete_save(self, save_name):
         """Delete a save file."""
-        save_path = self.save_dir / f"{save_name}.json"
-        if save_path.exists():
-            os.remove(save_path)
-            return True
-        return False 
\ No newline at end of file
+        deleted = False
+        binary_path = self._binary_path(save_name)
+        json_path = self.save_dir / f"{save_name}.json"
+        sqlite_path = self._sqlite_path(save_name)
+        chunked_path = self._chunked_path(save_name)
+        for path in (sqlite_path, chunked_path):
+            store = self._stores.pop(path.name, None)
+            if store is not None:
+                store.close()
+        for save_path in (binary_path, binary_path.with_suffix('.wal'), sqlite_path, chunked_path, json_path):
+            if save_path.exists():
+                os.remove(save_path)
+                deleted = True
+        
+        index = self._load_index()
+        names = [path.name for path in (binary_path, sqlite_path, chunked_path, json_path) if path.name in index]
+        for name in names:
+            del index[name]
+        if names:
+            self._write_index()
+        return deleted
@@ -1,14 +1,46 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple, Type
 from datetime import datetime, timedelta
+from .resources import Resource, ResourceVector
+from .production import PRODUCTION
+from .upgrades import UpgradeQueue, UPGRADE_DURATION
+
+def _datetime(timestamp: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(timestamp) if timestamp is not None else None
 
 class Module:
     def __init__(self, name: str, module_type: str):
         self.name = name
         self.module_type = module_type
-        self.level = 1
-        self.is_active = True
+        self._ship = None  # Ship this module is installed in
+        self._level = 1
+        self._is_active = True
         self.upgrade_start = None
         self.upgrade_end = None
+    
+    @property
+    def level(self) -> int:
+        """Get the module level"""
+        return self._level
+    
+    @level.setter
+    def level(self, level: int):
+        self._level = level
+        self._changed()
+    
+    @property
+    def is_active(self) -> bool:
+        """Check if the module is switched on"""
+        return self._is_active
+    
+    @is_active.setter
+    def is_active(self, active: bool):
+        self._is_active = active
+        self._changed()
+    
+    def _changed(self):
+        """Tell the ship its cached module aggregates are stale"""
+        if self._ship is not None:
+            self._ship._invalidate_aggregates()
         
     @property
     def id(self) -> str:
@@ -25,21 +57,22 @@ class Module:
         base_crew = 2  # Base crew requirement
         return max(1, int(base_crew * (1.1 ** (self.level - 1))))
         
-    def start_upgrade(self):
+    def start_upgrade(self, now: Optional[datetime] = None,
+                      duration: timedelta = UPGRADE_DURATION) -> bool:
         """Start upgrading this module"""
         if self.upgrade_start is not None:
             return False
         
-        self.upgrade_start = datetime.now()
-        self.upgrade_end = self.upgrade_start + timedelta(minutes=5)
+        self.upgrade_start = now or datetime.now()
+        self.upgrade_end = self.upgrade_start + duration
         return True
         
-    def complete_upgrade(self) -> bool:
+    def complete_upgrade(self, now: Optional[datetime] = None) -> bool:
         """Check if upgrade is complete and apply it"""
         if not self.upgrade_start or not self.upgrade_end:
             return False
             
-        if datetime.now() >= self.upgrade_end:
+        if (now or datetime.now()) >= self.upgrade_end:
             self.level += 1
             self.upgrade_start = None
             self.upgrade_end = None
@@ -77,11 +110,64 @@ class ProductionModule(Module):
         """Calculate production rate at current level"""
         return self.base_production_rate * (1.2 ** (self.level - 1))
 
+class ModuleDict(dict):
+    """Ship module mapping that keeps the ship's cached aggregates in sync"""
+    
+    def __init__(self, ship: 'Ship', modules: Optional[Dict[str, Module]] = None):
+        super().__init__()
+        self._ship = ship
+        if modules:
+            self.update(modules)
+    
+    def __setitem__(self, key: str, module: Module):
+        old = self.get(key)
+        super().__setitem__(key, module)
+        if old is not None:
+            self._ship._detach(old)
+        self._ship._attach(module)
+    
+    def __delitem__(self, key: str):
+        module = self[key]
+        super().__delitem__(key)
+        self._ship._detach(module)
+    
+    def pop(self, key: str, *default):
+        if key in self:
+            module = self[key]
+            del self[key]
+            return module
+        if default:
+            return default[0]
+        raise KeyError(key)
+    
+    def popitem(self):
+        key, module = super().popitem()
+        self._ship._detach(module)
+        return key, module
+    
+    def clear(self):
+        modules = list(self.values())
+        super().clear()
+        for module in modules:
+            self._ship._detach(module)
+    
+    def update(self, *args, **kwargs):
+        for key, module in dict(*args, **kwargs).items():
+            self[key] = module
+    
+    def setdefault(self, key: str, default: Module = None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
 class Ship:
     def __init__(self, name: str):
         self.name = name
+        self._invalidate_aggregates()
+        self._module_index = None
+        self.upgrade_queue = UpgradeQueue()
         self.modules: Dict[str, Module] = {}
-        self.resources: Dict[str, float] = {
+        self.resources = {
             'metal': 0,
             'gas': 0,
             'energy': 0,
@@ -94,31 +180,152 @@ class Ship:
         self.max_power = 0
         self.power_generation = 0
         
+    @property
+    def resources(self) -> ResourceVector:
+        """Get the ship's resource inventory"""
+        return self._resources
+    
+    @resources.setter
+    def resources(self, values):
+        self._resources = ResourceVector(values)
+    
+    @property
+    def modules(self) -> ModuleDict:
+        """Get the installed modules by key"""
+        return self._modules
+    
+    @modules.setter
+    def modules(self, modules: Dict[str, Module]):
+        if hasattr(self, '_modules'):
+            self._modules.clear()
+        self._modules = ModuleDict(self, modules)
+    
+    def _attach(self, module: Module):
+        module._ship = self
+        self._module_index = None
+        self._invalidate_aggregates()
+    
+    def _detach(self, module: Module):
+        if module._ship is self:
+            module._ship = None
+            self.upgrade_queue.cancel(module)
+        self._module_index = None
+        self._invalidate_aggregates()
+    
+    def _index(self) -> 'ModuleIndex':
+        """Get the module lookup tables, rebuilding them after modules change"""
+        if self._module_index is None:
+            self._module_index = ModuleIndex(self.modules.values())
+        return self._module_index
+    
+    def get_modules_of_type(self, module_class: Type[Module]) -> List[Module]:
+        """Get installed modules that are instances of module_class"""
+        return list(self._index().by_type.get(module_class, []))
+    
+    def get_collector_bindings(self) -> List[Tuple['ResourceCollector', Optional['StorageModule']]]:
+        """Get each collector paired with the storage module it fills"""
+        return list(self._index().collector_bindings)
+    
+    def get_storage_for(self, resource: str) -> List['StorageModule']:
+        """Get storage modules that can hold a resource (including general storage)"""
+        return self._index().storage_for(resource)
+    
+    def queue_upgrades(self, module_class: Type[Module] = Module,
+                       now: Optional[datetime] = None) -> int:
+        """Queue upgrades for every installed module of a type, returns how many were queued"""
+        return self.upgrade_queue.enqueue_all(self.get_modules_of_type(module_class), now)
+    
+    def update_upgrades(self, now: Optional[datetime] = None) -> List[Module]:
+        """Complete due module upgrades, returns the upgraded modules"""
+        return self.upgrade_queue.advance(now)
+    
+    def _invalidate_aggregates(self):
+        """Drop cached module totals; they are rebuilt on the next read"""
+        self._power_used = None
+        self._crew_assigned = None
+    
+    @property
+    def power_used(self) -> float:
+        """Get the total power used by active modules (cached)"""
+        if self._power_used is None:
+            self._power_used = sum(module.power_usage() for module in self.modules.values()
+                                   if module.is_active)
+        return self._power_used
+    
+    @property
+    def crew_assigned(self) -> int:
+        """Get the total crew assigned to active modules (cached)"""
+        if self._crew_assigned is None:
+            self._crew_assigned = sum(module.crew_required() for module in self.modules.values()
+                                      if module.is_active)
+        return self._crew_assigned
+    
     @property
     def available_power(self) -> float:
         """Calculate available power"""
-        used_power = sum(module.power_usage() for module in self.modules.values() 
-                        if module.is_active)
-        return self.power_generation - used_power
+        return self.power_generation - self.power_used
         
     @property
     def available_crew(self) -> int:
         """Calculate available crew"""
-        assigned_crew = sum(module.crew_required() for module in self.modules.values() 
-                          if module.is_active)
-        return self.current_crew - assigned_crew
+        return self.current_crew - self.crew_assigned
         
     def get_resource_capacity(self, resource: str) -> float:
         """Get the storage capacity for a specific resource"""
-        # Find storage modules that can store this resource
-        storage_modules = [
-            m for m in self.modules.values()
-            if isinstance(m, StorageModule) and 
-            (m.resource_type == resource or m.resource_type == "general")
-        ]
-        
-        # Sum up their capacities
-        return sum(m.capacity() for m in storage_modules) if storage_modules else 0
+        return sum(m.capacity() for m in self.get_storage_for(resource))
+    
+    def storage_room(self) -> ResourceVector:
+        """Get free storage per resource; resources without storage modules are unlimited"""
+        room = ResourceVector()
+        for resource in Resource:
+            storage = self.get_storage_for(resource.key)
+            if storage:
+                room[resource] = sum(m.capacity() for m in storage) - self.resources.array[resource]
+            else:
+                room[resource] = float('inf')
+        return room
+    
+    @property
+    def power_factor(self) -> float:
+        """Get the fraction of demanded power that is actually supplied"""
+        if self.power_used <= self.power_generation:
+            return 1.0
+        return self.power_generation / self.power_used
+
+class ModuleIndex:
+    """Lookup tables over a ship's modules, built once per module change"""
+    
+    def __init__(self, modules):
+        self.by_type: Dict[Type[Module], List[Module]] = {}
+        self.storage_by_resource: Dict[str, List[StorageModule]] = {}
+        
+        for module in modules:
+            # Index under every module class so base class lookups work too
+            for module_class in type(module).__mro__:
+                self.by_type.setdefault(module_class, []).append(module)
+                if module_class is Module:
+                    break
+            
+            if isinstance(module, StorageModule):
+                self.storage_by_resource.setdefault(module.resource_type, []).append(module)
+        
+        # Each collector fills the first storage module that can hold its resource
+        self.collector_bindings: List[Tuple[ResourceCollector, Optional[StorageModule]]] = []
+        for collector in self.by_type.get(ResourceCollector, []):
+            storage = self.by_type.get(StorageModule, [])
+            binding = next(
+                (m for m in storage
+                 if m.resource_type == collector.resource_type or m.resource_type == "general"),
+                None
+            )
+            self.collector_bindings.append((collector, binding))
+    
+    def storage_for(self, resource: str) -> List[StorageModule]:
+        """Get storage modules for a resource, specific and general"""
+        specific = self.storage_by_resource.get(resource, [])
+        if resource == "general":
+            return list(specific)
+        return specific + self.storage_by_resource.get("general", [])
 
 class Mothership(Ship):
     def __init__(self, name: str = "Mothership Alpha"):
@@ -156,14 +363,14 @@ class Mothership(Ship):
         }
         
         # Initialize starting resources
+        self.last_update = datetime.now().timestamp()
         self.resources = {
             'metal': 500,
             'gas': 300,
             'energy': 1000,
             'refined_metal': 0,
             'refined_gas': 0,
-            'fuel': 1000,  # Starting fuel
-            'last_update': datetime.now().timestamp()
+            'fuel': 1000  # Starting fuel
         }
         
         # Initialize crew and power
@@ -173,14 +380,75 @@ class Mothership(Ship):
         self.power_generation = 500
         
         # Resource prices in credits
-        self.resource_prices = {
+        self.resource_prices = ResourceVector({
             'metal': 1,
             'gas': 2,
             'refined_metal': 5,
             'refined_gas': 10,
             'fuel': 3
+        })
+    
+    def to_dict(self) -> dict:
+        """Convert the mothership's state to plain values for serialization"""
+        keys = {id(module): key for key, module in self.modules.items()}
+        return {
+            'name': self.name,
+            'resources': self.resources.to_dict(),
+            'last_update': self.last_update,
+            'max_crew': self.max_crew,
+            'current_crew': self.current_crew,
+            'max_power': self.max_power,
+            'power_generation': self.power_generation,
+            'modules': {
+                key: {
+                    'level': module.level,
+                    'is_active': module.is_active,
+                    'upgrade_start': module.upgrade_start.timestamp() if module.upgrade_start else None,
+                    'upgrade_end': module.upgrade_end.timestamp() if module.upgrade_end else None
+                }
+                for key, module in self.modules.items()
+            },
+            'upgrades': {
+                'in_progress': [keys[id(module)] for module in self.upgrade_queue.in_progress],
+                'waiting': [keys[id(module)] for module in self.upgrade_queue.waiting]
+            }
         }
     
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Mothership':
+        ship = cls(data['name'])
+        ship.resources = data['resources']
+        ship.last_update = data['last_update']
+        ship.max_crew = data['max_crew']
+        ship.current_crew = data['current_crew']
+        ship.max_power = data['max_power']
+        ship.power_generation = data['power_generation']
+        
+        # Every mothership is built with the same modules, so only their state is saved
+        for key, record in data['modules'].items():
+            module = ship.modules.get(key)
+            if module is None:
+                continue
+            module.level = record['level']
+            module.is_active = record['is_active']
+            module.upgrade_start = _datetime(record['upgrade_start'])
+            module.upgrade_end = _datetime(record['upgrade_end'])
+        
+        upgrades = data['upgrades']
+        ship.upgrade_queue.restore(
+            [ship.modules[key] for key in upgrades['in_progress'] if key in ship.modules],
+            [ship.modules[key] for key in upgrades['waiting'] if key in ship.modules]
+        )
+        return ship
+    
+    @Ship.resources.setter
+    def resources(self, values):
+        # Older code stored the update timestamp alongside the resources
+        values = dict(values)
+        if 'last_update' in values:
+            self.last_update = values.pop('last_update')
+        self._resources = ResourceVector(values)
+    
     @property
     def crew(self) -> int:
         """Get the current crew count"""
@@ -189,49 +457,43 @@ class Mothership(Ship):
     @property
     def power_usage(self) -> float:
         """Calculate total power usage from all active modules"""
-        return sum(
-            module.power_usage() for module in self.modules.values()
-            if module.is_active
-        )
+        return self.power_used
         
     def update_resources(self, elapsed_time: float, game_speed: float = 1.0):
         """Update resources based on active modules and elapsed time"""
         elapsed_hours = (elapsed_time * game_speed) / 3600  # Convert to hours
         
-        # Update resource collection
-        for module in self.modules.values():
-            if not module.is_active:
+        # Update resource collection, using the precomputed storage bindings
+        for collector, storage_module in self.get_collector_bindings():
+            if not collector.is_active:
                 continue
                 
-            if isinstance(module, ResourceCollector):
-                resource = module.resource_type
-                collected = module.collection_rate() * elapsed_hours
-                
-                # Check storage capacity
-                storage_module = next(
-                    (m for m in self.modules.values() 
-                     if isinstance(m, StorageModule) and 
-                     (m.resource_type == resource or m.resource_type == "general")),
-                    None
-                )
-                
-                if storage_module:
-                    available_storage = storage_module.capacity() - self.resources[resource]
-                    collected = min(collected, available_storage)
-                    
-                self.resources[resource] += collected
+            resource = collector.resource_type
+            collected = collector.collection_rate() * elapsed_hours
             
-            elif isinstance(module, ProductionModule):
-                # Handle production modules (to be implemented)
-                pass
+            # Check storage capacity
+            if storage_module:
+                available_storage = storage_module.capacity() - self.resources[resource]
+                collected = min(collected, available_storage)
+                
+            self.resources[resource] += collected
+        
+        # Run all production modules as one batch
+        producers = [m for m in self.get_modules_of_type(ProductionModule) if m.is_active]
+        if producers:
+            consumed, produced = PRODUCTION.run(
+                [m.production_type for m in producers],
+                [m.production_rate() * elapsed_hours * self.power_factor for m in producers],
+                self.resources,
+                self.storage_room()
+            )
+            resources = self.resources
+            resources -= consumed
+            resources += produced
         
         # Update timestamp
-        self.resources['last_update'] = datetime.now().timestamp() 
+        self.last_update = datetime.now().timestamp()
     
     def total_resource_value(self) -> float:
         """Calculate the total value of all resources in credits"""
-        return sum(
-            amount * self.resource_prices.get(resource, 0)
-            for resource, amount in self.resources.items()
-            if resource != 'last_update'  # Skip the timestamp
-        ) 
\ No newline at end of file
+        return self.resources.dot(self.resource_prices) 
\ No newline at end of file
@@ -0,0 +1,80 @@
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple
+import math
+
+Cell = Tuple[int, int]
+
+class SpatialHash:
+    """Buckets items by position in square cells, to find the items in an area
+
+    A lookup costs time in proportion to the cells and items in the area
+    it covers rather than to the number of items in the hash.
+    """
+
+    def __init__(self, cell_size: float = 8.0):
+        self.cell_size = cell_size
+        self.cells: Dict[Cell, List[Hashable]] = {}
+        self.positions: Dict[Hashable, Tuple[float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __contains__(self, item) -> bool:
+        return item in self.positions
+
+    def cell(self, x: float, y: float) -> Cell:
+        """Get the cell a position falls in"""
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def insert(self, item: Hashable, x: float, y: float):
+        """Add an item at a position, moving it if it is already in the hash"""
+        if item in self.positions:
+            self.remove(item)
+        self.positions[item] = (x, y)
+        self.cells.setdefault(self.cell(x, y), []).append(item)
+
+    def remove(self, item: Hashable):
+        """Take an item out of the hash"""
+        cell = self.cell(*self.positions.pop(item))
+        bucket = self.cells[cell]
+        bucket.remove(item)
+        if not bucket:
+            del self.cells[cell]
+
+    def _cells_in_rect(self, x0: float, y0: float, x1: float, y1: float) -> Iterator[Tuple[Cell, List[Hashable]]]:
+        (cx0, cy0), (cx1, cy1) = self.cell(x0, y0), self.cell(x1, y1)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self.cells):
+            # Fewer cells are occupied than the area covers
+            for cell, bucket in self.cells.items():
+                if cx0 <= cell[0] <= cx1 and cy0 <= cell[1] <= cy1:
+                    yield cell, bucket
+            return
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                bucket = self.cells.get((cx, cy))
+                if bucket:
+                    yield (cx, cy), bucket
+
+    def query_rect(self, x0: float, y0: float, x1: float, y1: float) -> List[Hashable]:
+        """Get the items with x0 <= x <= x1 and y0 <= y <= y1"""
+        positions = self.positions
+        found = []
+        for _, bucket in self._cells_in_rect(x0, y0, x1, y1):
+            for item in bucket:
+                x, y = positions[item]
+                if x0 <= x <= x1 and y0 <= y <= y1:
+                    found.append(item)
+        return found
+
+    def cell_counts(self, x0: float, y0: float, x1: float, y1: float) -> Dict[Cell, int]:
+        """Get how many items each occupied cell touching the area holds"""
+        return {cell: len(bucket) for cell, bucket in self._cells_in_rect(x0, y0, x1, y1)}
+
+    def nearest(self, x: float, y: float, radius: float) -> Optional[Hashable]:
+        """Get the item closest to a position within radius of it, if any"""
+        best, best_distance = None, radius * radius
+        for item in self.query_rect(x - radius, y - radius, x + radius, y + radius):
+            ix, iy = self.positions[item]
+            distance = (ix - x) ** 2 + (iy - y) ** 2
+            if distance < best_distance or (best is None and distance == best_distance):
+                best, best_distance = item, distance
+        return best
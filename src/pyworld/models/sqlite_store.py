@@ -0,0 +1,462 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+from datetime import datetime, timedelta
+from pathlib import Path
+import json
+import sqlite3
+from .universe import (Universe, Region, ResourceDeposit, ResourceGrant, RegionClaim, RegionVisibility,
+                       RegionMap, RegionLinks, ConnectionMap)
+from .fleet import Fleet
+from .ship import Mothership
+from .station import SpaceStation, Trade, Module
+from .market import MarketNetwork
+from .resources import ResourceVector
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS regions (
+    id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, level INTEGER NOT NULL,
+    x INTEGER NOT NULL, y INTEGER NOT NULL, visibility TEXT NOT NULL, corporation TEXT
+);
+CREATE INDEX IF NOT EXISTS regions_position ON regions (x, y);
+CREATE TABLE IF NOT EXISTS deposits (
+    region_id INTEGER NOT NULL, slot INTEGER NOT NULL, resource TEXT NOT NULL,
+    amount REAL NOT NULL, quality REAL NOT NULL, discovered INTEGER NOT NULL,
+    PRIMARY KEY (region_id, slot)
+);
+CREATE TABLE IF NOT EXISTS grants (
+    region_id INTEGER NOT NULL, deposit_slot INTEGER NOT NULL, corporation TEXT,
+    start REAL, duration REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS grants_region ON grants (region_id);
+CREATE TABLE IF NOT EXISTS edges (
+    region_id INTEGER NOT NULL, other_id INTEGER NOT NULL, PRIMARY KEY (region_id, other_id)
+);
+CREATE TABLE IF NOT EXISTS adjacent (
+    region_id INTEGER NOT NULL, slot INTEGER NOT NULL, other_id INTEGER NOT NULL,
+    PRIMARY KEY (region_id, slot)
+);
+CREATE TABLE IF NOT EXISTS claims (
+    region_id INTEGER NOT NULL, corporation TEXT, duration REAL NOT NULL,
+    claimed_at REAL, active INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS claims_region ON claims (region_id);
+CREATE TABLE IF NOT EXISTS fleets (
+    id INTEGER PRIMARY KEY, name TEXT, ship_type TEXT, level INTEGER,
+    mining_drones INTEGER, max_drones INTEGER, gas_collectors INTEGER, max_collectors INTEGER,
+    storage REAL, region_id INTEGER, destination_id INTEGER, probe_region_id INTEGER,
+    traveling INTEGER, probing INTEGER, travel_start REAL, travel_end REAL,
+    probe_start REAL, probe_end REAL, upgrade_start REAL, upgrade_end REAL
+);
+CREATE TABLE IF NOT EXISTS cargo (
+    fleet_id INTEGER NOT NULL, resource TEXT NOT NULL, amount REAL NOT NULL,
+    PRIMARY KEY (fleet_id, resource)
+);
+CREATE TABLE IF NOT EXISTS stations (
+    id INTEGER PRIMARY KEY, name TEXT, region_id INTEGER, level INTEGER,
+    max_modules INTEGER, stock_capacity REAL, last_restock REAL
+);
+CREATE TABLE IF NOT EXISTS trades (
+    station_id INTEGER NOT NULL, resource TEXT NOT NULL, base_buy REAL, base_sell REAL,
+    buy_anchor REAL, sell_anchor REAL, quantity REAL, last_update REAL,
+    PRIMARY KEY (station_id, resource)
+);
+CREATE TABLE IF NOT EXISTS modules (
+    station_id INTEGER NOT NULL, slot INTEGER NOT NULL, type TEXT NOT NULL,
+    level INTEGER, efficiency REAL, PRIMARY KEY (station_id, slot)
+);
+"""
+
+# Tables rewritten whole on every save; they only grow with the player's assets
+GAME_TABLES = ('meta', 'claims', 'fleets', 'cargo', 'stations', 'trades', 'modules')
+UNIVERSE_TABLES = ('regions', 'deposits', 'grants', 'edges', 'adjacent')
+
+RegionRows = Tuple[tuple, List[tuple], List[tuple]]
+
+def _timestamp(moment: Optional[datetime]) -> Optional[float]:
+    return moment.timestamp() if moment else None
+
+def _datetime(timestamp: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(timestamp) if timestamp is not None else None
+
+class SQLiteStore:
+    """Keeps a game in a SQLite database, loading regions as they are used
+
+    Regions, deposits, grants, claims, fleets, stations and their trades
+    are stored as rows in normalized tables. Loading reads the game's own
+    state but only the names of the regions: each region, its deposits,
+    grants and connections are read the first time the game touches it.
+
+    Saving writes regions whose rows changed since they were loaded or
+    last saved, plus the (small) fleet, station and claim tables, all in
+    one transaction.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.connection = sqlite3.connect(str(self.path))
+        self.connection.executescript(SCHEMA)
+        self.game_state = None  # The game these rows belong to
+        self._region_ids: Dict[Region, int] = {}
+        self._region_names: Dict[int, str] = {}
+        self._written: Dict[int, RegionRows] = {}  # Region rows as last read or written
+        self._next_region_id = 0
+
+    def close(self):
+        self.connection.close()
+
+    # Saving
+
+    def _region_id(self, region: Optional[Region]) -> Optional[int]:
+        if region is None:
+            return None
+        region_id = self._region_ids.get(region)
+        if region_id is None:
+            region_id = self._region_ids[region] = self._next_region_id
+            self._region_names[region_id] = region.name
+            self._next_region_id += 1
+        return region_id
+
+    def _region_rows(self, region_id: int, region: Region) -> RegionRows:
+        deposits = region.deposits
+        return (
+            (region_id, region.name, region.level, region.position[0], region.position[1],
+             region.visibility.value, region.controlling_corporation),
+            [(region_id, slot, d.resource_type, d.amount, d.quality, int(d.discovered))
+             for slot, d in enumerate(deposits)],
+            [(region_id, deposits.index(g.deposit), g.corporation, _timestamp(g.start_time),
+              g.duration.total_seconds())
+             for g in region.grants]
+        )
+
+    def save(self, game_state) -> int:
+        """Write the game's changes in one transaction, returns region rows written
+
+        A game this store did not load or save before replaces the stored
+        one entirely, every region included.
+        """
+        universe = game_state.universe
+        regions = universe.loaded_regions()
+        if game_state is not self.game_state:
+            # Read the whole of a lazily loaded game before any rows go, as
+            # it may be loaded from this very file
+            regions = list(universe.regions.values())
+            for region in regions:
+                universe.get_connected_regions(region)
+                list(region.connections)
+        with self.connection:
+            if game_state is not self.game_state:
+                for table in GAME_TABLES + UNIVERSE_TABLES:
+                    self.connection.execute(f"DELETE FROM {table}")
+                self.game_state = game_state
+                self._region_ids = {}
+                self._region_names = {}
+                self._written = {}
+                self._next_region_id = 0
+            written = self._write_regions(universe, regions)
+            self._write_game(game_state)
+            # Regions only referenced from elsewhere, e.g. a new region's neighbours
+            written += self._write_unwritten()
+        return written
+
+    def _write_regions(self, universe: Universe, regions: Iterable[Region]) -> int:
+        """Write the rows of the given regions that changed"""
+        changed = []
+        new = []
+        for region in regions:
+            is_new = region not in self._region_ids
+            region_id = self._region_id(region)
+            rows = self._region_rows(region_id, region)
+            if rows != self._written.get(region_id):
+                changed.append(rows)
+                self._written[region_id] = rows
+            if is_new:
+                new.append(region)
+
+        executemany = self.connection.executemany
+        if changed:
+            region_ids = [(rows[0][0],) for rows in changed]
+            executemany("DELETE FROM deposits WHERE region_id = ?", region_ids)
+            executemany("DELETE FROM grants WHERE region_id = ?", region_ids)
+            executemany("INSERT OR REPLACE INTO regions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [rows[0] for rows in changed])
+            executemany("INSERT INTO deposits VALUES (?, ?, ?, ?, ?, ?)",
+                        [row for rows in changed for row in rows[1]])
+            executemany("INSERT INTO grants VALUES (?, ?, ?, ?, ?)",
+                        [row for rows in changed for row in rows[2]])
+
+        # Connections only change when regions are created
+        if new:
+            region_id = self._region_id
+            executemany("INSERT OR IGNORE INTO edges VALUES (?, ?)", [
+                pair
+                for region in new
+                for other in universe.get_connected_regions(region)
+                for pair in ((region_id(region), region_id(other)), (region_id(other), region_id(region)))
+            ])
+            executemany("INSERT OR REPLACE INTO adjacent VALUES (?, ?, ?)", [
+                (region_id(region), slot, region_id(other))
+                for region in new
+                for slot, other in enumerate(region.connections)
+            ])
+        return len(changed)
+
+    def _write_unwritten(self) -> int:
+        unwritten = [
+            self._region_rows(region_id, region)
+            for region, region_id in self._region_ids.items() if region_id not in self._written
+        ]
+        for rows in unwritten:
+            self._written[rows[0][0]] = rows
+        self.connection.executemany("INSERT OR REPLACE INTO regions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                    [rows[0] for rows in unwritten])
+        self.connection.executemany("INSERT INTO deposits VALUES (?, ?, ?, ?, ?, ?)",
+                                    [row for rows in unwritten for row in rows[1]])
+        self.connection.executemany("INSERT INTO grants VALUES (?, ?, ?, ?, ?)",
+                                    [row for rows in unwritten for row in rows[2]])
+        return len(unwritten)
+
+    def _write_game(self, game_state):
+        """Rewrite the claims, fleets, stations and settings"""
+        region_id = self._region_id
+        execute = self.connection.execute
+        executemany = self.connection.executemany
+        for table in GAME_TABLES:
+            execute(f"DELETE FROM {table}")
+
+        current = game_state.get_current_fleet()
+        universe = game_state.universe
+        meta = {
+            'corporation_name': game_state.corporation_name,
+            'credits': game_state.credits,
+            'total_assets': game_state.total_assets,
+            'game_speed': game_state.game_speed,
+            'playtime': game_state.playtime,
+            'fleet_count': len(game_state.fleets),
+            'current_fleet': game_state.fleets.index(current) if current in game_state.fleets else -1,
+            'current_region': region_id(game_state.current_region),
+            'home_region': region_id(universe.home_region),
+            'station': (game_state.market.stations.index(game_state.station)
+                        if game_state.station in game_state.market.stations else -1),
+            'buildings': {name: building.level for name, building in game_state.buildings.items()},
+            'mothership': game_state.mothership.to_dict()
+        }
+        executemany("INSERT INTO meta VALUES (?, ?)", [(key, json.dumps(value)) for key, value in meta.items()])
+
+        executemany("INSERT INTO claims VALUES (?, ?, ?, ?, ?)", [
+            (region_id(c.region), c.corporation, c.duration.total_seconds(), _timestamp(c.claimed_at), active)
+            for active, claims in enumerate((game_state.available_claims, game_state.active_claims))
+            for c in claims
+        ])
+
+        fleets = game_state.fleets
+        executemany("INSERT INTO fleets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [
+            (i, f.name, f.ship_type, f.level, f.mining_drones, f.max_drones, f.gas_collectors,
+             f.max_collectors, f._storage_capacity, region_id(f.current_region), region_id(f.destination),
+             region_id(f.probe_region), int(f.is_traveling), int(f.is_probing),
+             _timestamp(f.travel_start), _timestamp(f.travel_end),
+             _timestamp(f.probe_start), _timestamp(f.probe_end),
+             _timestamp(f.upgrade_start), _timestamp(f.upgrade_end))
+            for i, f in enumerate(fleets)
+        ])
+        executemany("INSERT INTO cargo VALUES (?, ?, ?)", [
+            (i, resource, amount) for i, f in enumerate(fleets) for resource, amount in f.resources.items()
+        ])
+
+        stations = game_state.market.stations
+        executemany("INSERT INTO stations VALUES (?, ?, ?, ?, ?, ?, ?)", [
+            (i, s.name, region_id(s.region), s.level, s.max_modules, s.stock_capacity,
+             _timestamp(s.last_restock))
+            for i, s in enumerate(stations)
+        ])
+        executemany("INSERT INTO trades VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [
+            (i, t.resource, t.base_buy_price, t.base_sell_price, t._buy_anchor, t._sell_anchor,
+             t.quantity, _timestamp(t.last_update))
+            for i, s in enumerate(stations) for t in s.trades.values()
+        ])
+        executemany("INSERT INTO modules VALUES (?, ?, ?, ?, ?)", [
+            (i, slot, m.type, m.level, m.efficiency)
+            for i, s in enumerate(stations) for slot, m in enumerate(s.modules)
+        ])
+
+    # Loading
+
+    def read_meta(self) -> dict:
+        """Get the stored settings without loading the game"""
+        return {key: json.loads(value) for key, value in self.connection.execute("SELECT key, value FROM meta")}
+
+    def _region_positions(self):
+        """Get every stored region's (name, x, y), building no regions"""
+        return self.connection.execute("SELECT name, x, y FROM regions")
+
+    def _regions_in_rect(self, x0: float, y0: float, x1: float, y1: float):
+        """Get (name, x, y) of the stored regions within a rectangle, through the position index"""
+        return self.connection.execute(
+            "SELECT name, x, y FROM regions WHERE x BETWEEN ? AND ? AND y BETWEEN ? AND ?",
+            (x0, x1, y0, y1)
+        )
+
+    def load(self):
+        """Load the stored game, leaving its regions to be read as they are used"""
+        from .game_state import GameState
+
+        meta = self.read_meta()
+        if not meta:
+            raise FileNotFoundError(f"{self.path} holds no saved game")
+
+        self._region_names = dict(self.connection.execute("SELECT id, name FROM regions ORDER BY id"))
+        self._region_ids = {}
+        self._written = {}
+        self._next_region_id = max(self._region_names, default=-1) + 1
+
+        game_state = GameState.empty()
+        self.game_state = game_state
+        game_state.corporation_name = meta['corporation_name']
+        game_state.credits = meta['credits']
+        game_state.total_assets = meta['total_assets']
+        game_state.game_speed = meta['game_speed']
+        game_state.playtime = meta.get('playtime', 0.0)
+
+        universe = Universe(generate=False)
+        universe.regions = RegionMap(self._region_names.values(), self._load_region,
+                                     self._region_positions, self._regions_in_rect)
+        universe.connections = ConnectionMap(universe.regions, self._load_connections)
+        game_state.universe = universe
+        universe.home_region = self._region(meta['home_region'])
+        game_state.current_region = self._region(meta['current_region'])
+
+        game_state.fleets = self._load_fleets()
+        current = meta['current_fleet']
+        game_state.selected_fleet = game_state.fleets[current] if current >= 0 else None
+
+        game_state.available_claims = []
+        game_state.active_claims = []
+        for region_id, corporation, duration, claimed_at, active in self.connection.execute(
+                "SELECT region_id, corporation, duration, claimed_at, active FROM claims ORDER BY rowid"):
+            claim = RegionClaim(self._region(region_id), timedelta(seconds=duration), corporation)
+            claim.claimed_at = _datetime(claimed_at)
+            claim.expiry = claim.claimed_at + claim.duration if claim.claimed_at else None
+            (game_state.active_claims if active else game_state.available_claims).append(claim)
+
+        game_state.market = MarketNetwork(universe, game_state.ledger)
+        stations = self._load_stations(game_state.market)
+        game_state.station = stations[meta['station']] if meta['station'] >= 0 else SpaceStation()
+
+        for name, level in meta['buildings'].items():
+            if name in game_state.buildings:
+                game_state.buildings[name].level = level
+        if 'mothership' in meta:
+            game_state.mothership = Mothership.from_dict(meta['mothership'])
+
+        game_state.connect_changes()
+        return game_state
+
+    def _region(self, region_id: Optional[int]) -> Optional[Region]:
+        if region_id is None or region_id < 0:
+            return None
+        return self.game_state.universe.regions[self._region_names[region_id]]
+
+    def _load_region(self, name: str) -> Region:
+        """Read one region with its deposits and grants"""
+        execute = self.connection.execute
+        region_id, level, x, y, visibility, corporation = execute(
+            "SELECT id, level, x, y, visibility, corporation FROM regions WHERE name = ?", (name,)
+        ).fetchone()
+        region = Region(name, level, (x, y), generate_deposits=False)
+        region.visibility = RegionVisibility(visibility)
+        region.controlling_corporation = corporation
+
+        for resource, amount, quality, discovered in execute(
+                "SELECT resource, amount, quality, discovered FROM deposits WHERE region_id = ? ORDER BY slot",
+                (region_id,)):
+            region.deposits.append(ResourceDeposit(resource, amount, quality, bool(discovered)))
+
+        for slot, corporation, start, duration in execute(
+                "SELECT deposit_slot, corporation, start, duration FROM grants WHERE region_id = ? ORDER BY rowid",
+                (region_id,)):
+            grant = ResourceGrant(region.deposits[slot], corporation, duration)
+            grant.start_time = _datetime(start)
+            region.grants.append(grant)
+
+        region.connections = RegionLinks([
+            self._region_names[other_id] for other_id, in execute(
+                "SELECT other_id FROM adjacent WHERE region_id = ? ORDER BY slot", (region_id,))
+        ], self.game_state.universe.regions)
+        region.changes = self.game_state.changes
+        region.mark_clean()
+
+        self._region_ids[region] = region_id
+        self._written[region_id] = self._region_rows(region_id, region)
+        return region
+
+    def _load_connections(self, region: Region) -> Set[Region]:
+        return {
+            self._region(other_id) for other_id, in self.connection.execute(
+                "SELECT other_id FROM edges WHERE region_id = ?", (self._region_ids[region],))
+        }
+
+    def _load_fleets(self) -> List[Fleet]:
+        cargo: Dict[int, dict] = {}
+        for fleet_id, resource, amount in self.connection.execute("SELECT fleet_id, resource, amount FROM cargo"):
+            cargo.setdefault(fleet_id, {})[resource] = amount
+
+        fleets = []
+        for (fleet_id, name, ship_type, level, mining_drones, max_drones, gas_collectors, max_collectors,
+             storage, region_id, destination_id, probe_region_id, traveling, probing,
+             travel_start, travel_end, probe_start, probe_end, upgrade_start, upgrade_end) in \
+                self.connection.execute("SELECT * FROM fleets ORDER BY id"):
+            fleet = Fleet(name)
+            fleet.ship_type = ship_type
+            fleet.level = level
+            fleet.mining_drones = mining_drones
+            fleet.max_drones = max_drones
+            fleet.gas_collectors = gas_collectors
+            fleet.max_collectors = max_collectors
+            fleet._storage_capacity = storage
+            fleet.current_region = self._region(region_id)
+            fleet.destination = self._region(destination_id)
+            fleet.probe_region = self._region(probe_region_id)
+            fleet.is_traveling = bool(traveling)
+            fleet.is_probing = bool(probing)
+            fleet.travel_start = _datetime(travel_start)
+            fleet.travel_end = _datetime(travel_end)
+            fleet.probe_start = _datetime(probe_start)
+            fleet.probe_end = _datetime(probe_end)
+            fleet.upgrade_start = _datetime(upgrade_start)
+            fleet.upgrade_end = _datetime(upgrade_end)
+            fleet.resources = ResourceVector(cargo.get(fleet_id, {}))
+            fleets.append(fleet)
+        return fleets
+
+    def _load_stations(self, market: MarketNetwork) -> List[SpaceStation]:
+        execute = self.connection.execute
+        stations = []
+        for station_id, name, region_id, level, max_modules, stock_capacity, last_restock in \
+                execute("SELECT * FROM stations ORDER BY id").fetchall():
+            station = SpaceStation(name)
+            station.level = level
+            station.max_modules = max_modules
+            station.stock_capacity = stock_capacity
+            station.last_restock = _datetime(last_restock)
+
+            station.trades = {}
+            for resource, base_buy, base_sell, buy_anchor, sell_anchor, quantity, last_update in execute(
+                    "SELECT resource, base_buy, base_sell, buy_anchor, sell_anchor, quantity, last_update "
+                    "FROM trades WHERE station_id = ? ORDER BY rowid", (station_id,)):
+                trade = Trade(resource, buy_anchor, sell_anchor, quantity)
+                trade.base_buy_price = base_buy
+                trade.base_sell_price = base_sell
+                trade.last_update = _datetime(last_update)
+                station.trades[resource] = trade
+
+            for module_type, module_level, efficiency in execute(
+                    "SELECT type, level, efficiency FROM modules WHERE station_id = ? ORDER BY slot", (station_id,)):
+                module = Module(module_type)
+                module.level = module_level
+                module.efficiency = efficiency
+                station.modules.add(module)
+
+            region = self._region(region_id)
+            if region is not None:
+                market.add_station(station, region)
+            stations.append(station)
+        return stations
@@ -1,13 +1,114 @@
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from datetime import datetime, timedelta
+from .pricing import PricingModel, DEFAULT_PRICING
+from .history import TimeSeriesHistory
+from .production import PRODUCTION
+from .resources import ResourceVector
+from .upgrades import UpgradeQueue, UPGRADE_DURATION
+from .ledger import Ledger, LedgerError, ResourceAccount, StockAccount, Transfer
+
+# Relative distance from equilibrium below which prices count as settled
+SETTLED_TOLERANCE = 1e-4
 
 class Trade:
-    def __init__(self, resource: str, buy_price: float, sell_price: float, quantity: int):
+    def __init__(self, resource: str, buy_price: float, sell_price: float, quantity: int,
+                 pricing: Optional[PricingModel] = None, clock: Callable[[], datetime] = datetime.now):
         self.resource = resource
-        self.buy_price = buy_price  # Station buys at this price
-        self.sell_price = sell_price  # Station sells at this price
-        self.quantity = quantity  # Available quantity
-        self.last_update = datetime.now()
+        self.pricing = pricing or DEFAULT_PRICING
+        self.clock = clock  # Gives the current time wherever no time is passed in
+        self.last_update = clock()  # Time the anchor prices were taken
+        self._quantity = quantity  # Available quantity
+        
+        # Prices are anchored at last_update and relax toward equilibrium
+        self._buy_anchor = buy_price
+        self._sell_anchor = sell_price
+        self.base_buy_price = buy_price / self.pricing.stock_factor(quantity)
+        self.base_sell_price = sell_price / self.pricing.stock_factor(quantity)
+        
+        # Bounded (buy_price, sell_price) history for charts
+        self.history = TimeSeriesHistory(width=2)
+        self.moving = True  # Prices may still be relaxing, so worth sampling
+    
+    def _elapsed_hours(self, now: datetime) -> float:
+        return (now - self.last_update).total_seconds() / 3600
+    
+    def buy_price_at(self, now: datetime) -> float:
+        """Get the price the station buys at, at the given time"""
+        equilibrium = self.pricing.equilibrium(self.base_buy_price, self._quantity)
+        return self.pricing.relax(self._buy_anchor, equilibrium, self._elapsed_hours(now))
+    
+    def sell_price_at(self, now: datetime) -> float:
+        """Get the price the station sells at, at the given time"""
+        equilibrium = self.pricing.equilibrium(self.base_sell_price, self._quantity)
+        return self.pricing.relax(self._sell_anchor, equilibrium, self._elapsed_hours(now))
+    
+    def settle(self, now: Optional[datetime] = None):
+        """Re-anchor prices at the given time
+
+        Relaxation is memoryless, so settling never changes a price; it is
+        needed before the stock level (and so the equilibrium) changes.
+        """
+        now = now or self.clock()
+        self._buy_anchor = self.buy_price_at(now)
+        self._sell_anchor = self.sell_price_at(now)
+        self.last_update = now
+    
+    def record_history(self, now: Optional[datetime] = None) -> bool:
+        """Sample the current prices into the price history
+
+        Once both prices have settled at equilibrium the trade stops
+        counting as moving, until its stock or prices change again.
+        """
+        now = now or self.clock()
+        buy_price, sell_price = self.buy_price_at(now), self.sell_price_at(now)
+        self.moving = not (
+            _settled(buy_price, self.pricing.equilibrium(self.base_buy_price, self._quantity))
+            and _settled(sell_price, self.pricing.equilibrium(self.base_sell_price, self._quantity))
+        )
+        return self.history.record(now.timestamp(), (buy_price, sell_price))
+    
+    @property
+    def buy_price(self) -> float:
+        """Station buys at this price"""
+        return self.buy_price_at(self.clock())
+    
+    @buy_price.setter
+    def buy_price(self, price: float):
+        # A posted price becomes the new equilibrium at the current stock
+        self.settle()
+        self._buy_anchor = price
+        self.base_buy_price = price / self.pricing.stock_factor(self._quantity)
+        self.moving = True
+    
+    @property
+    def sell_price(self) -> float:
+        """Station sells at this price"""
+        return self.sell_price_at(self.clock())
+    
+    @sell_price.setter
+    def sell_price(self, price: float):
+        self.settle()
+        self._sell_anchor = price
+        self.base_sell_price = price / self.pricing.stock_factor(self._quantity)
+        self.moving = True
+    
+    @property
+    def quantity(self) -> int:
+        """Available quantity"""
+        return self._quantity
+    
+    @quantity.setter
+    def quantity(self, quantity: int):
+        self.set_quantity(quantity)
+    
+    def set_quantity(self, quantity: int, now: Optional[datetime] = None):
+        """Change the stock, re-anchoring prices at the time it changed"""
+        self.settle(now)
+        self._quantity = quantity
+        self.moving = True
+
+def _settled(price: float, equilibrium: float) -> bool:
+    return abs(price - equilibrium) <= SETTLED_TOLERANCE * abs(equilibrium)
 
 class Mission:
     def __init__(self, name: str, description: str, requirements: Dict[str, int], 
@@ -28,14 +129,22 @@ class Blueprint:
         self.cost = cost  # Cost in resources
         self.requirements = requirements  # Required module levels
 
+# Recipes every station refinery runs, and runs per hour at efficiency 1.0
+REFINERY_RECIPES = ('refined_metal', 'refined_gas')
+REFINERY_RUNS_PER_HOUR = 50
+
 class SpaceStation:
-    def __init__(self, name: str = "Alpha Station"):
+    def __init__(self, name: str = "Alpha Station", region=None,
+                 clock: Callable[[], datetime] = datetime.now):
         self.name = name
+        self.region = region  # Region the station is located in
+        self.stock_capacity = 1000  # Maximum stock per resource
+        self.clock = clock  # Current time for the station's prices and restocking
         self.trades: Dict[str, Trade] = {
-            'metal': Trade('metal', 8, 10, 1000),
-            'gas': Trade('gas', 12, 15, 1000),
-            'refined_metal': Trade('refined_metal', 15, 20, 500),
-            'refined_gas': Trade('refined_gas', 20, 25, 500)
+            'metal': Trade('metal', 8, 10, 1000, clock=clock),
+            'gas': Trade('gas', 12, 15, 1000, clock=clock),
+            'refined_metal': Trade('refined_metal', 15, 20, 500, clock=clock),
+            'refined_gas': Trade('refined_gas', 20, 25, 500, clock=clock)
         }
         
         self.available_missions: List[Mission] = [
@@ -57,57 +166,61 @@ class SpaceStation:
             )
         ]
         
-        self.last_restock = datetime.now()
+        self.last_restock = clock()
         self.restock_interval = timedelta(hours=1)
         self.level = 1
-        self.modules = []
+        self.modules = ModuleRegistry()
         self.max_modules = 3
+        self.upgrade_queue = UpgradeQueue()
+        self.ledger = Ledger()  # Replaced by the game's ledger when part of a game
+    
+    @property
+    def prices_moving(self) -> bool:
+        """Check if any trade's prices are still moving and worth sampling"""
+        return any(trade.moving for trade in self.trades.values())
     
-    def update_trades(self):
-        """Update trade prices and quantities"""
-        current_time = datetime.now()
+    def update_trades(self, now: Optional[datetime] = None, moving_only: bool = False):
+        """Settle trade prices at the current time and record them
+        
+        Prices follow the continuous model in PricingModel and are worked out
+        when read, so calling this more or less often does not move them.
+        With moving_only, trades whose prices have settled are skipped.
+        """
+        current_time = now or self.clock()
         
         for trade in self.trades.values():
-            time_diff = (current_time - trade.last_update).total_seconds() / 3600
-            
-            # Update prices based on quantity and time
-            if trade.quantity < 200:  # Low stock
-                trade.buy_price *= 0.95  # Lower buying price
-                trade.sell_price *= 1.05  # Increase selling price
-            elif trade.quantity > 800:  # High stock
-                trade.buy_price *= 1.05  # Increase buying price
-                trade.sell_price *= 0.95  # Lower selling price
-            
-            trade.last_update = current_time
+            if moving_only and not trade.moving:
+                continue
+            trade.settle(current_time)
+            trade.record_history(current_time)
     
     def restock(self):
-        """Restock resources if enough time has passed"""
-        current_time = datetime.now()
+        """Restock resources for every restock interval that has passed"""
+        current_time = self.clock()
+        intervals = int((current_time - self.last_restock) / self.restock_interval)
         
-        if current_time - self.last_restock >= self.restock_interval:
+        if intervals > 0:
             for trade in self.trades.values():
-                # Gradually restore quantity to 1000
-                if trade.quantity < 1000:
-                    trade.quantity = min(1000, trade.quantity + 100)
+                # Gradually restore quantity to capacity, catching up on missed intervals
+                if trade.quantity < self.stock_capacity:
+                    trade.set_quantity(min(self.stock_capacity, trade.quantity + 100 * intervals), current_time)
             
-            self.last_restock = current_time
+            self.last_restock += intervals * self.restock_interval
     
     def buy_from_ship(self, resource: str, amount: int, ship) -> Optional[float]:
         """Buy resources from a ship"""
         if resource not in self.trades:
             return None
             
-        trade = self.trades[resource]
-        if trade.quantity + amount > 1000:  # Station capacity
+        total_price = amount * self.trades[resource].buy_price
+        ship_account = ResourceAccount(ship)
+        try:
+            self.ledger.transfer_batch([
+                Transfer(ship_account, StockAccount(self), resource, amount),
+                Transfer(self.ledger.world, ship_account, 'credits', total_price)
+            ], memo=f"{self.name} buys {resource}")
+        except LedgerError:
             return None
-            
-        if ship.resources[resource] < amount:
-            return None
-            
-        total_price = amount * trade.buy_price
-        trade.quantity += amount
-        ship.resources[resource] -= amount
-        ship.resources['credits'] = ship.resources.get('credits', 0) + total_price
         
         return total_price
     
@@ -116,17 +229,15 @@ class SpaceStation:
         if resource not in self.trades:
             return None
             
-        trade = self.trades[resource]
-        if trade.quantity < amount:
-            return None
-            
-        total_price = amount * trade.sell_price
-        if ship.resources.get('credits', 0) < total_price:
+        total_price = amount * self.trades[resource].sell_price
+        ship_account = ResourceAccount(ship)
+        try:
+            self.ledger.transfer_batch([
+                Transfer(StockAccount(self), ship_account, resource, amount),
+                Transfer(ship_account, self.ledger.world, 'credits', total_price)
+            ], memo=f"{self.name} sells {resource}")
+        except LedgerError:
             return None
-            
-        trade.quantity -= amount
-        ship.resources[resource] = ship.resources.get(resource, 0) + amount
-        ship.resources['credits'] -= total_price
         
         return total_price
     
@@ -140,64 +251,170 @@ class SpaceStation:
         if time_elapsed > mission.time_limit:
             return False
             
-        # Check if ship has required resources
-        for resource, amount in mission.requirements.items():
-            if ship.resources.get(resource, 0) < amount:
-                return False
-        
-        # Mission completed, give rewards
-        for resource, amount in mission.requirements.items():
-            ship.resources[resource] -= amount
-            
-        for resource, amount in mission.rewards.items():
-            ship.resources[resource] = ship.resources.get(resource, 0) + amount
+        # Hand in requirements and collect rewards in one transaction
+        ship_account = ResourceAccount(ship)
+        transfers = [
+            Transfer(ship_account, self.ledger.world, resource, amount)
+            for resource, amount in mission.requirements.items()
+        ]
+        transfers += [
+            Transfer(self.ledger.world, ship_account, resource, amount)
+            for resource, amount in mission.rewards.items()
+        ]
+        try:
+            self.ledger.transfer_batch(transfers, memo=f"mission: {mission.name}")
+        except LedgerError:
+            return False
             
         mission.completed = True
         return True
 
     def add_module(self, module_type):
         if len(self.modules) < self.max_modules:
-            module = Module(module_type)
-            self.modules.append(module)
+            self.modules.add(Module(module_type))
             return True
         return False
 
     def get_module_by_type(self, module_type):
-        for module in self.modules:
-            if module.type == module_type:
-                return module
-        return None
+        return self.modules.get(module_type)
 
     def remove_module(self, module_type):
         module = self.get_module_by_type(module_type)
         if module:
-            self.modules.remove(module)
-            return True
+            self.upgrade_queue.cancel(module)
+            return self.modules.remove(module)
         return False
 
     def upgrade(self):
         self.level += 1
         self.max_modules += 1
 
-    def process_resources(self, resources):
-        output = {}
-        for module in self.modules:
-            if module.type == "refinery":
-                output['refined_metal'] = resources.get('metal', 0) * 0.1
-                output['refined_gas'] = resources.get('gas', 0) * 0.1
-        return output
+    def process_resources(self, resources, elapsed_hours: float = 1.0):
+        """Refine resources, consuming inputs from resources and returning the outputs"""
+        # All refineries work as one producer per recipe at their combined efficiency
+        runs = REFINERY_RUNS_PER_HOUR * self.modules.efficiency("refinery") * elapsed_hours
+        recipes = REFINERY_RECIPES if runs > 0 else ()
+        max_runs = [runs] * len(recipes)
+        
+        stock = ResourceVector(resources)
+        consumed, produced = PRODUCTION.run(recipes, max_runs, stock)
+        for resource, amount in consumed.items():
+            resources[resource] -= amount
+        return produced.to_dict()
 
     def upgrade_module(self, module_type):
         module = self.get_module_by_type(module_type)
         if module:
             module.upgrade()
 
+    def queue_upgrades(self, module_type: str, now: Optional[datetime] = None) -> int:
+        """Queue upgrades for every module of a type, returns how many were queued"""
+        return self.upgrade_queue.enqueue_all(self.modules.of_type(module_type), now)
+
+    def update_upgrades(self, now: Optional[datetime] = None) -> List['Module']:
+        """Complete due module upgrades, returns the upgraded modules"""
+        return self.upgrade_queue.advance(now)
+
+class ModuleRegistry:
+    """Station modules indexed by type, with cached per-type efficiency totals"""
+    
+    def __init__(self):
+        self._modules: Dict[int, 'Module'] = {}  # Insertion ordered, keyed by id()
+        self._by_type: Dict[str, List['Module']] = {}
+        self._efficiency: Dict[str, float] = {}
+    
+    def __iter__(self):
+        return iter(list(self._modules.values()))
+    
+    def __len__(self) -> int:
+        return len(self._modules)
+    
+    def __contains__(self, module) -> bool:
+        return id(module) in self._modules
+    
+    def add(self, module: 'Module') -> bool:
+        """Install a module, returns False if it is already installed"""
+        if id(module) in self._modules:
+            return False
+        module._registry = self
+        self._modules[id(module)] = module
+        self._by_type.setdefault(module.type, []).append(module)
+        self.invalidate(module.type)
+        return True
+    
+    def remove(self, module: 'Module') -> bool:
+        """Uninstall a module"""
+        if self._modules.pop(id(module), None) is None:
+            return False
+        self._by_type[module.type].remove(module)
+        if not self._by_type[module.type]:
+            del self._by_type[module.type]
+        module._registry = None
+        self.invalidate(module.type)
+        return True
+    
+    def get(self, module_type: str) -> Optional['Module']:
+        """Get the first installed module of a type"""
+        modules = self._by_type.get(module_type)
+        return modules[0] if modules else None
+    
+    def of_type(self, module_type: str) -> List['Module']:
+        """Get all installed modules of a type"""
+        return list(self._by_type.get(module_type, []))
+    
+    def count(self, module_type: str) -> int:
+        """Count installed modules of a type"""
+        return len(self._by_type.get(module_type, []))
+    
+    def efficiency(self, module_type: str) -> float:
+        """Get the summed efficiency of all modules of a type (cached)"""
+        total = self._efficiency.get(module_type)
+        if total is None:
+            total = sum(m.efficiency for m in self._by_type.get(module_type, []))
+            self._efficiency[module_type] = total
+        return total
+    
+    def invalidate(self, module_type: str):
+        """Drop the cached efficiency total for a type"""
+        self._efficiency.pop(module_type, None)
+
 class Module:
     def __init__(self, module_type):
         self.type = module_type
         self.level = 1
-        self.efficiency = 1.0
+        self._registry = None
+        self._efficiency = 1.0
+        self.upgrade_start = None
+        self.upgrade_end = None
+
+    @property
+    def efficiency(self) -> float:
+        return self._efficiency
+
+    @efficiency.setter
+    def efficiency(self, efficiency: float):
+        self._efficiency = efficiency
+        if self._registry is not None:
+            self._registry.invalidate(self.type)
 
     def upgrade(self):
         self.level += 1
-        self.efficiency *= 1.1 
\ No newline at end of file
+        self.efficiency *= 1.1
+
+    def start_upgrade(self, now: Optional[datetime] = None,
+                      duration: timedelta = UPGRADE_DURATION) -> bool:
+        """Start a timed upgrade of this module"""
+        if self.upgrade_start is not None:
+            return False
+        self.upgrade_start = now or datetime.now()
+        self.upgrade_end = self.upgrade_start + duration
+        return True
+
+    def complete_upgrade(self, now: Optional[datetime] = None) -> bool:
+        """Apply a timed upgrade once it is finished"""
+        if not self.upgrade_end or (now or datetime.now()) < self.upgrade_end:
+            return False
+        self.upgrade()
+        self.upgrade_start = None
+        self.upgrade_end = None
+        return True
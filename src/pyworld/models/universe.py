@@ -1,8 +1,12 @@
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from collections.abc import Mapping, MutableMapping, Sequence
 from datetime import datetime, timedelta
 import random
 import math
+import heapq
 from enum import Enum
+from .changes import ChangeFeed
+from .spatial import SpatialHash
 
 class RegionVisibility(Enum):
     UNEXPLORED = "unexplored"
@@ -12,11 +16,21 @@ class RegionVisibility(Enum):
 class ResourceDeposit:
     """Represents a resource deposit in a region"""
     
-    def __init__(self, resource_type: str, amount: float, quality: float):
+    def __init__(self, resource_type: str, amount: float, quality: float, discovered: bool = False):
         self.resource_type = resource_type
         self.amount = amount
         self.quality = quality  # Higher quality = more efficient extraction
-        self.discovered = False  # Whether this deposit has been discovered
+        self._discovered = discovered  # Whether this deposit has been discovered
+        self.dirty = False  # Changed since the region was last saved
+    
+    @property
+    def discovered(self) -> bool:
+        return self._discovered
+    
+    @discovered.setter
+    def discovered(self, discovered: bool):
+        self._discovered = discovered
+        self.dirty = True
         
     def collection_rate(self, collector_level: int) -> float:
         """Calculate collection rate based on deposit quality and collector level"""
@@ -95,7 +109,8 @@ class RegionClaim:
         return datetime.now() >= self.expiry
 
 class Region:
-    def __init__(self, name: str, level: int, position: tuple[int, int]):
+    def __init__(self, name: str, level: int, position: tuple[int, int],
+                 generate_deposits: bool = True):
         self.name = name
         self.level = level  # Determines resource quality and difficulty
         self.position = position
@@ -103,13 +118,44 @@ class Region:
         self.grants: List[ResourceGrant] = []
         self.controlling_corporation = "Stellar Industries"
         self.connections: List['Region'] = []
-        self.visibility = RegionVisibility.UNEXPLORED
+        self._visibility = RegionVisibility.UNEXPLORED
+        self.changes: Optional[ChangeFeed] = None  # Set by the game that owns the universe
+        self._dirty = True  # Changed since last saved; new regions have never been
+        # Counts changes, including discoveries by the region's own methods,
+        # and is never reset by saving, so each saver can tell what changed
+        # since it last looked. 0 for a region as created or loaded.
+        self.version = 0
         
         # Generate resource deposits based on region level
-        # Only generate deposits if this is not a test region
-        if name != "Test Region":
+        # Only generate deposits if this is not a test region (or a loaded one)
+        if generate_deposits and name != "Test Region":
             self._generate_deposits()
     
+    @property
+    def visibility(self) -> RegionVisibility:
+        return self._visibility
+    
+    @visibility.setter
+    def visibility(self, visibility: RegionVisibility):
+        self._visibility = visibility
+        self.mark_dirty()
+    
+    @property
+    def dirty(self) -> bool:
+        """Check if the region, its deposits or grants changed since it was last saved"""
+        return self._dirty or any(d.dirty for d in self.deposits)
+    
+    def mark_dirty(self):
+        """Flag a change the region can not see, e.g. to its deposits list"""
+        self._dirty = True
+        self.version += 1
+    
+    def mark_clean(self):
+        """Clear the dirty flags once the region is saved (or loaded)"""
+        self._dirty = False
+        for deposit in self.deposits:
+            deposit.dirty = False
+    
     def _generate_deposits(self):
         """Generate resource deposits based on region level"""
         num_deposits = 5  # Fixed number for test consistency
@@ -128,12 +174,24 @@ class Region:
             return None
             
         grant = ResourceGrant(deposit, self.controlling_corporation, duration.total_seconds())
-        self.grants.append(grant)
+        self.add_grant(grant)
+        if self.changes is not None:
+            self.changes.publish('grant', self, grant=grant)
         return grant
     
+    def add_grant(self, grant: ResourceGrant):
+        """Record a grant on one of the region's deposits"""
+        self.grants.append(grant)
+        self.mark_dirty()
+    
     def update_grants(self):
         """Update grants and remove expired ones"""
-        self.grants = [g for g in self.grants if not g.expired]
+        if not self.grants:
+            return
+        grants = [g for g in self.grants if not g.expired]
+        if len(grants) != len(self.grants):
+            self.grants = grants
+            self.mark_dirty()
     
     def scan_deposits(self, scan_power: float) -> List[ResourceDeposit]:
         """Scan for undiscovered deposits"""
@@ -145,6 +203,8 @@ class Region:
                 if random.random() < discovery_chance:
                     deposit.discovered = True
                     newly_discovered.append(deposit)
+        if newly_discovered:
+            self.version += 1
         return newly_discovered
     
     def distance_to(self, other: 'Region') -> float:
@@ -170,13 +230,109 @@ class Region:
         """Discover all deposits in the region"""
         for deposit in self.deposits:
             deposit.discovered = True
+        self.version += 1
+    
+    def explore(self):
+        """Mark the region explored and reveal its deposits, e.g. after a scan"""
+        self.visibility = RegionVisibility.EXPLORED
+        self.discover_deposits()
+        if self.changes is not None:
+            self.changes.publish('explore', self)
+
+class RegionMap(MutableMapping):
+    """Regions by name, each created by a loader the first time it is used
+
+    Lets a stored universe be resumed without building every region: only
+    the ones the game touches are loaded. Iterating the values touches all.
+    positions, if given, reads the stored (name, x, y) of every region, so
+    regions can be found by position without loading them. in_rect, if
+    given, reads them for just the regions within a rectangle, for stores
+    that index positions.
+    """
+
+    def __init__(self, names: Iterable[str], load: Callable[[str], Region],
+                 positions: Optional[Callable[[], Iterable[Tuple[str, float, float]]]] = None,
+                 in_rect: Optional[Callable[[float, float, float, float],
+                                            Iterable[Tuple[str, float, float]]]] = None):
+        self._regions: Dict[str, Optional[Region]] = dict.fromkeys(names)
+        self._load = load
+        self.positions = positions
+        self.in_rect = in_rect
+
+    def __getitem__(self, name: str) -> Region:
+        region = self._regions[name]
+        if region is None:
+            region = self._regions[name] = self._load(name)
+        return region
+
+    def __setitem__(self, name: str, region: Region):
+        self._regions[name] = region
+
+    def __delitem__(self, name: str):
+        del self._regions[name]
+
+    def __contains__(self, name) -> bool:
+        return name in self._regions
+
+    def __iter__(self):
+        return iter(self._regions)
+
+    def __len__(self) -> int:
+        return len(self._regions)
+
+    def loaded(self) -> List[Region]:
+        """Get the regions created so far"""
+        return [region for region in self._regions.values() if region is not None]
+
+class RegionLinks(Sequence):
+    """A region's neighbours, stored by name and looked up when used"""
+
+    def __init__(self, names: List[str], regions: RegionMap):
+        self._names = names
+        self._regions = regions
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._regions[name] for name in self._names[index]]
+        return self._regions[self._names[index]]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+class ConnectionMap(Mapping):
+    """Travel connections by region, each region's looked up when first used"""
+
+    def __init__(self, regions: RegionMap, load: Callable[[Region], Set[Region]]):
+        self._regions = regions
+        self._connections: Dict[Region, Set[Region]] = {}
+        self._load = load
+
+    def __getitem__(self, region: Region) -> Set[Region]:
+        connected = self._connections.get(region)
+        if connected is None:
+            if self._regions.get(region.name) is not region:
+                raise KeyError(region)
+            connected = self._connections[region] = self._load(region)
+        return connected
+
+    def __iter__(self):
+        return iter(self._regions.values())
+
+    def __len__(self) -> int:
+        return len(self._regions)
 
 class Universe:
-    def __init__(self):
+    def __init__(self, generate: bool = True):
         self.regions = {}
         self.connections = {}  # Initialize connections first
-        self.home_region = self.create_home_region()
-        self._generate_regions()
+        self.home_region = None
+        self._spatial: Optional[SpatialHash] = None  # Regions by position, built when first needed
+        self._spatial_regions = None  # The regions mapping the index was built from
+        self.region_tables = None  # save_format.RegionTables kept between saves, if any
+        # Loaded universes are filled in from the save instead
+        if generate:
+            self.home_region = self.create_home_region()
+            self._generate_regions()
     
     def create_home_region(self):
         home = Region("Home", 1, (0, 0))
@@ -269,11 +425,86 @@ class Universe:
         
         return None  # No path found
     
+    def path_costs_from(self, start_region) -> Dict['Region', float]:
+        """Get the cheapest travel distance from start_region to every reachable region"""
+        costs = {start_region: 0.0}
+        heap = [(0.0, id(start_region), start_region)]
+        
+        while heap:
+            cost, _, current = heapq.heappop(heap)
+            if cost > costs[current]:
+                continue
+            
+            for neighbor in self.get_connected_regions(current):
+                new_cost = cost + current.distance_to(neighbor)
+                if new_cost < costs.get(neighbor, math.inf):
+                    costs[neighbor] = new_cost
+                    heapq.heappush(heap, (new_cost, id(neighbor), neighbor))
+        
+        return costs
+    
+    def loaded_regions(self) -> Iterable[Region]:
+        """Get the regions in memory, which is all of them unless loaded lazily"""
+        if isinstance(self.regions, RegionMap):
+            return self.regions.loaded()
+        return self.regions.values()
+
     def update(self):
         """Update all regions"""
-        for region in self.regions.values():
+        # Regions not loaded yet have nothing that could have changed
+        for region in self.loaded_regions():
             region.update_grants()
     
+    def spatial_index(self) -> SpatialHash:
+        """Get an index of region names by position
+        
+        Regions never move, so the index is only rebuilt when regions are
+        added or removed. A lazily loaded universe is indexed from its
+        stored positions, without loading any region.
+        """
+        regions = self.regions
+        if (self._spatial is None or self._spatial_regions is not regions
+                or len(self._spatial) != len(regions)):
+            index = SpatialHash(cell_size=2)  # Regions sit about 2 apart
+            if isinstance(regions, RegionMap) and regions.positions is not None:
+                for name, x, y in regions.positions():
+                    index.insert(name, x, y)
+                placed = regions.loaded()  # Plus any created since the save
+            else:
+                placed = regions.values()
+            for region in placed:
+                index.insert(region.name, *region.position)
+            self._spatial = index
+            self._spatial_regions = regions
+        return self._spatial
+    
+    def _positions_in_rect(self, x0: float, y0: float, x1: float, y1: float) -> List[Tuple[str, float, float]]:
+        """Get (name, x, y) of the regions within a rectangle, edges included"""
+        regions = self.regions
+        if self._spatial is None and isinstance(regions, RegionMap) and regions.in_rect is not None:
+            # The store's position index answers without reading every region
+            found = {name: (x, y) for name, x, y in regions.in_rect(x0, y0, x1, y1)}
+            for region in regions.loaded():  # Plus any created since the save
+                x, y = region.position
+                if x0 <= x <= x1 and y0 <= y <= y1:
+                    found[region.name] = (x, y)
+            return [(name, x, y) for name, (x, y) in found.items()]
+        index = self.spatial_index()
+        return [(name, *index.positions[name]) for name in index.query_rect(x0, y0, x1, y1)]
+    
+    def regions_in_rect(self, x0: float, y0: float, x1: float, y1: float) -> List[Region]:
+        """Get the regions positioned within a rectangle, edges included"""
+        return [self.regions[name] for name, _, _ in self._positions_in_rect(x0, y0, x1, y1)]
+    
+    def region_near(self, x: float, y: float, radius: float) -> Optional[Region]:
+        """Get the region closest to a position within radius of it, if any"""
+        best, best_distance = None, radius * radius
+        for name, rx, ry in self._positions_in_rect(x - radius, y - radius, x + radius, y + radius):
+            distance = (rx - x) ** 2 + (ry - y) ** 2
+            if distance < best_distance or (best is None and distance == best_distance):
+                best, best_distance = name, distance
+        return self.regions[best] if best is not None else None
+    
     def get_region(self, region_name: str) -> Optional[Region]:
         """Get a region by name"""
         return self.regions.get(region_name)
@@ -0,0 +1,123 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from collections import deque
+from datetime import datetime, timedelta
+import heapq
+
+UPGRADE_DURATION = timedelta(minutes=5)
+
+class UpgradeQueue:
+    """Runs module upgrades in a fixed number of parallel build slots
+
+    Upgrades in progress sit in a heap ordered by their end time, so
+    advance() only looks at upgrades that are actually due instead of
+    scanning every module. Upgrades waiting for a slot start, in order,
+    at the moment a slot frees up - even if advance() is called late.
+
+    Modules only need start_upgrade(now, duration) and
+    complete_upgrade(now) methods.
+    """
+
+    def __init__(self, slots: int = 2, duration: timedelta = UPGRADE_DURATION):
+        if slots < 1:
+            raise ValueError("An upgrade queue needs at least one slot")
+        self.slots = slots
+        self.duration = duration
+        self._deadlines: List[Tuple[datetime, int, object]] = []
+        self._active: Dict[int, object] = {}  # id(module) -> module
+        self._waiting = deque()
+        self._seq = 0  # Tie breaker so modules are never compared
+
+    def __len__(self) -> int:
+        return len(self._active) + len(self._waiting)
+
+    def __contains__(self, module) -> bool:
+        return id(module) in self._active or module in self._waiting
+
+    @property
+    def in_progress(self) -> List:
+        """Get the modules currently being upgraded"""
+        return list(self._active.values())
+
+    @property
+    def waiting(self) -> List:
+        """Get the modules waiting for a free slot, in order"""
+        return list(self._waiting)
+
+    @property
+    def next_deadline(self) -> Optional[datetime]:
+        """Get when the next upgrade finishes (None if nothing is upgrading)"""
+        self._drop_stale()
+        return self._deadlines[0][0] if self._deadlines else None
+
+    def enqueue(self, module, now: Optional[datetime] = None) -> bool:
+        """Queue an upgrade, starting it right away if a slot is free"""
+        if module in self:
+            return False
+        if len(self._active) < self.slots:
+            return self._start(module, now or datetime.now())
+        self._waiting.append(module)
+        return True
+
+    def enqueue_all(self, modules: Iterable, now: Optional[datetime] = None) -> int:
+        """Queue upgrades for many modules, returns how many were queued"""
+        now = now or datetime.now()
+        return sum(1 for module in modules if self.enqueue(module, now))
+
+    def cancel(self, module, now: Optional[datetime] = None) -> bool:
+        """Drop a queued or running upgrade (a running one frees its slot from now)"""
+        if module in self._waiting:
+            self._waiting.remove(module)
+            return True
+        if self._active.pop(id(module), None) is None:
+            return False
+        # The heap entry is skipped lazily once it is no longer active
+        module.upgrade_start = None
+        module.upgrade_end = None
+        self._fill_slots(now or datetime.now())
+        return True
+
+    def restore(self, in_progress: Iterable, waiting: Iterable = ()):
+        """Take back upgrades already under way, e.g. from a save
+
+        Modules in progress keep the upgrade_end they have; waiting ones
+        queue in the order given.
+        """
+        for module in in_progress:
+            self._active[id(module)] = module
+            self._seq += 1
+            heapq.heappush(self._deadlines, (module.upgrade_end, self._seq, module))
+        self._waiting.extend(waiting)
+
+    def advance(self, now: Optional[datetime] = None) -> List:
+        """Complete every upgrade due by now, returns the upgraded modules"""
+        now = now or datetime.now()
+        completed = []
+        while self._deadlines and self._deadlines[0][0] <= now:
+            end, _, module = heapq.heappop(self._deadlines)
+            if self._active.get(id(module)) is not module or module.upgrade_end != end:
+                continue
+            del self._active[id(module)]
+            if module.complete_upgrade(end):
+                completed.append(module)
+            # The freed slot was available from the deadline, not from now
+            self._fill_slots(end)
+        return completed
+
+    def _start(self, module, now: datetime) -> bool:
+        if not module.start_upgrade(now, self.duration):
+            return False
+        self._active[id(module)] = module
+        self._seq += 1
+        heapq.heappush(self._deadlines, (module.upgrade_end, self._seq, module))
+        return True
+
+    def _fill_slots(self, now: datetime):
+        while self._waiting and len(self._active) < self.slots:
+            self._start(self._waiting.popleft(), now)
+
+    def _drop_stale(self):
+        while self._deadlines:
+            end, _, module = self._deadlines[0]
+            if self._active.get(id(module)) is module and module.upgrade_end == end:
+                return
+            heapq.heappop(self._deadlines)
@@ -0,0 +1,134 @@
+import unittest
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+import numpy as np
+from ..models import autosave
+from ..models.autosave import AutosaveService
+from ..models import save_format
+from ..models.game_state import GameState
+
+class TestAutosaveService(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.dir.name) / "autosave.pws"
+        self.service = AutosaveService(self.path, interval=timedelta(minutes=1))
+        self.game_state = GameState()
+        self.now = datetime(2024, 1, 1)
+
+    def tearDown(self):
+        self.service.shutdown()
+        self.dir.cleanup()
+
+    def test_tick_schedule(self):
+        """Test saves start only when due"""
+        self.assertTrue(self.service.tick(self.game_state, self.now))
+        self.service.wait()
+        self.assertFalse(self.service.tick(self.game_state, self.now + timedelta(seconds=30)))
+        self.assertTrue(self.service.tick(self.game_state, self.now + timedelta(minutes=1)))
+        self.service.wait()
+        self.assertEqual(self.service.saves, 2)
+
+    def test_snapshot_is_consistent(self):
+        """Test the save holds the state at snapshot time, not later changes"""
+        self.game_state.credits = 1234
+        gate = threading.Event()
+        # Hold the worker so the game changes while the save is pending
+        self.service._executor.submit(gate.wait)
+        self.service.save(self.game_state, self.now)
+        self.game_state.credits = 9999
+        gate.set()
+
+        self.assertTrue(self.service.wait(5))
+        self.assertEqual(save_format.read_save(self.path).credits, 1234)
+
+    def test_atomic_replace(self):
+        """Test no temp file is left and the save is compressed"""
+        self.service.save(self.game_state, self.now)
+        self.service.wait()
+        self.assertEqual(os.listdir(self.dir.name), ["autosave.pws"])
+        _, codec, _ = save_format.read_container(self.path.read_bytes())
+        self.assertEqual(codec, save_format.CODECS['zlib'])
+
+    def test_write_error(self):
+        """Test a failed write is reported without raising"""
+        service = AutosaveService(Path(self.dir.name) / "missing" / "autosave.pws")
+        with self.assertLogs(autosave.logger):
+            service.save(self.game_state, self.now)
+            self.assertFalse(service.wait())
+        self.assertIsInstance(service.last_error, OSError)
+        service.shutdown()
+
+    def test_other_errors_reported(self):
+        """Test failures other than OS errors are reported too, and leave no temp file"""
+        self.service.codec = 'zip'
+        with self.assertLogs(autosave.logger):
+            self.service.save(self.game_state, self.now)
+            self.assertFalse(self.service.wait())
+        self.assertIsInstance(self.service.last_error, ValueError)
+        self.assertEqual(os.listdir(self.dir.name), [])
+
+    def test_repacks_changed_regions(self):
+        """Test later saves repack only changed regions and match a full snapshot"""
+        self.service.save(self.game_state, self.now)
+        self.service.wait()
+        tables = self.game_state.universe.region_tables
+        untouched = tables.tables['regions']
+
+        region = self.game_state.universe.get_region("Region B")
+        region.explore()
+        region.request_grant(region.deposits[1], timedelta(hours=1))
+        self.service.save(self.game_state, self.now + timedelta(minutes=1))
+        self.assertTrue(self.service.wait(5))
+
+        # The first snapshot's arrays were replaced, not changed
+        self.assertIsNot(tables.tables['regions'], untouched)
+        saved = save_format.read_sections(self.path)
+        full = save_format.snapshot_game(self.game_state)
+        saved_strings = save_format.StringTable.decode(saved['strings'])
+        full_strings = save_format.StringTable.decode(full['strings'])
+        for name in ('regions', 'deposits', 'grants'):
+            dtype = full[name].dtype
+            saved_table = np.frombuffer(saved[name], dtype=dtype)
+            self.assertEqual(len(saved_table), len(full[name]))
+            for field in dtype.names:
+                saved_column, full_column = saved_table[field], full[name][field]
+                if field in ('name', 'corporation', 'resource'):
+                    saved_column = [saved_strings.get(i) for i in saved_column.tolist()]
+                    full_column = [full_strings.get(i) for i in full_column.tolist()]
+                    self.assertEqual(saved_column, full_column)
+                else:
+                    np.testing.assert_array_equal(saved_column, full_column)
+
+        loaded = save_format.read_save(self.path).universe.get_region("Region B")
+        self.assertEqual(loaded.visibility, region.visibility)
+        self.assertTrue(all(d.discovered for d in loaded.deposits))
+        self.assertIs(loaded.grants[0].deposit, loaded.deposits[1])
+
+    def test_mapped_universe_stays_unloaded(self):
+        """Test autosaving a mapped game reuses its save's tables without building its regions"""
+        self.game_state.available_claims = []
+        save_format.write_save(self.game_state, self.path)
+        game_state = save_format.map_save(self.path)
+        regions = game_state.universe.regions
+        region = game_state.universe.get_region("Region A")
+        region.explore()
+        loaded = len(regions.loaded())
+
+        self.service.save(game_state, self.now)
+        self.assertTrue(self.service.wait(5))
+        self.assertEqual(len(regions.loaded()), loaded)
+        self.assertLess(len(regions.loaded()), len(regions))
+        saved = save_format.read_save(self.path)
+        self.assertEqual(list(saved.universe.regions), list(self.game_state.universe.regions))
+        self.assertEqual(saved.universe.get_region("Region A").visibility, region.visibility)
+        self.assertEqual(
+            {r.name for r in saved.universe.get_connected_regions(saved.universe.get_region("Region C"))},
+            {r.name for r in self.game_state.universe.get_connected_regions(
+                self.game_state.universe.get_region("Region C"))}
+        )
+
+if __name__ == '__main__':
+    unittest.main()
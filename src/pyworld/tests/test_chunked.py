@@ -0,0 +1,145 @@
+import unittest
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from ..models.chunked import ChunkedSave, GAME_CHUNK
+from ..models.save_format import SaveFormatError
+from ..models.save_manager import SaveManager
+from ..models.universe import Region, RegionVisibility
+from ..models.game_state import GameState
+
+class TestDirtyFlags(unittest.TestCase):
+    def setUp(self):
+        self.region = Region("Somewhere", 1, (0, 0))
+        self.region.mark_clean()
+
+    def test_new_regions_are_dirty(self):
+        """Test a region that was never saved is dirty"""
+        self.assertTrue(Region("Elsewhere", 1, (1, 1)).dirty)
+        self.assertFalse(self.region.dirty)
+
+    def test_mutations_mark_dirty(self):
+        """Test visibility, deposit and grant changes mark the region dirty"""
+        self.region.visibility = RegionVisibility.EXPLORED
+        self.assertTrue(self.region.dirty)
+        self.region.mark_clean()
+
+        self.region.deposits[0].discovered = True
+        self.assertTrue(self.region.dirty)
+        self.region.mark_clean()
+        self.assertFalse(self.region.deposits[0].dirty)
+
+        self.region.request_grant(self.region.deposits[0], timedelta(seconds=0))
+        self.assertTrue(self.region.dirty)
+        self.region.mark_clean()
+
+        self.region.update_grants()  # The grant has expired
+        self.assertTrue(self.region.dirty)
+        self.region.mark_clean()
+        self.region.update_grants()
+        self.assertFalse(self.region.dirty)
+
+class TestChunkedSave(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.dir.name) / "game.pwc"
+        self.game_state = GameState()
+        self.game_state.credits = 4321
+        self.save = ChunkedSave(self.path, regions_per_chunk=4)
+        self.chunks = self.save.save(self.game_state)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def load(self) -> GameState:
+        return ChunkedSave(self.path).load()
+
+    def test_round_trip(self):
+        """Test a chunked save loads back the same game"""
+        self.assertEqual(self.chunks, 3)  # 10 regions, 4 to a chunk
+        loaded = self.load()
+        self.assertEqual(loaded.credits, 4321)
+        self.assertEqual(list(loaded.universe.regions), list(self.game_state.universe.regions))
+        region = loaded.universe.get_region("Region A")
+        original = self.game_state.universe.get_region("Region A")
+        self.assertEqual(
+            {r.name for r in loaded.universe.get_connected_regions(region)},
+            {r.name for r in self.game_state.universe.get_connected_regions(original)}
+        )
+        self.assertIs(loaded.get_current_fleet().current_region, loaded.current_region)
+        self.assertFalse(any(r.dirty for r in loaded.universe.regions.values()))
+
+    def test_only_dirty_chunks_are_written(self):
+        """Test a save after one region changed appends just its chunk"""
+        self.assertEqual(self.save.save(self.game_state), 0)
+        region = self.game_state.universe.get_region("Region H")
+        region.discover_deposits()
+        region.request_grant(region.deposits[1], timedelta(hours=1))
+        self.assertEqual(self.save.save(self.game_state), 1)
+        self.assertFalse(region.dirty)
+
+        loaded_region = self.load().universe.get_region("Region H")
+        self.assertTrue(all(d.discovered for d in loaded_region.deposits))
+        self.assertIs(loaded_region.grants[0].deposit, loaded_region.deposits[1])
+
+    def test_corrupt_chunk_is_detected(self):
+        """Test checksums find a damaged chunk, which can be read on its own otherwise"""
+        offset, length, _ = self.save._directory[1]
+        data = bytearray(self.path.read_bytes())
+        data[offset + length - 1] ^= 0xFF
+        self.path.write_bytes(bytes(data))
+
+        self.assertEqual(self.save.verify(), [1])
+        with self.assertRaises(SaveFormatError):
+            self.load()
+        self.assertEqual(len(self.save.load_regions(0)), 4)
+        self.assertEqual(self.save.read_meta()['credits'], 4321)
+        self.assertIn(GAME_CHUNK, self.save._directory)
+
+    def compressed_save(self) -> ChunkedSave:
+        path = Path(self.dir.name) / "compressed.pwc"
+        save = ChunkedSave(path, regions_per_chunk=4, codec='zlib')
+        save.save(self.game_state)
+        return save
+
+    def test_only_compressed_chunks_use_the_pool(self):
+        """Test uncompressed chunks are read in this process, as workers would only copy them"""
+        indexes = [i for i in self.save._directory if i != GAME_CHUNK]
+        with open(self.path, 'rb') as f:
+            self.assertFalse(self.save._compressed(f, indexes))
+        compressed = self.compressed_save()
+        with open(compressed.path, 'rb') as f:
+            self.assertTrue(compressed._compressed(f, indexes))
+
+    def test_parallel_load(self):
+        """Test a pool of workers loads the same game as a single process"""
+        loaded = ChunkedSave(self.compressed_save().path).load(workers=2, threshold=0)
+        self.assertEqual(loaded.credits, 4321)
+        self.assertEqual(list(loaded.universe.regions), list(self.game_state.universe.regions))
+        region = loaded.universe.get_region("Region E")
+        self.assertEqual(
+            {r.name for r in loaded.universe.get_connected_regions(region)},
+            {r.name for r in self.game_state.universe.get_connected_regions(
+                self.game_state.universe.get_region("Region E"))}
+        )
+
+    def test_parallel_load_detects_corruption(self):
+        """Test a worker's checksum failure reaches the caller"""
+        save = self.compressed_save()
+        offset, length, _ = save._directory[2]
+        data = bytearray(save.path.read_bytes())
+        data[offset + length - 1] ^= 0xFF
+        save.path.write_bytes(bytes(data))
+        with self.assertRaises(SaveFormatError):
+            ChunkedSave(save.path).load(workers=2, threshold=0)
+
+    def test_save_manager_backend(self):
+        """Test the save manager can keep chunked saves"""
+        manager = SaveManager(self.dir.name, backend="chunked")
+        manager.save_game(self.game_state, "slot1")
+        self.assertIn("slot1", manager.list_saves())
+        self.assertEqual(manager.load_game("slot1").credits, 4321)
+        self.assertTrue(manager.delete_save("slot1"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,11 @@
 import unittest
 from datetime import datetime, timedelta
 from ..models.fleet import Fleet
+from ..models.ledger import Ledger
 
 class TestFleet(unittest.TestCase):
     def setUp(self):
-        self.fleet = Fleet("Test Fleet")
+        self.fleet = Fleet("Test Fleet", Ledger())
     
     def test_initial_state(self):
         """Test initial fleet state"""
@@ -0,0 +1,139 @@
+import unittest
+from datetime import datetime, timedelta
+from ..models.history import RingBuffer, Rollup, TimeSeriesHistory
+from ..models.fleet import Fleet
+from ..models.station import Trade
+from ..models.game_state import GameState
+
+class TestRingBuffer(unittest.TestCase):
+    def setUp(self):
+        self.buffer = RingBuffer(3)
+
+    def test_append_and_read(self):
+        """Test samples come back oldest first"""
+        self.buffer.append(1.0, 10)
+        self.buffer.append(2.0, 20)
+        self.assertEqual(len(self.buffer), 2)
+        self.assertEqual(list(self.buffer.times()), [1.0, 2.0])
+        self.assertEqual(list(self.buffer.values()[:, 0]), [10, 20])
+
+    def test_overwrites_oldest(self):
+        """Test a full buffer drops its oldest samples"""
+        for t in range(5):
+            self.buffer.append(float(t), t * 10)
+        self.assertEqual(len(self.buffer), 3)
+        self.assertEqual(list(self.buffer.times()), [2.0, 3.0, 4.0])
+        timestamp, values = self.buffer.last()
+        self.assertEqual(timestamp, 4.0)
+        self.assertEqual(values[0], 40)
+
+    def test_grows_with_samples(self):
+        """Test storage is allocated as samples arrive, never past capacity"""
+        buffer = RingBuffer(100)
+        self.assertEqual(buffer.allocated, 0)
+        for t in range(20):
+            buffer.append(float(t), t)
+        self.assertEqual(buffer.allocated, 32)
+        self.assertEqual(list(buffer.times()), [float(t) for t in range(20)])
+        for t in range(20, 250):
+            buffer.append(float(t), t)
+        self.assertEqual(buffer.allocated, 100)
+        self.assertEqual(list(buffer.times()), [float(t) for t in range(150, 250)])
+
+class TestRollup(unittest.TestCase):
+    def test_bucket_aggregates(self):
+        """Test samples are folded into per-bucket mean/min/max"""
+        rollup = Rollup(60, capacity=10)
+        for t, value in [(0, 1), (30, 3), (59, 2), (60, 10), (90, 20)]:
+            rollup.add(t, value)
+
+        times, means, mins, maxes = rollup.series(include_open=False)
+        self.assertEqual(list(times), [0])
+        self.assertAlmostEqual(means[0, 0], 2)
+        self.assertEqual(mins[0, 0], 1)
+        self.assertEqual(maxes[0, 0], 3)
+
+        # The open bucket is reported when asked for
+        times, means, _, _ = rollup.series()
+        self.assertEqual(list(times), [0, 60])
+        self.assertAlmostEqual(means[1, 0], 15)
+
+class TestTimeSeriesHistory(unittest.TestCase):
+    def test_memory_is_bounded(self):
+        """Test a long run keeps only a fixed number of samples per resolution"""
+        history = TimeSeriesHistory(raw_capacity=100, minute_capacity=60, hour_capacity=24)
+        for t in range(0, 3 * 24 * 3600, 10):
+            history.record(float(t), t)
+
+        self.assertEqual(len(history.raw), 100)
+        self.assertEqual(len(history.rollups['minute'].buckets), 60)
+        self.assertEqual(len(history.rollups['hour'].buckets), 24)
+
+    def test_min_interval(self):
+        """Test samples closer than min_interval are skipped"""
+        history = TimeSeriesHistory(min_interval=1.0)
+        self.assertTrue(history.record(0.0, 1))
+        self.assertFalse(history.record(0.5, 2))
+        self.assertTrue(history.record(1.0, 3))
+        self.assertEqual(len(history.raw), 2)
+
+    def test_unknown_resolution(self):
+        """Test asking for an unknown resolution fails"""
+        with self.assertRaises(ValueError):
+            TimeSeriesHistory().series('week')
+
+class TestHistoryIntegration(unittest.TestCase):
+    def test_trade_history(self):
+        """Test trades record buy and sell prices"""
+        trade = Trade('metal', 8, 10, 500)
+        trade.record_history()
+        _, values = trade.history.series()
+        self.assertAlmostEqual(values[0, 0], 8)
+        self.assertAlmostEqual(values[0, 1], 10)
+
+    def test_settled_trades_stop_moving(self):
+        """Test trades count as moving only until their prices settle"""
+        now = datetime(2024, 1, 1)
+        trade = Trade('metal', 8, 10, 500)
+        trade.record_history(now)
+        self.assertFalse(trade.moving)
+
+        # Selling stock off moves the equilibrium; prices relax toward it
+        trade.quantity = 100
+        self.assertTrue(trade.moving)
+        trade.record_history(trade.last_update + timedelta(hours=1))
+        self.assertTrue(trade.moving)
+        trade.record_history(trade.last_update + timedelta(days=30))
+        self.assertFalse(trade.moving)
+
+    def test_only_moving_stations_sampled(self):
+        """Test the game samples its own station and stations whose prices move"""
+        game_state = GameState()
+        other = next(s for s in game_state.market.stations if s is not game_state.station)
+        for station in game_state.market.stations:
+            station.update_trades(datetime.now() - timedelta(seconds=10))
+        samples = len(other.trades['metal'].history.raw)
+
+        game_state._last_asset_update = datetime.now() - timedelta(seconds=2)
+        game_state.update(0)
+        self.assertEqual(len(other.trades['metal'].history.raw), samples)
+
+        other.trades['metal'].quantity = 10
+        game_state._last_asset_update = datetime.now() - timedelta(seconds=2)
+        game_state.update(0)
+        self.assertEqual(len(other.trades['metal'].history.raw), samples + 1)
+
+    def test_fleet_history(self):
+        """Test fleets keep one history per resource"""
+        fleet = Fleet("Test Fleet")
+        fleet.resources['metal'] = 50
+        fleet.record_resources(100.0)
+        fleet.resources['metal'] = 70
+        fleet.record_resources(200.0)
+
+        self.assertEqual(set(fleet.resource_history), set(fleet.resources))
+        _, values = fleet.resource_history['metal'].series()
+        self.assertEqual(list(values[:, 0]), [50, 70])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+import unittest
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from ..models.journal import JournaledSave, WriteAheadLog
+from ..models.ledger import FleetAccount
+from ..models.game_state import GameState
+from ..models.save_manager import SaveManager
+from ..models.save_format import CODECS, read_header
+
+class TestWriteAheadLog(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.dir.name) / "test.wal"
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_round_trip(self):
+        """Test records come back in order under their generation"""
+        wal = WriteAheadLog(self.path)
+        wal.reset(3)
+        wal.append(['a', 1])
+        wal.append(['b', 2.5])
+        self.assertEqual(wal.pending, 2)
+        wal.flush()
+
+        generation, records, _ = WriteAheadLog.read(self.path)
+        self.assertEqual(generation, 3)
+        self.assertEqual(records, [['a', 1], ['b', 2.5]])
+
+    def test_torn_record(self):
+        """Test a partly written final record is ignored"""
+        wal = WriteAheadLog(self.path)
+        wal.reset(1)
+        wal.append(['kept'])
+        wal.flush()
+        good_size = self.path.stat().st_size
+        wal.append(['torn', 'x' * 50])
+        wal.flush()
+        with open(self.path, 'r+b') as f:
+            f.truncate(good_size + 20)
+
+        _, records, end = WriteAheadLog.read(self.path)
+        self.assertEqual(records, [['kept']])
+        self.assertEqual(end, good_size)
+
+class TestJournaledSave(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.dir.name) / "game.pws"
+        self.game_state = GameState()
+        self.fleet = self.game_state.get_current_fleet()
+        self.journal = JournaledSave(self.game_state, self.path)
+        self.journal.attach()
+        self.journal.save()  # First save writes the checkpoint
+
+    def tearDown(self):
+        self.journal.detach()
+        self.dir.cleanup()
+
+    def test_incremental_save(self):
+        """Test saves after the checkpoint only append changes"""
+        checkpoint_size = self.path.stat().st_size
+        self.game_state.deduct_resources({'credits': 250})
+        written = self.journal.save()
+
+        self.assertGreater(written, 0)
+        self.assertLess(written, checkpoint_size)
+        self.assertEqual(self.path.stat().st_size, checkpoint_size)
+        self.assertEqual(self.game_state.ledger.journal, [])
+
+    def test_replay(self):
+        """Test loading replays transfers, orders, grants and claims"""
+        ledger = self.game_state.ledger
+        ledger.transfer(ledger.world, FleetAccount(self.fleet), 'metal', 120)
+        self.game_state.deduct_resources({'credits': 500})
+
+        region = self.game_state.universe.get_region("Region B")
+        region.request_grant(region.deposits[1], timedelta(hours=2))
+        claim = self.game_state.available_claims[0]
+        self.game_state.claim_system(claim)
+        self.fleet.travel_to(region, 2.0)
+        self.journal.save()
+
+        loaded = JournaledSave.load(self.path, attach=False).game_state
+        fleet = loaded.get_current_fleet()
+        self.assertEqual(loaded.credits, self.game_state.credits)
+        self.assertEqual(fleet.resources['metal'], 120)
+        self.assertIs(fleet.destination, loaded.universe.get_region("Region B"))
+        self.assertEqual(fleet.travel_end, self.fleet.travel_end)
+
+        loaded_region = loaded.universe.get_region("Region B")
+        self.assertIs(loaded_region.grants[0].deposit, loaded_region.deposits[1])
+        self.assertEqual([c.region.name for c in loaded.active_claims], [claim.region.name])
+
+    def test_replayed_stock_keeps_its_time(self):
+        """Test replayed stock changes re-anchor prices when they were made, not at load"""
+        made = datetime(2024, 1, 1, 12)
+        trade = self.game_state.market.stations[0].trades['metal']
+        quantity = trade.quantity
+        self.journal.replay(['transfer', ['station', 0], 'metal', -100, made.timestamp()])
+        self.assertEqual(trade.quantity, quantity - 100)
+        self.assertEqual(trade.last_update, made)
+
+    def test_unsaved_changes_are_lost(self):
+        """Test only flushed changes are replayed"""
+        self.game_state.deduct_resources({'credits': 100})
+        loaded = JournaledSave.load(self.path, attach=False).game_state
+        self.assertEqual(loaded.credits, self.game_state.credits + 100)
+
+    def test_compaction(self):
+        """Test a large log is compacted into a new checkpoint"""
+        self.journal.checkpoint_bytes = 200
+        for _ in range(10):
+            self.game_state.deduct_resources({'credits': 1})
+            self.journal.save()
+
+        self.assertGreater(self.journal.generation, 1)
+        self.assertLessEqual(self.journal.wal.size, 200)
+        loaded = JournaledSave.load(self.path, attach=False).game_state
+        self.assertEqual(loaded.credits, self.game_state.credits)
+
+    def test_new_fleet_forces_checkpoint(self):
+        """Test structural changes are saved as a checkpoint"""
+        self.game_state.fleets.append(type(self.fleet)("Second Fleet"))
+        self.assertTrue(self.journal.needs_checkpoint())
+        self.journal.save()
+        self.assertEqual(self.journal.generation, 2)
+
+    def test_replaced_fleet_forces_checkpoint(self):
+        """Test swapping a fleet for another is noticed although the count is the same"""
+        self.game_state.remove_fleet(self.fleet.id)
+        self.game_state.fleets.append(type(self.fleet)("Replacement"))
+        self.assertTrue(self.journal.needs_checkpoint())
+        self.journal.save()
+
+        loaded = JournaledSave.load(self.path, attach=False).game_state
+        self.assertEqual([f.name for f in loaded.fleets], ["Replacement"])
+
+    def test_direct_changes_are_logged(self):
+        """Test credits and fleet fields changed without an event survive a reload"""
+        self.game_state.credits -= 5000
+        self.fleet.level += 1
+        self.fleet.mining_drones += 1
+        self.fleet.resources['gas'] = 35
+        self.assertGreater(self.journal.save(), 0)
+        self.assertEqual(self.journal.generation, 1)
+
+        loaded = JournaledSave.load(self.path, attach=False).game_state
+        fleet = loaded.get_current_fleet()
+        self.assertEqual(loaded.credits, self.game_state.credits)
+        self.assertEqual(fleet.level, self.fleet.level)
+        self.assertEqual(fleet.mining_drones, self.fleet.mining_drones)
+        self.assertEqual(fleet.resources['gas'], 35)
+
+    def test_scan_is_logged(self):
+        """Test a region explored by a scan is explored after a reload"""
+        self.game_state.universe.get_region("Region C").explore()
+        self.journal.save()
+        region = JournaledSave.load(self.path, attach=False).game_state.universe.get_region("Region C")
+        self.assertTrue(all(d.discovered for d in region.deposits))
+
+    def test_station_refit_forces_checkpoint(self):
+        """Test module changes are saved as a checkpoint"""
+        self.game_state.station.add_module("refinery")
+        self.assertTrue(self.journal.needs_checkpoint())
+        self.journal.save()
+        loaded = JournaledSave.load(self.path, attach=False).game_state
+        self.assertEqual(loaded.station.modules.get("refinery").level, 1)
+
+    def test_stale_log_is_ignored(self):
+        """Test a log from an older checkpoint is not replayed"""
+        self.game_state.deduct_resources({'credits': 100})
+        self.journal.save()
+        wal_data = self.journal.wal.path.read_bytes()
+        self.journal.checkpoint()
+        # Simulate a crash after the checkpoint but before the log reset
+        self.journal.wal.path.write_bytes(wal_data)
+
+        loaded = JournaledSave.load(self.path, attach=False).game_state
+        self.assertEqual(loaded.credits, self.game_state.credits)
+
+    def test_manager_indexes_journal_saves(self):
+        """Test journal saves through a manager keep its summary index current"""
+        manager = SaveManager(self.dir.name)
+        manager.save_game(self.game_state, "slot1")
+        journal = manager.load_journal("slot1")
+        journal.game_state.credits = 1234
+        journal.save()
+
+        entry = manager._load_index()["slot1.pws"]
+        self.assertEqual(entry['credits'], 1234)
+        self.assertEqual(entry['stats'], manager._file_stats(journal.checkpoint_path))
+        summaries = SaveManager(self.dir.name).save_summaries()
+        self.assertEqual([s.credits for s in summaries if s.name == "slot1"], [1234])
+
+    def test_manager_checkpoints_stay_uncompressed(self):
+        """Test journal checkpoints are uncompressed even when the manager compresses saves"""
+        manager = SaveManager(self.dir.name, codec="zlib")
+        journal = manager.open_journal(self.game_state, "slot1")
+        journal.checkpoint()
+        self.assertEqual(read_header(journal.checkpoint_path)[1], CODECS['none'])
+
+if __name__ == '__main__':
+    unittest.main()
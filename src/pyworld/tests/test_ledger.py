@@ -0,0 +1,180 @@
+import unittest
+from datetime import datetime
+from ..models.ledger import Account, Ledger, LedgerError, ResourceAccount, FleetAccount, CreditsAccount, Transfer
+from ..models.fleet import Fleet
+from ..models.station import SpaceStation, Mission
+from ..models.ship import Mothership
+
+class TestLedger(unittest.TestCase):
+    def setUp(self):
+        self.ledger = Ledger()
+        self.fleet = Fleet("Test Fleet", self.ledger)
+        self.fleet.resources['metal'] = 100
+        self.account = FleetAccount(self.fleet)
+
+    def test_transfer(self):
+        """Test a simple transfer moves resources and is journaled"""
+        self.ledger.transfer(self.account, self.ledger.world, 'metal', 40, memo="test")
+        self.assertEqual(self.fleet.resources['metal'], 60)
+        entry = self.ledger.journal[0]
+        self.assertEqual(entry.account, self.account.name)
+        self.assertEqual(entry.delta, -40)
+        self.assertEqual(entry.memo, "test")
+
+    def test_batch_is_atomic(self):
+        """Test a failing batch changes nothing"""
+        with self.assertRaises(LedgerError):
+            self.ledger.transfer_batch([
+                Transfer(self.account, self.ledger.world, 'metal', 50),
+                Transfer(self.account, self.ledger.world, 'gas', 10)
+            ])
+        self.assertEqual(self.fleet.resources['metal'], 100)
+        self.assertEqual(self.ledger.journal, [])
+
+    def test_batch_nets_same_account(self):
+        """Test debits across a batch are checked against the combined balance"""
+        batch = [
+            Transfer(self.account, self.ledger.world, 'metal', 60),
+            Transfer(FleetAccount(self.fleet), self.ledger.world, 'metal', 60)
+        ]
+        self.assertFalse(self.ledger.can_transfer(batch))
+
+    def test_fleet_storage_limit(self):
+        """Test fleet accounts cannot exceed storage"""
+        with self.assertRaises(LedgerError):
+            self.ledger.transfer(self.ledger.world, self.account, 'gas', self.fleet.storage_capacity)
+
+    def test_negative_amount(self):
+        """Test negative transfers are rejected"""
+        with self.assertRaises(LedgerError):
+            self.ledger.transfer(self.account, self.ledger.world, 'metal', -1)
+
+    def test_entries_since(self):
+        """Test the journal can be streamed incrementally"""
+        self.ledger.transfer(self.account, self.ledger.world, 'metal', 1)
+        seq = self.ledger.last_seq
+        self.ledger.transfer(self.account, self.ledger.world, 'metal', 2)
+
+        newer = list(self.ledger.entries_since(seq))
+        self.assertTrue(all(e.seq > seq for e in newer))
+        self.assertEqual(len(newer), 2)  # Fleet and world sides
+
+        self.ledger.truncate(seq)
+        self.assertEqual(list(self.ledger.entries_since(seq)), newer)
+
+    def test_listener(self):
+        """Test subscribers see every new entry"""
+        seen = []
+        self.ledger.subscribe(seen.append)
+        self.ledger.transfer(self.account, self.ledger.world, 'metal', 5)
+        self.assertEqual(seen, self.ledger.journal)
+
+    def test_accounts_keyed_by_type_and_holder(self):
+        """Test only accounts of one type over one holder are the same account"""
+        class Corp:
+            name = "corp"
+            credits = 100
+            resources = {'credits': 5}
+        corp = Corp()
+        self.assertEqual(CreditsAccount(corp), CreditsAccount(corp))
+        self.assertNotEqual(CreditsAccount(corp), ResourceAccount(corp))
+        with self.assertRaises(TypeError):
+            Account("abstract")
+
+    def test_fleets_book_through_their_account(self):
+        """Test a fleet's cargo is always booked, checked and journaled as its fleet account"""
+        with self.assertRaises(LedgerError):
+            self.ledger.transfer(self.ledger.world, ResourceAccount(self.fleet), 'metal', 5000)
+        self.ledger.transfer_batch([
+            Transfer(ResourceAccount(self.fleet), self.ledger.world, 'metal', 30),
+            Transfer(self.account, self.ledger.world, 'metal', 30)
+        ])
+        self.assertEqual(self.fleet.resources['metal'], 40)
+        self.assertEqual([e.account for e in self.ledger.journal if e.delta < 0], [self.account.name])
+        with self.assertRaises(LedgerError):
+            self.ledger.transfer_batch([
+                Transfer(ResourceAccount(self.fleet), self.ledger.world, 'metal', 30),
+                Transfer(self.account, self.ledger.world, 'metal', 30)
+            ])
+
+    def test_failed_batch_changes_nothing(self):
+        """Test a batch an account cannot take leaves balances and the journal alone"""
+        class Corp:
+            credits = 100
+        corp = Corp()
+        self.fleet.resources['metal'] = 50
+        with self.assertRaises(LedgerError):
+            self.ledger.transfer_batch([
+                Transfer(self.account, self.ledger.world, 'metal', 10),
+                Transfer(self.ledger.world, CreditsAccount(corp), 'metal', 10)
+            ])
+        self.assertEqual(self.fleet.resources['metal'], 50)
+        self.assertEqual(corp.credits, 100)
+        self.assertEqual(self.ledger.journal, [])
+
+    def test_add_resource_is_journaled(self):
+        """Test resources added to a fleet enter through the game's ledger, up to its storage"""
+        added = self.fleet.add_resource('gas', 5000)
+        self.assertEqual(added, self.fleet.storage_capacity - 100)
+        self.assertEqual(self.ledger.journal[-1].account, self.account.name)
+        self.assertEqual(self.ledger.journal[-1].delta, added)
+        with self.assertRaises(LedgerError):
+            Fleet("Loose Fleet").add_resource('gas', 10)
+
+    def test_journal_is_capped(self):
+        """Test untruncated journals keep only the newest entries"""
+        ledger = Ledger(max_entries=4)
+        for _ in range(10):
+            ledger.transfer(ledger.world, self.account, 'metal', 1)
+        self.assertLessEqual(len(ledger.journal), 8)
+        self.assertEqual(ledger.journal[-1].seq, ledger.last_seq)
+        self.assertEqual([e.seq for e in ledger.entries_since(ledger.last_seq - 2)],
+                         [ledger.last_seq - 1, ledger.last_seq])
+
+class TestLedgerIntegration(unittest.TestCase):
+    def setUp(self):
+        self.station = SpaceStation()
+        self.station.trades['metal'].quantity = 600
+        self.ship = Mothership()
+
+    def test_station_trades(self):
+        """Test station trades move stock and credits together"""
+        stock = self.station.trades['metal'].quantity
+        price = self.station.buy_from_ship('metal', 100, self.ship)
+
+        self.assertIsNotNone(price)
+        self.assertEqual(self.ship.resources['metal'], 400)
+        self.assertEqual(self.station.trades['metal'].quantity, stock + 100)
+        self.assertAlmostEqual(self.ship.resources['credits'], price)
+
+    def test_station_capacity(self):
+        """Test a sale that overflows station stock fails cleanly"""
+        self.assertIsNone(self.station.buy_from_ship('metal', 500, self.ship))
+        self.assertEqual(self.ship.resources['metal'], 500)
+        self.assertNotIn('credits', self.ship.resources)
+
+    def test_mission_completion(self):
+        """Test mission requirements and rewards are exchanged atomically"""
+        mission = Mission("Test", "", {'metal': 100}, {'credits': 50}, 24)
+        mission.start_time = datetime.now()
+
+        self.assertTrue(self.station.check_mission_completion(mission, self.ship))
+        self.assertEqual(self.ship.resources['metal'], 400)
+        self.assertEqual(self.ship.resources['credits'], 50)
+
+        greedy = Mission("Greedy", "", {'metal': 10000}, {'credits': 50}, 24)
+        greedy.start_time = datetime.now()
+        self.assertFalse(self.station.check_mission_completion(greedy, self.ship))
+        self.assertEqual(self.ship.resources['credits'], 50)
+
+    def test_credits_account(self):
+        """Test credits accounts use the owner's credits attribute"""
+        class Corp:
+            credits = 100
+        corp = Corp()
+        Ledger().transfer(CreditsAccount(corp), ResourceAccount(self.ship), 'credits', 30)
+        self.assertEqual(corp.credits, 70)
+        self.assertEqual(self.ship.resources['credits'], 30)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import math
+from datetime import datetime
+from ..models.market import MarketNetwork
+from ..models.station import SpaceStation
+from ..models.universe import Universe, Region
+
+class TestMarketNetwork(unittest.TestCase):
+    def setUp(self):
+        # Build a small line of regions: A - B - C
+        self.universe = Universe()
+        self.universe.regions = {}
+        self.universe.connections = {}
+        self.a = Region("Test Region", 1, (0, 0))
+        self.b = Region("Test Region", 1, (3, 4))
+        self.c = Region("Test Region", 1, (6, 8))
+        for name, region in (("A", self.a), ("B", self.b), ("C", self.c)):
+            region.name = name
+            self.universe.regions[name] = region
+            self.universe.connections[region] = set()
+        self._connect(self.a, self.b)
+        self._connect(self.b, self.c)
+
+        self.market = MarketNetwork(self.universe)
+        # Prices relax over time, so keep time still
+        clock = lambda: datetime(2024, 1, 1)
+        self.cheap = self.market.add_station(SpaceStation("Cheap", clock=clock), self.a)
+        self.dear = self.market.add_station(SpaceStation("Dear", clock=clock), self.c)
+        self.cheap.trades['metal'].sell_price = 5
+        self.dear.trades['metal'].buy_price = 20
+
+    def _connect(self, r1, r2):
+        self.universe.connections[r1].add(r2)
+        self.universe.connections[r2].add(r1)
+
+    def test_add_station(self):
+        """Test stations are placed in regions"""
+        self.assertEqual(self.cheap.region, self.a)
+        self.assertEqual(self.market.get_station(self.c), self.dear)
+        self.assertIsNone(self.market.get_station(self.b))
+        with self.assertRaises(ValueError):
+            self.market.add_station(SpaceStation(), self.a)
+
+    def test_path_cost_matrix(self):
+        """Test path costs follow the universe graph"""
+        costs = self.market.path_cost_matrix()
+        self.assertEqual(costs[0, 0], 0)
+        self.assertAlmostEqual(costs[0, 1], 10.0)
+        self.assertAlmostEqual(costs[1, 0], 10.0)
+
+    def test_unreachable_station(self):
+        """Test stations without a path never form a route"""
+        island = Region("Test Region", 1, (100, 100))
+        island.name = "Island"
+        self.universe.connections[island] = set()
+        self.market.add_station(SpaceStation("Island"), island)
+
+        costs = self.market.path_cost_matrix()
+        self.assertTrue(math.isinf(costs[0, 2]))
+        for route in self.market.best_routes(limit=50):
+            self.assertNotEqual(route.destination.name, "Island")
+            self.assertNotEqual(route.source.name, "Island")
+
+    def test_best_routes(self):
+        """Test the best route buys low and sells high"""
+        self.dear.trades['metal'].quantity = 0
+        routes = self.market.best_routes(limit=3, cargo_capacity=100, cost_per_distance=1.0)
+
+        best = routes[0]
+        self.assertEqual(best.resource, 'metal')
+        self.assertEqual(best.source, self.cheap)
+        self.assertEqual(best.destination, self.dear)
+        self.assertAlmostEqual(best.unit_profit, 15)
+        self.assertAlmostEqual(best.volume, 100)
+        self.assertAlmostEqual(best.profit, 15 * 100 - 10.0)
+
+        # Routes come back sorted by profit
+        profits = [r.profit for r in routes]
+        self.assertEqual(profits, sorted(profits, reverse=True))
+
+    def test_volume_limited_by_destination_room(self):
+        """Test runs cannot sell more than the destination can hold"""
+        self.dear.trades['metal'].quantity = 950
+        routes = self.market.best_routes(limit=1, cargo_capacity=1000, cost_per_distance=0)
+        self.assertEqual(routes[0].destination, self.dear)
+        self.assertAlmostEqual(routes[0].volume, 50)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import json
+import tempfile
+from pathlib import Path
+from ..models import migrations, save_format
+from ..models.migrations import MigrationError, SCHEMA_VERSION
+from ..models.save_manager import SaveManager
+from ..models.game_state import GameState
+from ..migrate import migrate_dir
+
+def version_1_save() -> dict:
+    """A JSON save as written before schema versions"""
+    fleet = {
+        'name': "Old Fleet", 'level': 2, 'ship_type': "Explorer", 'current_location': None,
+        'resources': {'metal': 40}, 'storage': {'capacity': 1500},
+        'travel': {'is_traveling': False, 'current_region': "Home", 'destination': None,
+                   'travel_start': None, 'travel_end': None},
+        'probing': {'is_probing': False, 'probe_region': None, 'probe_start': None, 'probe_end': None}
+    }
+    return {
+        'credits': 777, 'corporation_name': "Old Corp", 'fleets': [fleet, dict(fleet, name="Second")],
+        'current_fleet_id': 1, 'buildings': {'metal_mine': 3}
+    }
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.save_dir = Path(self.dir.name)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_records_are_upgraded(self):
+        """Test version 1 records gain the fields version 2 requires"""
+        data = version_1_save()
+        records = list(migrations.migrate_records(migrations.iter_records(data), migrations.schema_version(data)))
+        self.assertEqual([kind for kind, _ in records], ['game', 'fleet', 'fleet'])
+        self.assertEqual(records[0][1]['playtime'], 0.0)
+        self.assertEqual(records[1][1]['max_drones'], 1)
+        self.assertEqual(records[2][1]['upgrade'], {'upgrade_start': None, 'upgrade_end': None})
+
+    def test_newer_schema_is_refused(self):
+        """Test saves from a newer version are not silently misread"""
+        with self.assertRaises(MigrationError):
+            list(migrations.migrate_records([], SCHEMA_VERSION + 1))
+
+    def test_load_version_1_save(self):
+        """Test the save manager loads an unversioned JSON save"""
+        (self.save_dir / "old.json").write_text(json.dumps(version_1_save()))
+        game_state = SaveManager(self.save_dir).load_game("old.json")
+        self.assertEqual(game_state.credits, 777)
+        self.assertEqual([f.name for f in game_state.fleets], ["Old Fleet", "Second"])
+        self.assertEqual(game_state.fleets[0].max_drones, 1)
+        self.assertIs(game_state.fleets[0].current_region, game_state.universe.get_region("Home"))
+
+    def test_json_round_trip_keeps_fleet_counts(self):
+        """Test drone and collector counts are saved now"""
+        game_state = GameState()
+        game_state.get_current_fleet().max_drones = 4
+        manager = SaveManager(self.save_dir)
+        manager.save_game(game_state, "new.json")
+        loaded = manager.load_game("new.json")
+        self.assertEqual(loaded.get_current_fleet().max_drones, 4)
+
+    def test_migrate_dir(self):
+        """Test a directory of old JSON and binary saves is upgraded in place"""
+        (self.save_dir / "old.json").write_text(json.dumps(version_1_save()))
+        game_state = GameState()
+        game_state.credits = 4321
+        with open(self.save_dir / "old.pws", 'wb') as f:
+            save_format.write_container(f, save_format.snapshot_game(game_state), version=1)
+        SaveManager(self.save_dir).save_game(game_state, "current")
+
+        results = {Path(path).name: outcome for path, outcome in migrate_dir(self.save_dir, workers=2).items()}
+        self.assertEqual(results, {
+            "old.json": "migrated", "old.pws": "migrated", "current.pws": "up to date"
+        })
+
+        data = json.loads((self.save_dir / "old.json").read_text())
+        self.assertEqual(data['schema_version'], SCHEMA_VERSION)
+        self.assertEqual(len(data['fleets']), 2)
+        self.assertEqual(save_format.read_header(self.save_dir / "old.pws")[0], save_format.FORMAT_VERSION)
+        self.assertEqual(save_format.read_save(self.save_dir / "old.pws").credits, 4321)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from ..models.production import ProductionEngine, Recipe
+from ..models.resources import ResourceVector
+from ..models.ship import Mothership
+from ..models.station import SpaceStation
+
+class TestProductionEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = ProductionEngine()
+
+    def test_unconstrained(self):
+        """Test producers run at full rate when inputs are plentiful"""
+        consumed, produced = self.engine.run(
+            ['refined_metal', 'refined_gas'], [10, 5],
+            ResourceVector({'metal': 1000, 'gas': 1000})
+        )
+        self.assertEqual(consumed['metal'], 20)
+        self.assertEqual(consumed['gas'], 10)
+        self.assertEqual(produced['refined_metal'], 10)
+        self.assertEqual(produced['refined_gas'], 5)
+
+    def test_shared_input_is_rationed(self):
+        """Test producers competing for a scarce input share it proportionally"""
+        runs = self.engine.solve(
+            ['refined_metal', 'refined_metal'], [30, 10],
+            ResourceVector({'metal': 40})
+        )
+        self.assertAlmostEqual(runs[0], 15)
+        self.assertAlmostEqual(runs[1], 5)
+
+    def test_scarcest_input_limits(self):
+        """Test a recipe is held back by its most constrained input"""
+        runs = self.engine.solve(
+            ['drones'], [10],
+            ResourceVector({'refined_metal': 1000, 'energy': 40})
+        )
+        self.assertAlmostEqual(runs[0], 2)
+
+    def test_output_room(self):
+        """Test outputs never overflow the available room"""
+        consumed, produced = self.engine.run(
+            ['refined_gas'], [100],
+            ResourceVector({'gas': 1000}),
+            ResourceVector({'refined_gas': 30})
+        )
+        self.assertAlmostEqual(produced['refined_gas'], 30)
+        self.assertAlmostEqual(consumed['gas'], 60)
+
+    def test_custom_recipes(self):
+        """Test engines can be built from other recipe sets"""
+        engine = ProductionEngine({'smelt': Recipe('smelt', {'crystal': 1}, {'metal': 3})})
+        _, produced = engine.run(['smelt'], [2], ResourceVector({'crystal': 5}))
+        self.assertEqual(produced['metal'], 6)
+        with self.assertRaises(ValueError):
+            engine.solve(['fuel'], [1], ResourceVector())
+
+class TestProductionIntegration(unittest.TestCase):
+    def test_mothership_builds_drones(self):
+        """Test the drone factory consumes inputs and produces drones"""
+        ship = Mothership()
+        ship.resources['refined_metal'] = 100
+        ship.update_resources(3600)
+
+        self.assertAlmostEqual(ship.resources['drones'], 1)
+        self.assertAlmostEqual(ship.resources['refined_metal'], 90)
+        self.assertAlmostEqual(ship.resources['energy'], 980)
+
+    def test_station_refinery_consumes_inputs(self):
+        """Test refineries consume the resources they refine"""
+        station = SpaceStation()
+        station.add_module("refinery")
+        resources = {'metal': 40, 'gas': 1000}
+
+        output = station.process_resources(resources)
+
+        self.assertAlmostEqual(output['refined_metal'], 20)
+        self.assertAlmostEqual(output['refined_gas'], 50)
+        self.assertAlmostEqual(resources['metal'], 0)
+        self.assertAlmostEqual(resources['gas'], 900)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from ..models.resources import Resource, ResourceVector
+
+class TestResource(unittest.TestCase):
+    def test_keys(self):
+        """Test resources map to and from their dict keys"""
+        self.assertEqual(Resource.REFINED_METAL.key, 'refined_metal')
+        self.assertEqual(Resource.from_key('refined_metal'), Resource.REFINED_METAL)
+        with self.assertRaises(KeyError):
+            Resource.from_key('unobtainium')
+
+class TestResourceVector(unittest.TestCase):
+    def setUp(self):
+        self.vector = ResourceVector({'metal': 100, 'gas': 50})
+
+    def test_dict_view(self):
+        """Test the vector behaves like a dict of set resources"""
+        self.assertEqual(self.vector['metal'], 100)
+        self.assertEqual(self.vector.get('fuel', 0), 0)
+        self.assertIn('gas', self.vector)
+        self.assertNotIn('fuel', self.vector)
+        self.assertNotIn('last_update', self.vector)
+        self.assertEqual(list(self.vector), ['metal', 'gas'])
+        self.assertEqual(self.vector, {'metal': 100, 'gas': 50})
+
+        del self.vector['gas']
+        self.assertEqual(len(self.vector), 1)
+
+    def test_unknown_resource(self):
+        """Test setting an unknown resource fails"""
+        with self.assertRaises(KeyError):
+            self.vector['last_update'] = 0
+
+    def test_arithmetic(self):
+        """Test vector add, subtract and clip"""
+        other = ResourceVector({'metal': 30, 'fuel': 10})
+        total = self.vector + other
+        self.assertEqual(total, {'metal': 130, 'gas': 50, 'fuel': 10})
+
+        diff = self.vector - other
+        self.assertEqual(diff['fuel'], -10)
+        self.assertEqual(diff.clip(0)['fuel'], 0)
+        self.assertEqual(diff.clip(0, 60)['metal'], 60)
+
+        self.vector += other
+        self.assertEqual(self.vector['metal'], 130)
+
+    def test_sums(self):
+        """Test total and dot products"""
+        self.assertEqual(self.vector.total(), 150)
+        self.assertEqual(self.vector.dot({'metal': 2, 'gas': 3}), 350)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,235 @@
+import unittest
+import io
+import os
+import tempfile
+import random
+from datetime import datetime, timedelta
+from ..models import save_format
+from ..models.save_format import SaveFormatError, read_container, write_container
+from ..models.save_manager import SaveManager
+from ..models.game_state import GameState
+
+class TestSaveFormat(unittest.TestCase):
+    def setUp(self):
+        self.game_state = GameState()
+        self.game_state.credits = 4321
+        self.region = self.game_state.universe.get_region("Region A")
+        self.deposit = self.region.deposits[2]
+        self.deposit.discovered = True
+        self.region.request_grant(self.deposit, timedelta(hours=1))
+        self.game_state.claim_system(self.game_state.available_claims[0])
+        self.fleet = self.game_state.get_current_fleet()
+        self.fleet.resources['metal'] = 250
+        self.fleet.destination = self.region
+        self.game_state.station.add_module("refinery")
+        self.game_state.station.upgrade_module("refinery")
+
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def round_trip(self) -> GameState:
+        save_format.write_save(self.game_state, self.path)
+        return save_format.read_save(self.path)
+
+    def test_universe_round_trip(self):
+        """Test regions, deposits, grants and connections survive a save"""
+        loaded = self.round_trip()
+        self.assertEqual(list(loaded.universe.regions), list(self.game_state.universe.regions))
+
+        region = loaded.universe.get_region("Region A")
+        self.assertEqual(region.level, self.region.level)
+        self.assertEqual(region.position, self.region.position)
+        self.assertEqual(len(region.deposits), len(self.region.deposits))
+        self.assertAlmostEqual(region.deposits[2].quality, self.deposit.quality)
+        self.assertTrue(region.deposits[2].discovered)
+        self.assertIs(region.grants[0].deposit, region.deposits[2])
+        self.assertEqual(
+            {r.name for r in loaded.universe.get_connected_regions(region)},
+            {r.name for r in self.game_state.universe.get_connected_regions(self.region)}
+        )
+
+    def test_game_round_trip(self):
+        """Test fleets, claims and stations survive a save"""
+        loaded = self.round_trip()
+        self.assertEqual(loaded.credits, 4321)
+        self.assertEqual(len(loaded.active_claims), 1)
+        self.assertEqual(len(loaded.available_claims), len(self.game_state.available_claims))
+        self.assertTrue(loaded.active_claims[0].is_active())
+
+        fleet = loaded.get_current_fleet()
+        self.assertEqual(fleet.name, self.fleet.name)
+        self.assertEqual(fleet.resources['metal'], 250)
+        # Fleets point at the loaded regions, not copies
+        self.assertIs(fleet.destination, loaded.universe.get_region("Region A"))
+        self.assertIs(fleet.current_region, loaded.current_region)
+
+        self.assertEqual(len(loaded.market.stations), len(self.game_state.market.stations))
+        self.assertIs(loaded.get_station(), loaded.station)
+        self.assertEqual(loaded.station.modules.get("refinery").level, 2)
+        now = datetime.now()
+        self.assertAlmostEqual(
+            loaded.station.trades['metal'].buy_price_at(now), self.game_state.station.trades['metal'].buy_price_at(now)
+        )
+
+    def test_load_skips_generation(self):
+        """Test loading builds the game from the save alone, without random generation"""
+        save_format.write_save(self.game_state, self.path)
+        random.seed(7)
+        state = random.getstate()
+        loaded = save_format.read_save(self.path)
+        self.assertEqual(random.getstate(), state)
+        self.assertEqual(len(loaded.fleets), len(self.game_state.fleets))
+        self.assertEqual(len(loaded.available_claims), len(self.game_state.available_claims))
+
+    def test_empty_game(self):
+        """Test an empty game has nothing generated"""
+        game_state = GameState.empty()
+        self.assertEqual(game_state.universe.regions, {})
+        self.assertEqual(game_state.fleets, [])
+        self.assertEqual(game_state.available_claims, [])
+        self.assertEqual(game_state.market.stations, [])
+
+    def test_mapped_load(self):
+        """Test a mapped save builds regions only as they are used, matching a full load"""
+        # Claims hold their regions, so leave only the active one
+        self.game_state.available_claims = []
+        save_format.write_save(self.game_state, self.path)
+        loaded = save_format.map_save(self.path)
+        regions = loaded.universe.regions
+        self.assertLess(len(regions.loaded()), len(regions))
+        self.assertEqual(list(regions), list(self.game_state.universe.regions))
+
+        region = loaded.universe.get_region("Region A")
+        self.assertTrue(region.deposits[2].discovered)
+        self.assertIs(region.grants[0].deposit, region.deposits[2])
+        self.assertIs(loaded.get_current_fleet().destination, region)
+        self.assertEqual(
+            {r.name for r in loaded.universe.get_connected_regions(region)},
+            {r.name for r in self.game_state.universe.get_connected_regions(self.region)}
+        )
+        self.assertEqual([r.name for r in region.connections], [r.name for r in self.region.connections])
+
+    def test_mapped_regions_found_by_position(self):
+        """Test a mapped universe is indexed by position without building its regions"""
+        self.game_state.available_claims = []
+        save_format.write_save(self.game_state, self.path)
+        universe = save_format.map_save(self.path).universe
+        loaded = len(universe.regions.loaded())
+        self.assertEqual(len(universe.spatial_index()), len(self.game_state.universe.regions))
+        self.assertEqual(len(universe.regions.loaded()), loaded)
+        self.assertEqual(universe.region_near(2.2, 1.9, 0.5).name,
+                         self.game_state.universe.region_near(2.2, 1.9, 0.5).name)
+
+    def test_mapped_load_needs_uncompressed_save(self):
+        """Test compressed saves are refused for mapping but still open through the manager"""
+        save_format.write_save(self.game_state, self.path, codec='zlib')
+        with self.assertRaises(SaveFormatError):
+            save_format.map_save(self.path)
+        with tempfile.TemporaryDirectory() as save_dir:
+            manager = SaveManager(save_dir, codec="zlib")
+            manager.save_game(self.game_state, "slot1")
+            self.assertEqual(manager.open_game("slot1").credits, 4321)
+
+    def test_manager_maps_uncompressed_saves(self):
+        """Test a manager writing uncompressed saves opens them mapped, with journaled changes applied"""
+        self.game_state.available_claims = []
+        with tempfile.TemporaryDirectory() as save_dir:
+            manager = SaveManager(save_dir, codec="none")
+            manager.save_game(self.game_state, "slot1")
+            opened = manager.open_game("slot1")
+            regions = opened.universe.regions
+            self.assertLess(len(regions.loaded()), len(regions))
+            self.assertEqual(opened.credits, 4321)
+
+            journal = manager.open_journal(opened, "slot1")
+            opened.credits = 99
+            journal.save()
+            reopened = manager.open_game("slot1")
+            self.assertEqual(reopened.credits, 99)
+
+    def test_container(self):
+        """Test sections come back aligned and intact"""
+        f = io.BytesIO()
+        write_container(f, {'a': b'x' * 5, 'b': b'yz'})
+        version, _, sections = read_container(f.getvalue())
+        self.assertEqual(version, save_format.FORMAT_VERSION)
+        self.assertEqual(bytes(sections['b']), b'yz')
+        self.assertEqual(f.getvalue().index(b'yz') % save_format.SECTION_ALIGNMENT, 0)
+
+    def test_codecs(self):
+        """Test every codec round trips and is detected from the header"""
+        for codec in save_format.CODECS:
+            with self.subTest(codec=codec):
+                with open(self.path, 'wb') as f:
+                    write_container(f, save_format.snapshot_game(self.game_state), codec=codec)
+                with open(self.path, 'rb') as f:
+                    _, codec_id, _ = save_format.read_stream(f)
+                self.assertEqual(codec_id, save_format.CODECS[codec])
+                self.assertEqual(save_format.read_save(self.path).credits, 4321)
+
+    def test_chunked_sections(self):
+        """Test sections larger than a chunk stream through intact"""
+        data = bytes(range(256)) * (save_format.CHUNK_SIZE // 128 + 3)
+        f = io.BytesIO()
+        write_container(f, {'big': data, 'small': b'abc'}, codec='lzma')
+        f.seek(0)
+        _, _, sections = save_format.read_stream(f)
+        self.assertEqual(bytes(sections['big']), data)
+        self.assertEqual(bytes(sections['small']), b'abc')
+
+    def test_rejects_bad_files(self):
+        """Test unknown files and newer versions are refused"""
+        with self.assertRaises(SaveFormatError):
+            read_container(b'not a save file at all')
+        f = io.BytesIO()
+        write_container(f, {}, version=save_format.FORMAT_VERSION + 1)
+        with self.assertRaises(SaveFormatError):
+            read_container(f.getvalue())
+        with self.assertRaises(ValueError):
+            write_container(io.BytesIO(), {}, codec='zip')
+        f = io.BytesIO()
+        write_container(f, {'a': b'x' * 100}, codec='zlib')
+        with self.assertRaises(SaveFormatError):
+            read_container(f.getvalue()[:-10])
+
+    def test_save_manager_binary(self):
+        """Test the save manager writes binary saves by default"""
+        with tempfile.TemporaryDirectory() as save_dir:
+            manager = SaveManager(save_dir)
+            self.assertTrue(manager.save_game(self.game_state, "slot1"))
+            self.assertEqual(manager.list_saves(), ["slot1"])
+            self.assertEqual(manager.load_game("slot1").credits, 4321)
+            # Uncompressed, so it can be mapped
+            save_format.map_save(manager._binary_path("slot1"))
+            self.assertTrue(manager.delete_save("slot1"))
+            self.assertEqual(manager.list_saves(), [])
+
+    def test_save_summaries(self):
+        """Test summaries come from the index and are refreshed when a save changes"""
+        with tempfile.TemporaryDirectory() as save_dir:
+            manager = SaveManager(save_dir)
+            self.game_state.playtime = 90.0
+            manager.save_game(self.game_state, "slot1")
+            manager.save_game(self.game_state, "legacy.json")
+
+            summaries = {s.name: s for s in SaveManager(save_dir).save_summaries()}
+            self.assertEqual(set(summaries), {"slot1", "legacy"})
+            self.assertEqual(summaries["slot1"].credits, 4321)
+            self.assertEqual(summaries["slot1"].playtime, 90.0)
+            self.assertEqual(summaries["legacy"].fleet_count, len(self.game_state.fleets))
+
+            # A save written behind the manager's back is read again
+            self.game_state.credits = 99
+            save_format.write_save(self.game_state, os.path.join(save_dir, "slot1.pws"))
+            os.utime(os.path.join(save_dir, "slot1.pws"), ns=(0, 10 ** 18))
+            summaries = {s.name: s for s in manager.save_summaries()}
+            self.assertEqual(summaries["slot1"].credits, 99)
+
+            manager.delete_save("legacy")
+            self.assertEqual([s.name for s in SaveManager(save_dir).save_summaries()], ["slot1"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import unittest
 import os
 import json
+import tempfile
+from datetime import datetime, timedelta
 from ..models.save_manager import SaveManager
 from ..models.game_state import GameState
 
@@ -75,6 +77,50 @@ class TestSaveManager(unittest.TestCase):
         self.assertEqual(loaded_fleet.resources['metal'], 500)
         self.assertEqual(loaded_fleet.resources['gas'], 300)
     
+    def test_mothership_round_trip(self):
+        """Test every backend keeps the mothership's resources, modules and upgrades"""
+        now = datetime.now().replace(microsecond=0)
+        mothership = self.game_state.mothership
+        mothership.resources['fuel'] = 420
+        mothership.modules['power_core'].level = 3
+        mothership.modules['crew_quarters'].is_active = False
+        mothership.upgrade_queue.slots = 1
+        mothership.upgrade_queue.enqueue_all(
+            [mothership.modules['cargo_hold'], mothership.modules['drone_factory']], now
+        )
+
+        def check(loaded):
+            ship = loaded.mothership
+            self.assertIsNot(ship, mothership)
+            self.assertEqual(ship.resources['fuel'], 420)
+            self.assertEqual(ship.modules['power_core'].level, 3)
+            self.assertFalse(ship.modules['crew_quarters'].is_active)
+            self.assertEqual(ship.upgrade_queue.in_progress, [ship.modules['cargo_hold']])
+            self.assertEqual(ship.upgrade_queue.waiting, [ship.modules['drone_factory']])
+            self.assertEqual(ship.modules['cargo_hold'].upgrade_end, now + ship.upgrade_queue.duration)
+            # The restored queue carries on where the saved one was
+            ship.update_upgrades(now + timedelta(hours=1))
+            self.assertEqual(ship.modules['cargo_hold'].level, 2)
+            self.assertEqual(ship.modules['drone_factory'].level, 2)
+
+        with tempfile.TemporaryDirectory() as save_dir:
+            for backend in ("binary", "sqlite", "chunked"):
+                with self.subTest(backend=backend):
+                    manager = SaveManager(save_dir, backend=backend)
+                    manager.save_game(self.game_state, backend)
+                    check(manager.load_game(backend))
+            with self.subTest(backend="json"):
+                manager = SaveManager(save_dir)
+                manager.save_game(self.game_state, "legacy.json")
+                check(manager.load_game("legacy.json"))
+            with self.subTest(backend="journal"):
+                manager = SaveManager(save_dir)
+                opened = GameState()
+                journal = manager.open_journal(opened, "journaled")
+                opened.mothership = self.game_state.mothership
+                journal.save()
+                check(manager.load_game("journaled"))
+
     def test_invalid_save_file(self):
         """Test loading invalid save file"""
         # Create invalid save file
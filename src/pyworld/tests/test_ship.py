@@ -107,6 +107,105 @@ class TestShip(unittest.TestCase):
         capacity = self.ship.get_resource_capacity("metal")
         self.assertEqual(capacity, self.ship.modules['storage'].capacity())
 
+class CountingModule(Module):
+    """Module that counts how often its power usage is computed"""
+    calls = 0
+    
+    def power_usage(self) -> float:
+        CountingModule.calls += 1
+        return super().power_usage()
+
+class TestShipAggregates(unittest.TestCase):
+    def setUp(self):
+        CountingModule.calls = 0
+        self.ship = Ship("Test Ship")
+        self.ship.power_generation = 100
+        self.ship.modules = {
+            'a': CountingModule("A", "test"),
+            'b': CountingModule("B", "test")
+        }
+    
+    def test_reads_are_cached(self):
+        """Test repeated reads do not recompute module power"""
+        first = self.ship.available_power
+        calls = CountingModule.calls
+        for _ in range(10):
+            self.assertEqual(self.ship.available_power, first)
+        self.assertEqual(CountingModule.calls, calls)
+    
+    def test_activation_invalidates(self):
+        """Test deactivating a module updates the aggregates"""
+        self.ship.available_power
+        self.ship.modules['a'].is_active = False
+        self.assertAlmostEqual(self.ship.power_used, self.ship.modules['b'].power_usage())
+        self.assertEqual(self.ship.crew_assigned, self.ship.modules['b'].crew_required())
+    
+    def test_upgrade_invalidates(self):
+        """Test completing an upgrade updates the aggregates"""
+        before = self.ship.power_used
+        module = self.ship.modules['a']
+        module.start_upgrade()
+        module.upgrade_end = datetime.now() - timedelta(seconds=1)
+        self.assertTrue(module.complete_upgrade())
+        self.assertGreater(self.ship.power_used, before)
+    
+    def test_insert_and_remove_invalidate(self):
+        """Test adding and removing modules updates the aggregates"""
+        before = self.ship.power_used
+        self.ship.modules['c'] = Module("C", "test")
+        self.assertGreater(self.ship.power_used, before)
+        
+        removed = self.ship.modules.pop('c')
+        self.assertAlmostEqual(self.ship.power_used, before)
+        
+        # Detached modules no longer affect the ship
+        removed.is_active = False
+        self.assertAlmostEqual(self.ship.power_used, before)
+
+class TestModuleIndex(unittest.TestCase):
+    def setUp(self):
+        self.ship = Ship("Test Ship")
+        self.ship.modules = {
+            'gas_tank': StorageModule("Gas Tank", "gas", 200),
+            'cargo': StorageModule("Cargo Hold", "general", 1000),
+            'drones': ResourceCollector("Mining Drones", "metal", 10.0),
+            'siphon': ResourceCollector("Gas Siphon", "gas", 5.0)
+        }
+    
+    def test_modules_by_type(self):
+        """Test modules can be looked up by class, including base classes"""
+        self.assertEqual(len(self.ship.get_modules_of_type(StorageModule)), 2)
+        self.assertEqual(len(self.ship.get_modules_of_type(ResourceCollector)), 2)
+        self.assertEqual(len(self.ship.get_modules_of_type(Module)), 4)
+        self.assertEqual(self.ship.get_modules_of_type(ProductionModule), [])
+    
+    def test_lookups_return_copies(self):
+        """Test changing a lookup result leaves the index alone"""
+        self.ship.get_modules_of_type(StorageModule).clear()
+        self.ship.get_storage_for("general").clear()
+        self.ship.get_collector_bindings().clear()
+        self.assertEqual(len(self.ship.get_modules_of_type(StorageModule)), 2)
+        self.assertEqual(len(self.ship.get_storage_for("general")), 1)
+        self.assertEqual(len(self.ship.get_collector_bindings()), 2)
+    
+    def test_storage_for_resource(self):
+        """Test storage lookups include general storage"""
+        self.assertEqual(self.ship.get_resource_capacity("gas"), 1200)
+        self.assertEqual(self.ship.get_resource_capacity("metal"), 1000)
+    
+    def test_index_follows_module_changes(self):
+        """Test the index is rebuilt when modules are added or removed"""
+        del self.ship.modules['cargo']
+        self.assertEqual(self.ship.get_resource_capacity("metal"), 0)
+        
+        self.ship.modules['ore_bay'] = StorageModule("Ore Bay", "metal", 300)
+        self.assertEqual(self.ship.get_resource_capacity("metal"), 300)
+    
+    def test_collector_bindings(self):
+        """Test collectors are bound to the first storage module that fits"""
+        bindings = {c.name: s.name for c, s in self.ship.get_collector_bindings()}
+        self.assertEqual(bindings, {'Mining Drones': "Cargo Hold", 'Gas Siphon': "Gas Tank"})
+
 class TestMothership(unittest.TestCase):
     def setUp(self):
         self.mothership = Mothership()
@@ -164,7 +263,7 @@ class TestMothership(unittest.TestCase):
             'refined_metal': 0,
             'refined_gas': 0,
             'fuel': 0,
-            'last_update': self.mothership.resources['last_update']
+            'last_update': self.mothership.last_update
         }
         
         # Set test resource values
@@ -0,0 +1,52 @@
+import unittest
+from ..models.spatial import SpatialHash
+from ..models.universe import Universe, Region
+
+class TestSpatialHash(unittest.TestCase):
+    def setUp(self):
+        self.hash = SpatialHash(cell_size=4)
+        for x in range(-10, 11):
+            for y in range(-10, 11):
+                self.hash.insert((x, y), x, y)
+
+    def test_query_rect(self):
+        """Test a rectangle finds exactly the items inside it"""
+        found = set(self.hash.query_rect(-1.5, 2, 3, 5))
+        self.assertEqual(found, {(x, y) for x in range(-1, 4) for y in range(2, 6)})
+        self.assertEqual(len(self.hash.query_rect(-1000, -1000, 1000, 1000)), 21 * 21)
+        self.assertEqual(self.hash.query_rect(50, 50, 60, 60), [])
+
+    def test_move_and_remove(self):
+        """Test items can be moved between cells and removed"""
+        self.hash.insert((0, 0), 100, 100)
+        self.assertNotIn((0, 0), self.hash.query_rect(-1, -1, 1, 1))
+        self.assertEqual(self.hash.query_rect(99, 99, 101, 101), [(0, 0)])
+        self.hash.remove((0, 0))
+        self.assertNotIn((0, 0), self.hash)
+        self.assertEqual(len(self.hash), 21 * 21 - 1)
+
+    def test_nearest(self):
+        """Test the closest item within the radius is found"""
+        self.assertEqual(self.hash.nearest(3.2, -4.9, 1), (3, -5))
+        self.assertIsNone(self.hash.nearest(30, 30, 5))
+
+    def test_cell_counts(self):
+        """Test occupied cells report how many items they hold"""
+        counts = self.hash.cell_counts(0, 0, 7.9, 7.9)
+        self.assertEqual(counts, {(0, 0): 16, (0, 1): 16, (1, 0): 16, (1, 1): 16})
+        self.assertEqual(self.hash.cell_counts(8, 8, 20, 20), {(2, 2): 9})
+
+class TestRegionsInRect(unittest.TestCase):
+    def test_regions_in_rect(self):
+        """Test the universe finds regions by position and sees new ones"""
+        universe = Universe()
+        self.assertEqual(
+            set(universe.regions_in_rect(-2, -2, 0, 0)),
+            {r for r in universe.regions.values() if -2 <= r.position[0] <= 0 and -2 <= r.position[1] <= 0}
+        )
+        region = Region("Far Away", 1, (40, 40))
+        universe.regions[region.name] = region
+        self.assertEqual(universe.regions_in_rect(39, 39, 41, 41), [region])
+
+if __name__ == '__main__':
+    unittest.main()
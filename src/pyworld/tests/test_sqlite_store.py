@@ -0,0 +1,170 @@
+import unittest
+import os
+import tempfile
+from datetime import timedelta
+from ..models.sqlite_store import SQLiteStore
+from ..models.save_manager import SaveManager
+from ..models.universe import RegionMap
+from ..models.game_state import GameState
+
+class TestSQLiteStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "game.sqlite")
+        self.game_state = GameState()
+        self.game_state.credits = 4321
+        self.region = self.game_state.universe.get_region("Region A")
+        self.region.deposits[2].discovered = True
+        self.region.request_grant(self.region.deposits[2], timedelta(hours=1))
+        self.fleet = self.game_state.get_current_fleet()
+        self.fleet.resources['metal'] = 250
+        self.fleet.destination = self.region
+        self.game_state.station.add_module("refinery")
+
+        self.store = SQLiteStore(self.path)
+        self.store.save(self.game_state)
+
+    def tearDown(self):
+        self.store.close()
+        self.dir.cleanup()
+
+    def load(self) -> GameState:
+        store = SQLiteStore(self.path)
+        self.addCleanup(store.close)
+        return store.load()
+
+    def test_round_trip(self):
+        """Test the game's state survives a save"""
+        loaded = self.load()
+        self.assertEqual(loaded.credits, 4321)
+        self.assertEqual(list(loaded.universe.regions), list(self.game_state.universe.regions))
+
+        fleet = loaded.get_current_fleet()
+        self.assertEqual(fleet.resources['metal'], 250)
+        self.assertIs(fleet.destination, loaded.universe.get_region("Region A"))
+        self.assertEqual(len(loaded.market.stations), len(self.game_state.market.stations))
+        self.assertEqual(loaded.station.modules.get("refinery").level, 1)
+
+        region = loaded.universe.get_region("Region A")
+        self.assertTrue(region.deposits[2].discovered)
+        self.assertIs(region.grants[0].deposit, region.deposits[2])
+        self.assertEqual(
+            {r.name for r in loaded.universe.get_connected_regions(region)},
+            {r.name for r in self.game_state.universe.get_connected_regions(self.region)}
+        )
+        self.assertEqual([r.name for r in region.connections], [r.name for r in self.region.connections])
+
+    def test_regions_load_lazily(self):
+        """Test regions are only read once the game uses them"""
+        self.game_state.available_claims = []
+        self.game_state.fleets[0].destination = None
+        self.store.save(self.game_state)
+
+        loaded = self.load()
+        regions = loaded.universe.regions
+        self.assertIsInstance(regions, RegionMap)
+        self.assertLess(len(regions.loaded()), len(regions))
+        loaded.update(0.1)
+        self.assertLess(len(regions.loaded()), len(regions))
+
+        regions["Region H"]
+        self.assertIn(regions["Region H"], regions.loaded())
+
+    def test_only_changed_regions_are_written(self):
+        """Test saving a loaded game writes back just the regions that changed"""
+        store = SQLiteStore(self.path)
+        self.addCleanup(store.close)
+        loaded = store.load()
+        self.assertEqual(store.save(loaded), 0)
+
+        region = loaded.universe.get_region("Region B")
+        region.discover_deposits()
+        loaded.credits = 99
+        self.assertEqual(store.save(loaded), 1)
+
+        reloaded = self.load()
+        self.assertEqual(reloaded.credits, 99)
+        self.assertTrue(all(d.discovered for d in reloaded.universe.get_region("Region B").deposits))
+
+    def test_lazy_game_saved_under_new_name(self):
+        """Test saving a lazily loaded game elsewhere keeps the regions it never touched"""
+        self.game_state.available_claims = []
+        self.game_state.fleets[0].destination = None
+        self.store.save(self.game_state)
+
+        loaded = self.load()
+        self.assertLess(len(loaded.universe.regions.loaded()), len(loaded.universe.regions))
+        copy_path = os.path.join(self.dir.name, "copy.sqlite")
+        copy = SQLiteStore(copy_path)
+        self.addCleanup(copy.close)
+        copy.save(loaded)
+
+        reloaded = SQLiteStore(copy_path)
+        self.addCleanup(reloaded.close)
+        game = reloaded.load()
+        self.assertEqual(sorted(game.universe.regions), sorted(self.game_state.universe.regions))
+        for name, original in self.game_state.universe.regions.items():
+            region = game.universe.get_region(name)
+            self.assertEqual(len(region.deposits), len(original.deposits))
+            self.assertEqual(
+                {r.name for r in game.universe.get_connected_regions(region)},
+                {r.name for r in self.game_state.universe.get_connected_regions(original)}
+            )
+
+    def test_lazy_game_saved_over_its_own_file(self):
+        """Test a second store can rewrite the file a lazy game is reading from"""
+        loaded = self.load()
+        store = SQLiteStore(self.path)
+        self.addCleanup(store.close)
+        store.save(loaded)
+        game = self.load()
+        self.assertEqual(len(game.universe.regions), len(self.game_state.universe.regions))
+        self.assertTrue(game.universe.get_region("Region A").deposits[2].discovered)
+
+    def test_regions_in_rect_reads_positions(self):
+        """Test finding regions by position loads only the regions found"""
+        self.game_state.available_claims = []
+        self.game_state.fleets[0].destination = None
+        self.store.save(self.game_state)
+        universe = self.load().universe
+        loaded = len(universe.regions.loaded())
+
+        universe.spatial_index()
+        self.assertEqual(len(universe.regions.loaded()), loaded)
+        expected = {r.name for r in self.game_state.universe.regions.values()
+                    if -2 <= r.position[0] <= 0 and -2 <= r.position[1] <= 0}
+        self.assertEqual({r.name for r in universe.regions_in_rect(-2, -2, 0, 0)}, expected)
+        self.assertLessEqual(len(universe.regions.loaded()), loaded + len(expected))
+
+    def test_position_lookups_use_the_index(self):
+        """Test stored universes are searched by position through the regions_position index"""
+        self.game_state.available_claims = []
+        self.game_state.fleets[0].destination = None
+        self.store.save(self.game_state)
+        universe = self.load().universe
+        plan = " ".join(row[-1] for row in self.store.connection.execute(
+            "EXPLAIN QUERY PLAN SELECT name, x, y FROM regions WHERE x BETWEEN 0 AND 1 AND y BETWEEN 0 AND 1"
+        ))
+        self.assertIn("regions_position", plan)
+
+        expected = {r.name for r in self.game_state.universe.regions.values()
+                    if -2 <= r.position[0] <= 0 and -2 <= r.position[1] <= 0}
+        self.assertEqual({r.name for r in universe.regions_in_rect(-2, -2, 0, 0)}, expected)
+        self.assertEqual(universe.region_near(2.2, 1.9, 0.5).name,
+                         self.game_state.universe.region_near(2.2, 1.9, 0.5).name)
+        self.assertIsNone(universe._spatial)  # No full scan of the positions
+
+    def test_save_manager_backend(self):
+        """Test the save manager can keep saves in SQLite"""
+        manager = SaveManager(self.dir.name, backend="sqlite")
+        self.assertTrue(manager.save_game(self.game_state, "slot1"))
+        self.assertIn("slot1", manager.list_saves())
+        self.assertEqual(manager.load_game("slot1").credits, 4321)
+        self.assertEqual(
+            {s.name: s.credits for s in manager.save_summaries()}["slot1"], 4321
+        )
+        self.assertTrue(manager.delete_save("slot1"))
+        self.assertNotIn("slot1", manager.list_saves())
+
+if __name__ == '__main__':
+    unittest.main()
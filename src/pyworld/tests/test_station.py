@@ -1,5 +1,6 @@
 import unittest
-from ..models.station import SpaceStation
+from datetime import datetime, timedelta
+from ..models.station import SpaceStation, Trade, ModuleRegistry, Module
 
 class TestSpaceStation(unittest.TestCase):
     def setUp(self):
@@ -85,5 +86,102 @@ class TestSpaceStation(unittest.TestCase):
         module.upgrade()
         self.assertGreater(module.efficiency, base_efficiency)
 
+class TestTrade(unittest.TestCase):
+    def setUp(self):
+        self.trade = Trade('metal', 8, 10, 500)
+        self.start = self.trade.last_update
+    
+    def test_prices_stable_at_equilibrium(self):
+        """Test prices do not drift while stock is unchanged"""
+        later = self.start + timedelta(hours=48)
+        self.assertAlmostEqual(self.trade.buy_price_at(later), 8)
+        self.assertAlmostEqual(self.trade.sell_price_at(later), 10)
+    
+    def test_scarcity_raises_prices(self):
+        """Test prices relax upward toward equilibrium when stock is low"""
+        self.trade.quantity = 100
+        anchor = self.trade.last_update
+        soon = self.trade.sell_price_at(anchor + timedelta(hours=1))
+        later = self.trade.sell_price_at(anchor + timedelta(hours=100))
+        
+        self.assertGreater(soon, 10)
+        self.assertGreater(later, soon)
+        self.assertAlmostEqual(
+            later, self.trade.pricing.equilibrium(self.trade.base_sell_price, 100), places=4
+        )
+    
+    def test_update_frequency_does_not_matter(self):
+        """Test settling often gives the same price as settling once"""
+        other = Trade('metal', 8, 10, 500)
+        for trade in (self.trade, other):
+            trade.last_update = self.start
+            trade.quantity = 100
+        
+        for minute in range(1, 121):
+            self.trade.settle(self.start + timedelta(minutes=minute))
+        end = self.start + timedelta(hours=2)
+        
+        self.assertAlmostEqual(self.trade.buy_price_at(end), other.buy_price_at(end))
+        self.assertAlmostEqual(self.trade.sell_price_at(end), other.sell_price_at(end))
+    
+    def test_restock_catches_up(self):
+        """Test restock applies every missed interval at once"""
+        station = SpaceStation()
+        station.trades['metal'].quantity = 200
+        station.last_restock = datetime.now() - timedelta(hours=3, minutes=30)
+        
+        station.restock()
+        
+        self.assertEqual(station.trades['metal'].quantity, 500)
+        self.assertGreater(station.last_restock, datetime.now() - timedelta(hours=1))
+
+class TestModuleRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = ModuleRegistry()
+        self.refinery = Module("refinery")
+        self.registry.add(self.refinery)
+        self.registry.add(Module("storage"))
+    
+    def test_lookup_by_type(self):
+        """Test modules are found by type and iterate in install order"""
+        self.assertIs(self.registry.get("refinery"), self.refinery)
+        self.assertIsNone(self.registry.get("shipyard"))
+        self.assertEqual([m.type for m in self.registry], ["refinery", "storage"])
+        self.assertIn(self.refinery, self.registry)
+    
+    def test_remove(self):
+        """Test removing a module updates every index"""
+        self.assertTrue(self.registry.remove(self.refinery))
+        self.assertFalse(self.registry.remove(self.refinery))
+        self.assertIsNone(self.registry.get("refinery"))
+        self.assertEqual(self.registry.count("refinery"), 0)
+        self.assertEqual(len(self.registry), 1)
+    
+    def test_add_twice(self):
+        """Test adding an installed module again leaves the indexes alone"""
+        self.assertFalse(self.registry.add(self.refinery))
+        self.assertEqual(self.registry.count("refinery"), 1)
+        self.assertAlmostEqual(self.registry.efficiency("refinery"), 1.0)
+        self.assertTrue(self.registry.remove(self.refinery))
+        self.assertIsNone(self.registry.get("refinery"))
+    
+    def test_efficiency_cache(self):
+        """Test cached efficiency totals follow adds and upgrades"""
+        self.registry.add(Module("refinery"))
+        self.assertAlmostEqual(self.registry.efficiency("refinery"), 2.0)
+        self.refinery.upgrade()
+        self.assertAlmostEqual(self.registry.efficiency("refinery"), 2.1)
+        self.registry.remove(self.refinery)
+        self.assertAlmostEqual(self.registry.efficiency("refinery"), 1.0)
+    
+    def test_station_refineries_combine(self):
+        """Test station refineries process at their combined efficiency"""
+        station = SpaceStation()
+        station.add_module("refinery")
+        station.add_module("refinery")
+        output = station.process_resources({'metal': 1000, 'gas': 1000})
+        self.assertAlmostEqual(output['refined_metal'], 100)
+        self.assertAlmostEqual(output['refined_gas'], 100)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,83 @@
+import unittest
+from datetime import datetime, timedelta
+from ..models.upgrades import UpgradeQueue
+from ..models.ship import Mothership, ResourceCollector
+from ..models.station import SpaceStation
+from ..models.game_state import GameState
+
+class TestUpgradeQueue(unittest.TestCase):
+    def setUp(self):
+        self.ship = Mothership()
+        self.now = datetime(2024, 1, 1)
+        self.queue = UpgradeQueue(slots=2, duration=timedelta(minutes=5))
+        self.modules = list(self.ship.modules.values())
+
+    def test_slots_limit_parallel_upgrades(self):
+        """Test only as many upgrades run as there are slots"""
+        self.assertEqual(self.queue.enqueue_all(self.modules[:3], self.now), 3)
+        self.assertEqual(len(self.queue.in_progress), 2)
+        self.assertEqual(self.queue.waiting, [self.modules[2]])
+        self.assertIsNone(self.modules[2].upgrade_start)
+        self.assertFalse(self.queue.enqueue(self.modules[0], self.now))
+
+    def test_deadline_completion(self):
+        """Test upgrades complete at their deadlines and waiting ones start on time"""
+        self.queue.enqueue_all(self.modules[:3], self.now)
+        self.assertEqual(self.queue.next_deadline, self.now + timedelta(minutes=5))
+        self.assertEqual(self.queue.advance(self.now + timedelta(minutes=4)), [])
+
+        # Advancing late still starts the waiting upgrade when the slot freed up
+        completed = self.queue.advance(self.now + timedelta(minutes=7))
+        self.assertEqual(completed, self.modules[:2])
+        self.assertTrue(all(m.level == 2 for m in completed))
+        self.assertEqual(self.modules[2].upgrade_start, self.now + timedelta(minutes=5))
+
+        self.assertEqual(self.queue.advance(self.now + timedelta(minutes=10)), [self.modules[2]])
+        self.assertEqual(len(self.queue), 0)
+        self.assertIsNone(self.queue.next_deadline)
+
+    def test_cancel(self):
+        """Test cancelling a running upgrade frees its slot"""
+        self.queue.enqueue_all(self.modules[:3], self.now)
+        self.assertTrue(self.queue.cancel(self.modules[0]))
+        self.assertIsNone(self.modules[0].upgrade_start)
+        self.assertIn(self.modules[2], self.queue.in_progress)
+        self.assertNotIn(self.modules[0], self.queue.advance(self.now + timedelta(hours=1)))
+        self.assertEqual(self.modules[0].level, 1)
+
+    def test_cancel_starts_waiting_upgrade_at_given_time(self):
+        """Test the upgrade freed by a cancel starts at the time given"""
+        self.queue.enqueue_all(self.modules[:3], self.now)
+        later = self.now + timedelta(minutes=2)
+        self.queue.cancel(self.modules[0], later)
+        self.assertEqual(self.modules[2].upgrade_start, later)
+        self.assertEqual(self.queue.next_deadline, self.now + timedelta(minutes=5))
+
+    def test_game_update_finishes_ship_upgrades(self):
+        """Test game updates complete due upgrades on the mothership"""
+        game_state = GameState()
+        ship = game_state.mothership
+        ship.queue_upgrades(ResourceCollector, datetime.now() - timedelta(minutes=10))
+        game_state.update(0.1)
+        self.assertEqual(len(ship.upgrade_queue), 0)
+        self.assertTrue(all(m.level == 2 for m in ship.get_modules_of_type(ResourceCollector)))
+
+    def test_ship_bulk_upgrade(self):
+        """Test a ship can queue upgrades for all modules of a type"""
+        self.assertEqual(self.ship.queue_upgrades(ResourceCollector, self.now), 2)
+        upgraded = self.ship.update_upgrades(self.now + timedelta(minutes=5))
+        self.assertEqual(len(upgraded), 2)
+        self.assertTrue(all(isinstance(m, ResourceCollector) for m in upgraded))
+
+    def test_station_bulk_upgrade(self):
+        """Test a station can queue upgrades for all modules of a type"""
+        station = SpaceStation()
+        for _ in range(3):
+            station.add_module("refinery")
+        self.assertEqual(station.queue_upgrades("refinery", self.now), 3)
+        station.update_upgrades(self.now + timedelta(minutes=10))
+        self.assertEqual([m.level for m in station.modules], [2, 2, 2])
+        self.assertAlmostEqual(station.modules.efficiency("refinery"), 3.3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -104,7 +104,7 @@ class FleetDetailsDialog(tk.Toplevel):
             )
             label = ttk.Label(
                 frame,
-                text=str(self.fleet.resources.get(resource, 0))
+                text=str(int(self.fleet.resources.get(resource, 0)))
             )
             label.grid(row=row, column=1, sticky='w', padx=5, pady=2)
             self.resource_labels[resource] = label
@@ -180,7 +180,7 @@ class FleetDetailsDialog(tk.Toplevel):
         for resource, label in self.resource_labels.items():
             label.config(
                 text=f"{resource.replace('_', ' ').title()}: "
-                     f"{self.fleet.resources.get(resource, 0)}"
+                     f"{int(self.fleet.resources.get(resource, 0))}"
             )
         
         # Update equipment info
@@ -8,10 +8,11 @@ from .overview_tab import OverviewTab
 from .claims_view import ClaimsView
 
 class MainWindow(tk.Tk):
-    def __init__(self, game_state):
+    def __init__(self, game_state, autosave=None):
         super().__init__()
         
         self.game_state = game_state
+        self.autosave = autosave  # Optional AutosaveService
         self.title("PyWorlds")
         self.geometry("1024x768")
         
@@ -21,6 +22,9 @@ class MainWindow(tk.Tk):
         
         self.create_gui()
         
+        # Finish any save in progress before closing
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        
         # Initialize update loop
         self.last_update = datetime.now()
         self.update_displays()
@@ -93,6 +97,10 @@ class MainWindow(tk.Tk):
         # Update game state
         self.game_state.update(dt)
         
+        # Snapshot for autosave; writing happens off the Tk thread
+        if self.autosave:
+            self.autosave.tick(self.game_state, now)
+        
         # Update resource displays
         self.credits_label.config(text=f"{int(self.game_state.credits):,}")
         
@@ -127,6 +135,12 @@ class MainWindow(tk.Tk):
         # Schedule next update (10 times per second instead of every 100ms)
         self.after(100, self.update_displays)
     
+    def on_close(self):
+        """Close the window once pending saves are written"""
+        if self.autosave:
+            self.autosave.shutdown()
+        self.destroy()
+    
     def run(self):
         """Run the main window"""
         self.mainloop() 
\ No newline at end of file
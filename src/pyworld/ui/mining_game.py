@@ -1,16 +1,19 @@
 import tkinter as tk
 from tkinter import ttk
+import tkinter.messagebox as messagebox
 import random
 from datetime import datetime, timedelta
 import math
+from ..models.ledger import FleetAccount, Transfer, LedgerError
 
 class MiningGame(tk.Toplevel):
     """A mini-game for active resource collection"""
     
-    def __init__(self, parent, fleet, callback=None):
+    def __init__(self, parent, fleet, ledger, callback=None):
         super().__init__(parent)
         self.fleet = fleet
         self.callback = callback
+        self.ledger = ledger  # The game's ledger, so the haul is recorded with everything else
         self.title(f"Mining Operation - {fleet.name}")
         self.geometry("800x600")
         self.resizable(False, False)
@@ -230,10 +233,18 @@ class MiningGame(tk.Toplevel):
             self.canvas.delete(asteroid['id'])
         self.asteroids = []
         
-        # Add resources to fleet
+        # Add resources to fleet, as much as fits in storage
+        transfers = []
+        available_storage = self.fleet.storage_capacity - self.fleet.storage_used
         for resource, amount in self.resources.items():
             if resource in self.fleet.resources:
-                self.fleet.add_resource(resource, amount)
+                amount = max(0, min(amount, available_storage))
+                available_storage -= amount
+                transfers.append(Transfer(self.ledger.world, FleetAccount(self.fleet), resource, amount))
+        try:
+            self.ledger.transfer_batch(transfers, memo="mining")
+        except LedgerError as e:
+            messagebox.showerror("Mining Failed", f"The collected resources could not be stored: {e}")
         
         # Show results
         result_text = f"Mining complete!\nScore: {self.score}\n\nResources collected:"
@@ -5,6 +5,7 @@ from .fleet_details import FleetDetailsDialog
 from datetime import datetime
 import tkinter.messagebox as messagebox
 from ..models.universe import RegionVisibility
+from ..models.ledger import LedgerError
 
 class OverviewTab(ttk.Frame):
     def __init__(self, parent, game_state):
@@ -190,10 +191,15 @@ class OverviewTab(ttk.Frame):
     def buy_new_ship(self):
         """Buy a new ship"""
         # For now, just add a new freighter if we can afford it
-        if self.game_state.credits >= 5000:
-            self.game_state.credits -= 5000
-            self.game_state.add_fleet(f"Fleet {len(self.game_state.fleets) + 1}")
-            self.update_displays()
+        ledger = self.game_state.ledger
+        try:
+            ledger.transfer(self.game_state.corporation_account, ledger.world, 'credits', 5000,
+                            memo="fleet purchase")
+        except LedgerError:
+            messagebox.showwarning("Not Enough Credits", "A new fleet costs 5000 credits.")
+            return
+        self.game_state.add_fleet(f"Fleet {len(self.game_state.fleets) + 1}")
+        self.update_displays()
     
     def start_mining(self):
         """Start the mining mini-game"""
@@ -207,7 +213,7 @@ class OverviewTab(ttk.Frame):
         
         if fleet and not fleet.is_traveling:
             # Launch mining game
-            MiningGame(self, fleet, callback=self.update_displays)
+            MiningGame(self, fleet, self.game_state.ledger, callback=self.update_displays)
     
     def show_fleet_menu(self, event):
         """Show the fleet action menu"""
@@ -1,8 +1,22 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import timedelta
-from typing import Dict, Optional
-from ..models.universe import RegionVisibility
+import math
+from typing import Dict, List, Optional, Set, Tuple
+from ..models.universe import Region, RegionVisibility
+
+GRID_SIZE = 50  # Pixels between grid lines at zoom 1.0
+MIN_ZOOM = 0.05
+MAX_ZOOM = 2.0
+
+# Level of detail for the universe map
+LABEL_ZOOM = 0.75  # Region names are hidden when zoomed out further
+CLUSTER_ZOOM = 0.4  # Further out, nearby regions share one marker
+CLUSTER_PIXELS = 24  # About how wide a cluster is on screen
+MIN_GRID_PIXELS = 20  # Grid lines are thinned out to stay this far apart
+DRAW_MARGIN = 0.25  # Items are kept this share of the canvas size beyond each edge
+FRAME_MS = 16  # Pans and zooms are applied at most once per frame
+HIT_PIXELS = 4  # Regions drawn smaller than this still take clicks this far out
 
 class RegionCanvas(tk.Canvas):
     def __init__(self, parent, region, **kwargs):
@@ -112,13 +126,46 @@ class UniverseView(ttk.Frame):
         self.drag_start = None
         self.view_offset = [0, 0]
         self.zoom = 1.0
-        self.selected_region = None
+        self.selected_region = None  # The one region selected, if just one is
+        self.selected_regions: Set[Region] = set()
+        self.band_start = None  # Where a rubber band selection began
+        self.hovered_region = None
+        self.tooltip = None
+        
+        # Canvas items are created once and then updated in place
+        self.region_items: Dict[Region, Tuple[int, int]] = {}  # Region -> (oval, label)
+        self.region_colors: Dict[Region, str] = {}
+        self.connection_items: Dict[Tuple[Region, Region], int] = {}
+        self.cluster_items: Dict[Tuple[int, int], int] = {}  # Block of the spatial index -> marker
+        self.grid_items: List[int] = []
+        self.drawn_zoom = None  # The zoom the items were last laid out at
+        self.drawn_rect = None  # Universe area (x0, y0, x1, y1) the items cover
+        self.label_size = None  # Font size the region names were last given
+        self.marked_current_region = None  # The region drawn as current
+        
+        # What changed since the map was last brought up to date
+        self.dirty_regions: Set[Region] = set()
+        self.layout_dirty = True
+        self.redraw_pending = None
+        
+        # Pan and zoom gathered from input events until the next frame
+        self.pending_pan = [0, 0]
+        self.pending_zoom = 1.0
+        self.zoom_anchor = (0, 0)
+        self.frame_pending = None
         
         # Create widgets
         self.create_widgets()
+        self.draw_map()
+        self.update_region_info()
         
-        # Start update loop
-        self.update_displays()
+        # The map redraws when the game reports a change, rather than on a timer
+        self.game_state.changes.subscribe(self.on_game_change)
+    
+    def destroy(self):
+        """Stop listening to the game before the widgets go"""
+        self.game_state.changes.unsubscribe(self.on_game_change)
+        super().destroy()
     
     def create_widgets(self):
         """Create the universe view widgets"""
@@ -141,7 +188,13 @@ class UniverseView(ttk.Frame):
         self.canvas.bind('<Button-1>', self.on_click)
         self.canvas.bind('<B1-Motion>', self.on_drag)
         self.canvas.bind('<ButtonRelease-1>', self.on_release)
+        self.canvas.bind('<Shift-Button-1>', self.on_band_start)
+        self.canvas.bind('<Shift-B1-Motion>', self.on_band_drag)
+        self.canvas.bind('<Shift-ButtonRelease-1>', self.on_band_release)
+        self.canvas.bind('<Motion>', self.on_hover)
+        self.canvas.bind('<Leave>', self.hide_tooltip)
         self.canvas.bind('<MouseWheel>', self.on_mousewheel)
+        self.canvas.bind('<Configure>', self.on_resize)
         
         # Info panel (left side)
         self.info_panel = ttk.Frame(self, padding="5")
@@ -186,91 +239,324 @@ class UniverseView(ttk.Frame):
         self.travel_button.pack(pady=5)
         self.travel_button['state'] = 'disabled'
     
+    def region_color(self, region):
+        """Get the color a region is drawn in"""
+        if region.visibility == RegionVisibility.UNEXPLORED:
+            return '#666666'  # Gray for unexplored
+        elif region == self.game_state.current_region:
+            return '#00ff00'  # Green for current region
+        elif region in self.selected_regions:
+            return '#ffff00'  # Yellow for selected
+        return '#ffffff'  # White for explored
+    
     def draw_map(self):
-        """Draw the universe map"""
-        self.canvas.delete('all')  # Clear canvas
-        
-        # Calculate view bounds
+        """Start the universe map afresh
+        
+        Items are created by layout_map for what is in view, then moved
+        as the view changes and recolored by refresh_region as the game
+        changes.
+        """
+        self.canvas.delete('all')
+        self.region_items.clear()
+        self.region_colors.clear()
+        self.connection_items.clear()
+        self.cluster_items.clear()
+        self.grid_items.clear()
+        self.drawn_zoom = None
+        self.drawn_rect = None
+        self.label_size = None
+        self.marked_current_region = self.game_state.current_region
+        self.layout_dirty = True
+        self.request_redraw()
+    
+    def screen_position(self, region) -> Tuple[float, float]:
+        """Get where a region's center is on the canvas"""
+        grid_size = GRID_SIZE * self.zoom
+        center_x = self.canvas.winfo_width() / 2 - self.view_offset[0]
+        center_y = self.canvas.winfo_height() / 2 - self.view_offset[1]
+        return center_x + region.position[0] * grid_size, center_y + region.position[1] * grid_size
+    
+    def visible_rect(self, margin: float = 0) -> Tuple[float, float, float, float]:
+        """Get the universe coordinates (x0, y0, x1, y1) the canvas shows, widened by margin pixels"""
+        grid_size = GRID_SIZE * self.zoom
         width = self.canvas.winfo_width()
         height = self.canvas.winfo_height()
         center_x = width / 2 - self.view_offset[0]
         center_y = height / 2 - self.view_offset[1]
-        
-        # Draw grid
-        grid_size = 50 * self.zoom
-        grid_color = '#1a1a1a'
-        
-        # Vertical lines
-        for x in range(int(-width/grid_size), int(width/grid_size) + 1):
-            x_pos = center_x + x * grid_size
-            self.canvas.create_line(
-                x_pos, 0, x_pos, height,
-                fill=grid_color, tags='grid'
-            )
-        
-        # Horizontal lines
-        for y in range(int(-height/grid_size), int(height/grid_size) + 1):
-            y_pos = center_y + y * grid_size
-            self.canvas.create_line(
-                0, y_pos, width, y_pos,
-                fill=grid_color, tags='grid'
-            )
-        
-        # Draw regions
-        for region_name, region in self.game_state.universe.regions.items():
-            # Calculate screen position
-            x = center_x + region.position[0] * grid_size
-            y = center_y + region.position[1] * grid_size
-            
-            # Draw region circle
-            radius = 10 * self.zoom
-            if region.visibility == RegionVisibility.UNEXPLORED:
-                color = '#666666'  # Gray for unexplored
-            elif region == self.game_state.current_region:
-                color = '#00ff00'  # Green for current region
-            elif region == self.selected_region:
-                color = '#ffff00'  # Yellow for selected
+        return (
+            (-margin - center_x) / grid_size, (-margin - center_y) / grid_size,
+            (width + margin - center_x) / grid_size, (height + margin - center_y) / grid_size
+        )
+    
+    def draw_margin(self) -> float:
+        """Get how many pixels beyond the canvas edges items are kept for"""
+        return DRAW_MARGIN * max(self.canvas.winfo_width(), self.canvas.winfo_height())
+    
+    def cluster_cells(self, zoom: float) -> int:
+        """Get how many spatial index cells across a cluster is at a zoom"""
+        cell_size = self.game_state.universe.spatial_index().cell_size
+        return max(1, round(CLUSTER_PIXELS / (cell_size * GRID_SIZE * zoom)))
+    
+    def detail_level(self, zoom: Optional[float]):
+        """Get what the map shows at a zoom; zooms with the same level draw the same items"""
+        if zoom is None:
+            return None
+        if zoom < CLUSTER_ZOOM:
+            return 'clusters', self.cluster_cells(zoom)
+        return 'regions', zoom >= LABEL_ZOOM
+    
+    def covers_view(self) -> bool:
+        """Check if the drawn items still cover everything the canvas shows"""
+        if self.drawn_rect is None:
+            return False
+        x0, y0, x1, y1 = self.visible_rect()
+        dx0, dy0, dx1, dy1 = self.drawn_rect
+        return dx0 <= x0 and dy0 <= y0 and x1 <= dx1 and y1 <= dy1
+    
+    def screen_to_universe(self, x: float, y: float) -> Tuple[float, float]:
+        """Get the universe coordinates of a point on the canvas"""
+        grid_size = GRID_SIZE * self.zoom
+        center_x = self.canvas.winfo_width() / 2 - self.view_offset[0]
+        center_y = self.canvas.winfo_height() / 2 - self.view_offset[1]
+        return (x - center_x) / grid_size, (y - center_y) / grid_size
+    
+    def region_at(self, x: float, y: float) -> Optional[Region]:
+        """Get the region drawn under a point on the canvas, if any
+        
+        Looks the point up in the universe's spatial index, so it costs
+        the same however many regions or canvas items there are; panning
+        and zooming only change how the point is converted. Zoomed out to
+        clusters no single region is drawn, so nothing is hit.
+        """
+        if self.zoom < CLUSTER_ZOOM:
+            return None
+        radius = max(10 * self.zoom, HIT_PIXELS) / (GRID_SIZE * self.zoom)
+        return self.game_state.universe.region_near(*self.screen_to_universe(x, y), radius)
+    
+    def regions_in_screen_rect(self, x0: float, y0: float, x1: float, y1: float) -> List[Region]:
+        """Get the regions whose centers are drawn within a rectangle on the canvas"""
+        if self.zoom < CLUSTER_ZOOM:
+            return []  # Only cluster markers are drawn
+        ux0, uy0 = self.screen_to_universe(min(x0, x1), min(y0, y1))
+        ux1, uy1 = self.screen_to_universe(max(x0, x1), max(y0, y1))
+        return self.game_state.universe.regions_in_rect(ux0, uy0, ux1, uy1)
+    
+    def layout_map(self):
+        """Bring the map's items in line with the view offset, zoom and canvas size"""
+        self.layout_dirty = False
+        self.layout_grid()
+        self.drawn_rect = self.visible_rect(self.draw_margin())
+        if self.zoom < CLUSTER_ZOOM:
+            self.clear_regions()
+            self.layout_clusters()
+        else:
+            self.clear_clusters()
+            self.layout_regions()
+        self.drawn_zoom = self.zoom
+    
+    def layout_grid(self):
+        """Place the grid lines, reusing the ones already on the canvas"""
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        center_x = width / 2 - self.view_offset[0]
+        center_y = height / 2 - self.view_offset[1]
+        grid_size = GRID_SIZE * self.zoom
+        while grid_size < MIN_GRID_PIXELS:  # Thin the grid out when zoomed out
+            grid_size *= 2
+        
+        # Only the lines that fall on the canvas
+        first_x = math.ceil(-center_x / grid_size)
+        first_y = math.ceil(-center_y / grid_size)
+        lines = [(x, 0, x, height) for x in (
+            center_x + i * grid_size for i in range(first_x, first_x + int(width / grid_size) + 1)
+        )]
+        lines += [(0, y, width, y) for y in (
+            center_y + i * grid_size for i in range(first_y, first_y + int(height / grid_size) + 1)
+        )]
+        while len(self.grid_items) < len(lines):
+            self.grid_items.append(self.canvas.create_line(0, 0, 0, 0, fill='#1a1a1a', tags='grid'))
+        while len(self.grid_items) > len(lines):
+            self.canvas.delete(self.grid_items.pop())
+        for item, line in zip(self.grid_items, lines):
+            self.canvas.coords(item, *line)
+        self.canvas.tag_lower('grid')
+    
+    def layout_regions(self):
+        """Draw the regions in view, dropping the items of those that left it"""
+        radius = 10 * self.zoom
+        visible = set(self.game_state.universe.regions_in_rect(*self.drawn_rect))
+        for region in [r for r in self.region_items if r not in visible]:
+            self.canvas.delete(*self.region_items.pop(region))
+            del self.region_colors[region]
+        
+        for region in visible:
+            x, y = self.screen_position(region)
+            items = self.region_items.get(region)
+            if items is None:
+                color = self.region_color(region)
+                oval = self.canvas.create_oval(
+                    x - radius, y - radius, x + radius, y + radius,
+                    fill=color, outline=color,
+                    tags='region'
+                )
+                label = self.canvas.create_text(
+                    x, y + radius + 5,
+                    text=region.name,
+                    fill=color,
+                    font=('TkDefaultFont', int(8 * self.zoom)),
+                    state='normal' if self.zoom >= LABEL_ZOOM else 'hidden',
+                    tags='region_name'
+                )
+                self.region_items[region] = (oval, label)
+                self.region_colors[region] = color
             else:
-                color = '#ffffff'  # White for explored
-            
-            self.canvas.create_oval(
-                x - radius, y - radius,
-                x + radius, y + radius,
-                fill=color, outline=color,
-                tags=('region', region_name)
-            )
-            
-            # Draw region name
-            self.canvas.create_text(
-                x, y + radius + 5,
-                text=region.name,
-                fill=color,
-                font=('TkDefaultFont', int(8 * self.zoom)),
-                tags=('region_name', region_name)
+                oval, label = items
+                self.canvas.coords(oval, x - radius, y - radius, x + radius, y + radius)
+                self.canvas.coords(label, x, y + radius + 5)
+        if self.detail_level(self.zoom) != self.detail_level(self.drawn_zoom):
+            self.label_size = None
+        self.update_labels()
+        
+        self.layout_connections(visible)
+    
+    def update_labels(self):
+        """Size region names for the zoom, hiding them when zoomed out"""
+        size = int(8 * self.zoom)
+        if size != self.label_size:
+            self.canvas.itemconfigure(
+                'region_name', font=('TkDefaultFont', size),
+                state='normal' if self.zoom >= LABEL_ZOOM else 'hidden'
             )
-            
-            # Draw connections
+            self.label_size = size
+    
+    def layout_connections(self, visible):
+        """Draw the connections of the regions in view, leaving out those shorter than a pixel"""
+        grid_size = GRID_SIZE * self.zoom
+        wanted = set()
+        for region in visible:
             for connected_region in region.connections:
-                if connected_region.name > region.name:  # Draw each connection only once
-                    cx = center_x + connected_region.position[0] * grid_size
-                    cy = center_y + connected_region.position[1] * grid_size
-                    self.canvas.create_line(
-                        x, y, cx, cy,
-                        fill='#333333',
-                        width=1,
-                        tags='connection'
-                    )
+                if region.distance_to(connected_region) * grid_size < 1:
+                    continue
+                # Each connection is drawn only once
+                if connected_region.name > region.name:
+                    wanted.add((region, connected_region))
+                else:
+                    wanted.add((connected_region, region))
+        
+        for key in [k for k in self.connection_items if k not in wanted]:
+            self.canvas.delete(self.connection_items.pop(key))
+        for key in wanted:
+            region, connected_region = key
+            coords = (*self.screen_position(region), *self.screen_position(connected_region))
+            line = self.connection_items.get(key)
+            if line is None:
+                self.connection_items[key] = self.canvas.create_line(
+                    *coords,
+                    fill='#333333',
+                    width=1,
+                    tags='connection'
+                )
+            else:
+                self.canvas.coords(line, *coords)
+        self.canvas.tag_lower('connection')
+        self.canvas.tag_lower('grid')
+    
+    def layout_clusters(self):
+        """Draw one marker per block of nearby regions, sized by how many it holds"""
+        index = self.game_state.universe.spatial_index()
+        grid_size = GRID_SIZE * self.zoom
+        # Blocks of whole index cells, about CLUSTER_PIXELS across
+        cells = self.cluster_cells(self.zoom)
+        counts: Dict[Tuple[int, int], int] = {}
+        for (cx, cy), count in index.cell_counts(*self.drawn_rect).items():
+            block = (cx // cells, cy // cells)
+            counts[block] = counts.get(block, 0) + count
+        
+        for block in [b for b in self.cluster_items if b not in counts]:
+            self.canvas.delete(self.cluster_items.pop(block))
+        block_size = cells * index.cell_size * grid_size
+        center_x = self.canvas.winfo_width() / 2 - self.view_offset[0]
+        center_y = self.canvas.winfo_height() / 2 - self.view_offset[1]
+        for (bx, by), count in counts.items():
+            x = center_x + (bx + 0.5) * block_size
+            y = center_y + (by + 0.5) * block_size
+            radius = min(block_size / 2, 2 + math.sqrt(count))
+            coords = (x - radius, y - radius, x + radius, y + radius)
+            oval = self.cluster_items.get((bx, by))
+            if oval is None:
+                self.cluster_items[(bx, by)] = self.canvas.create_oval(
+                    *coords, fill='#888888', outline='#888888', tags='cluster'
+                )
+            else:
+                self.canvas.coords(oval, *coords)
+    
+    def clear_regions(self):
+        """Remove the items of individual regions and their connections"""
+        if self.region_items or self.connection_items:
+            self.canvas.delete('region', 'region_name', 'connection')
+            self.region_items.clear()
+            self.region_colors.clear()
+            self.connection_items.clear()
+    
+    def clear_clusters(self):
+        """Remove the cluster markers"""
+        if self.cluster_items:
+            self.canvas.delete('cluster')
+            self.cluster_items.clear()
+    
+    def refresh_region(self, region):
+        """Recolor a region whose state changed"""
+        items = self.region_items.get(region)
+        color = self.region_color(region)
+        if items is None or self.region_colors[region] == color:
+            return
+        oval, label = items
+        self.canvas.itemconfigure(oval, fill=color, outline=color)
+        self.canvas.itemconfigure(label, fill=color)
+        self.region_colors[region] = color
+    
+    def mark_dirty(self, *regions):
+        """Have regions redrawn once the current burst of events is handled"""
+        self.dirty_regions.update(region for region in regions if region is not None)
+        self.request_redraw()
+    
+    def request_redraw(self):
+        """Schedule one update for however many changes come in before it runs"""
+        if self.redraw_pending is None:
+            self.redraw_pending = self.after_idle(self.update_displays)
+    
+    def on_game_change(self, kind, subject, details):
+        """Mark the regions a game change touched, e.g. by a grant or a probe"""
+        regions = [details.get('region')]
+        if isinstance(subject, Region):
+            regions.append(subject)
+        self.mark_dirty(*regions)  # Travel can also move the current region
     
     def update_displays(self):
-        """Update all displays"""
-        self.draw_map()
-        self.update_region_info()
-        
-        # Schedule next update
-        self.after(100, self.update_displays)
+        """Bring the map up to date with the changes since it was last drawn"""
+        self.redraw_pending = None
+        if self.layout_dirty:
+            self.layout_map()
+        
+        current = self.game_state.current_region
+        if current is not self.marked_current_region:
+            self.dirty_regions.update(r for r in (current, self.marked_current_region) if r is not None)
+            self.marked_current_region = current
+        
+        for region in self.dirty_regions:
+            self.refresh_region(region)
+        if not self.selected_regions.isdisjoint(self.dirty_regions):
+            self.update_region_info()
+        self.dirty_regions.clear()
     
     def update_region_info(self):
         """Update the region information panel"""
+        if len(self.selected_regions) > 1:
+            self.region_name.config(text=f"{len(self.selected_regions)} regions selected")
+            explored = sum(r.visibility != RegionVisibility.UNEXPLORED for r in self.selected_regions)
+            self.region_coords.config(text=f"Explored: {explored}")
+            self.region_resources.config(text="")
+            return
         if not self.selected_region:
             self.region_name.config(text="No region selected")
             self.region_coords.config(text="")
@@ -300,23 +586,73 @@ class UniverseView(ttk.Frame):
         self.drag_start = [event.x, event.y]
         
         # Check for region selection
-        items = self.canvas.find_closest(event.x, event.y)
-        if items:
-            tags = self.canvas.gettags(items[0])
-            if 'region' in tags:
-                region_name = tags[1]
-                self.selected_region = self.game_state.universe.regions[region_name]
-                self.update_region_info()
-                self.update_ui()  # Update UI to enable/disable buttons
+        region = self.region_at(event.x, event.y)
+        if region:
+            self.select_regions([region])
+    
+    def select_regions(self, regions):
+        """Select regions; scanning and travel need exactly one"""
+        self.mark_dirty(*self.selected_regions)
+        self.selected_regions = set(regions)
+        self.selected_region = regions[0] if len(regions) == 1 else None
+        self.mark_dirty(*self.selected_regions)
+        self.update_region_info()
+        self.update_ui()  # Update UI to enable/disable buttons
+    
+    def on_band_start(self, event):
+        """Start a rubber band selection"""
+        self.band_start = (event.x, event.y)
+        self.canvas.delete('band')
+        self.canvas.create_rectangle(
+            event.x, event.y, event.x, event.y,
+            outline='#ffff00', dash=(4, 2), tags='band'
+        )
+    
+    def on_band_drag(self, event):
+        """Stretch the rubber band to the cursor"""
+        if self.band_start:
+            self.canvas.coords('band', *self.band_start, event.x, event.y)
+    
+    def on_band_release(self, event):
+        """Select the regions inside the rubber band"""
+        if self.band_start:
+            regions = self.regions_in_screen_rect(*self.band_start, event.x, event.y)
+            self.band_start = None
+            self.canvas.delete('band')
+            self.select_regions(regions)
+    
+    def on_hover(self, event):
+        """Show a tooltip for the region under the cursor"""
+        region = self.region_at(event.x, event.y)
+        if region is not self.hovered_region:
+            self.hide_tooltip()
+            self.hovered_region = region
+        if region is None:
+            return
+        if self.tooltip is None:
+            self.tooltip = tk.Label(
+                self.canvas,
+                text=f"{region.name}\nLevel {region.level}\n{region.visibility.value.title()}",
+                bg='white',
+                relief='solid',
+                borderwidth=1
+            )
+        self.tooltip.place(x=event.x + 15, y=event.y + 15)
+    
+    def hide_tooltip(self, event=None):
+        """Hide the region tooltip"""
+        self.hovered_region = None
+        if self.tooltip is not None:
+            self.tooltip.destroy()
+            self.tooltip = None
     
     def on_drag(self, event):
         """Handle mouse drag events"""
         if self.drag_start:
-            dx = event.x - self.drag_start[0]
-            dy = event.y - self.drag_start[1]
-            self.view_offset[0] += dx
-            self.view_offset[1] += dy
+            self.pending_pan[0] += event.x - self.drag_start[0]
+            self.pending_pan[1] += event.y - self.drag_start[1]
             self.drag_start = [event.x, event.y]
+            self.request_frame()
     
     def on_release(self, event):
         """Handle mouse release events"""
@@ -327,12 +663,57 @@ class UniverseView(ttk.Frame):
         # Get the direction (-1 for down, 1 for up)
         direction = -1 if event.delta < 0 else 1
         
-        # Calculate new zoom level
+        # Calculate new zoom level, on top of any zoom not applied yet
         zoom_factor = 0.1
-        new_zoom = self.zoom * (1 + direction * zoom_factor)
+        new_zoom = self.zoom * self.pending_zoom * (1 + direction * zoom_factor)
         
         # Clamp zoom level
-        self.zoom = max(0.5, min(new_zoom, 2.0))
+        self.pending_zoom = max(MIN_ZOOM, min(new_zoom, MAX_ZOOM)) / self.zoom
+        self.zoom_anchor = (event.x, event.y)
+        self.request_frame()
+    
+    def request_frame(self):
+        """Apply the pan and zoom gathered so far at the next frame"""
+        if self.frame_pending is None:
+            self.frame_pending = self.after(FRAME_MS, self.apply_view_changes)
+    
+    def apply_view_changes(self):
+        """Move and scale the drawn items by a frame's worth of panning and zooming
+        
+        The items are only laid out again when the zoom crosses a level
+        of detail or the view moves past the area they were drawn for.
+        """
+        self.frame_pending = None
+        dx, dy = self.pending_pan
+        factor = self.pending_zoom
+        self.pending_pan = [0, 0]
+        self.pending_zoom = 1.0
+        
+        if dx or dy:
+            self.canvas.move('all', dx, dy)
+            self.view_offset[0] -= dx  # The map follows the cursor
+            self.view_offset[1] -= dy
+        if factor != 1.0:
+            x, y = self.zoom_anchor
+            self.canvas.scale('all', x, y, factor, factor)
+            # Keep the universe point under the cursor where it is
+            for axis, (anchor, size) in enumerate(((x, self.canvas.winfo_width()),
+                                                   (y, self.canvas.winfo_height()))):
+                center = size / 2 - self.view_offset[axis]
+                self.view_offset[axis] = size / 2 - (anchor + (center - anchor) * factor)
+            self.zoom *= factor
+        
+        if self.layout_dirty or not self.covers_view() or (
+                self.detail_level(self.zoom) != self.detail_level(self.drawn_zoom)):
+            self.layout_map()
+        else:
+            self.layout_grid()
+            self.update_labels()
+    
+    def on_resize(self, event):
+        """Lay the map out again for the new canvas size"""
+        self.layout_dirty = True
+        self.request_redraw()
     
     def travel_to_region(self):
         """Initiate travel to the selected region"""
@@ -388,12 +769,11 @@ class UniverseView(ttk.Frame):
             return
             
         # Perform scan
-        self.selected_region.visibility = RegionVisibility.EXPLORED
-        self.selected_region.discover_deposits()
+        self.selected_region.explore()
         
         # Update UI
         self.update_ui()
-        self.draw_map()
+        self.mark_dirty(self.selected_region)
         
         messagebox.showinfo(
             "Scan Complete",